@@ -2,19 +2,58 @@
    in equilibrium.
 """
 from collections import OrderedDict
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dm.CSVUtil import CSVStreamWriter
 from dm.CSVUtil import CSVUtil
+from dm.ConnectionUtil import ConnectionUtil
 from dm.DateTimeUtil import DateTimeUtil
+from dm.FeatureCache import FeatureCache
+from dm.FeaturePlan import FeaturePlan
+from dm.NPZUtil import NPZReader
+from dm.NPZUtil import NPZStreamWriter
 from dm.Storage import Storage
-from dm.selectors.interval.CachedDiffRowWithIntervalSelector import CachedDiffRowWithIntervalSelector
+from dm.selectors.interval.ArrayDiffRowWithIntervalSelector import ArrayDiffRowWithIntervalSelector
 import csv
+import json
 import logging
+import multiprocessing.util
+import numpy as np
 import os
+import shutil
 
 __author__ = 'Peter Tisovčík'
 __email__ = 'xtisov00@stud.fit.vutbr.cz'
 
 
 DATA_CACHE = None
+WORKER_CON = None
+
+
+def _testing_chunk(config_file, table_name, start, end, write_each, func, event_type,
+                   log_every_hour, vectorized_scan):
+    """Generation of testing data for one chunk in a worker process with its own connection.
+
+    Connection is created during the first call in each worker process and it is closed
+    when the worker process exits. Finalizer of multiprocessing is used, because atexit
+    handlers are not called in worker processes.
+
+    :return: valid rows, timestamps of events that could not be computed and the last
+             computed row (see AttributeUtil.testing_data_parts)
+    """
+
+    global WORKER_CON
+    if WORKER_CON is None:
+        WORKER_CON = ConnectionUtil.create_con(config_file)
+        multiprocessing.util.Finalize(None, WORKER_CON.close, exitpriority=10)
+
+    selector = ArrayDiffRowWithIntervalSelector(WORKER_CON, table_name, start, end)
+    try:
+        return AttributeUtil.testing_data_parts(WORKER_CON, table_name, start, end, write_each,
+                                                func, selector, None, event_type,
+                                                log_every_hour, vectorized_scan)
+    finally:
+        selector.clear()
 
 
 class AttributeUtil:
@@ -60,6 +99,101 @@ class AttributeUtil:
         return attrs, ev
 
 
+    @staticmethod
+    def memoized_training_data(con, table_name, events, func, row_selector, interval_selector,
+                               event_type, cache, print_each=10):
+        """Generation of training data with results stored in FeatureCache.
+
+        If func is a FeaturePlan, only attributes of entries that are not stored
+        in the cache are computed.
+
+        :param cache: FeatureCache
+        :return: attributes and events used in training data
+        """
+
+        key_columns = ['datetime', 'event']
+        key = cache.training_key(table_name, events, event_type, row_selector,
+                                 interval_selector)
+        parts = cache.fingerprints(func)
+        fingerprints = [x[0] for x in parts]
+
+        stored = cache.load_columns(key, fingerprints)
+        missing = [i for i in range(0, len(parts)) if fingerprints[i] not in stored]
+        logging.debug('%d/%d parts of training set are cached' % (len(stored), len(parts)))
+
+        if missing:
+            sub_func = func.subplan(missing) if isinstance(func, FeaturePlan) else func
+            attrs, _ = AttributeUtil.training_data(con, table_name, events, sub_func,
+                                                   row_selector, interval_selector, event_type,
+                                                   print_each)
+            if not attrs:
+                return [], []
+
+            columns = cache.rows_to_columns(attrs, key_columns)
+            if columns is None:
+                logging.warning('attributes are not numbers, training data is not cached')
+                return AttributeUtil.training_data(con, table_name, events, func, row_selector,
+                                                   interval_selector, event_type, print_each)
+
+            names, keys, values, ints = columns
+            widths = [len(names)]
+            if isinstance(sub_func, FeaturePlan):
+                widths = sub_func.widths
+
+            missing_fingerprints = [fingerprints[i] for i in missing]
+            cache.store_columns(key, missing_fingerprints, widths, names, keys, values, ints)
+
+            bounds = np.concatenate(([0], np.cumsum(widths))).tolist()
+            for i, fp in enumerate(missing_fingerprints):
+                s = slice(bounds[i], bounds[i + 1])
+                stored[fp] = (names[s], keys, values[:, s], ints[s])
+
+        def indexed_keys(keys):
+            # rows with the same key are distinguished by order
+            counts = {}
+            out = []
+            for k in keys:
+                counts[k] = counts.get(k, -1) + 1
+                out.append(k + (counts[k],))
+
+            return out
+
+        # row is used only if all parts of attributes were computed for it
+        rows = []
+        for fp in fingerprints:
+            names, keys, values, ints = stored[fp]
+            rows.append(dict(zip(indexed_keys(keys), range(0, len(keys)))))
+
+        attrs = []
+        for k in indexed_keys(stored[fingerprints[0]][1]):
+            if not all(k in x for x in rows):
+                continue
+
+            row = list(zip(key_columns, k[:-1]))
+            for fp, indexes in zip(fingerprints, rows):
+                names, _, values, ints = stored[fp]
+                for name, value, is_int in zip(names, values[indexes[k]].tolist(), ints):
+                    row.append((name, int(value) if is_int else value))
+
+            attrs.append(OrderedDict(row))
+
+        used = set(x for x in indexed_keys([(r['datetime'], r['event']) for r in attrs]))
+        event_keys = []
+        for event in events:
+            event_time = event['e_start']['timestamp']
+            if event_type == 'close':
+                event_time = event['e_end']['timestamp']
+
+            time = DateTimeUtil.utc_timestamp_to_str(event_time, '%Y/%m/%d %H:%M:%S')
+            event_keys.append((time, event_type))
+
+        training_events = []
+        for event, k in zip(events, indexed_keys(event_keys)):
+            if k in used:
+                training_events.append(event)
+
+        return attrs, training_events
+
     @staticmethod
     def training_data(con, table_name, events, func, row_selector, interval_selector,
                       event_type, print_each=10):
@@ -158,44 +292,131 @@ class AttributeUtil:
     @staticmethod
     def testing_data_with_write(con, table_name, start, end, write_each, func, row_selector,
                                 interval_selector, event_type, output_filename,
-                                row_count=2048, log_every_hour=1):
+                                row_count=2048, log_every_hour=1, vectorized_scan=False,
+                                workers=1, config_file='/etc/dp/config.ini', resume=False,
+                                checkpoint_filename=None, output_format='csv'):
         """Generation of testing data, continuous writing to a file is optional.
 
+        If more workers are given, chunks are generated in separate processes, each of them
+        with its own connection to database and row selector. Chunks are written to a file
+        in the same order and with the same content as in sequential generation. Custom
+        selectors cannot be sent to workers, so row_selector and interval_selector must be
+        None in this case.
+
         :param con:
         :param table_name: table name
         :param start: interval from which testing data is generated
         :param end: interval to which testing data is generated
         :param write_each:
-        :param func:
+        :param func: function defined on module level (it is sent to worker processes)
         :param row_selector:
         :param interval_selector:
         :param event_type: event type (open or close)
         :param output_filename: file where data is stored
         :param row_count: number of rows that are written to a file together
+        :param vectorized_scan: open_close column of each chunk is selected using one query
+        :param workers: number of worker processes
+        :param config_file: configuration used by workers to create connections to database
+        :param resume: generation continues after the last chunk stored in checkpoint file
+        :param checkpoint_filename: file with the last written chunk, default is
+                                    output_filename with suffix .checkpoint, generation
+                                    starts from the beginning if func, output_format or
+                                    other parameters differ from the checkpoint
+        :param output_format: 'csv' or 'npz' (output_filename is a directory with columnar
+                              set, see NPZUtil)
         :return:
         """
 
+        if output_format not in ['csv', 'npz']:
+            raise ValueError('unknown output format: %s' % output_format)
+
+        if workers > 1 and (row_selector is not None or interval_selector is not None):
+            raise ValueError('parallel generation supports only default selectors')
+
         step = row_count * write_each
         records = 0
 
-        if os.path.isfile(output_filename):
-            os.remove(output_filename)
+        if checkpoint_filename is None:
+            checkpoint_filename = output_filename + '.checkpoint'
+
+        params = {
+            'table_name': table_name,
+            'start': start,
+            'end': end,
+            'write_each': write_each,
+            'step': step,
+            'event_type': event_type,
+            'output_format': output_format,
+            'func': [fp for fp, _ in FeatureCache.fingerprints(func)],
+        }
+        chunks = list(AttributeUtil.__chunks(start, end, step))
+
+        state = None
+        if resume:
+            state = AttributeUtil.__load_checkpoint(checkpoint_filename, output_filename, params)
+
+        if state is None:
+            if os.path.isfile(output_filename):
+                os.remove(output_filename)
+            elif os.path.isdir(output_filename):
+                shutil.rmtree(output_filename)
+        else:
+            records = state['records']
+            if state['finished']:
+                logging.debug('testing data are already generated')
+                return records
 
-        last_timestamp = start
-        for timestamp in range(start + step, end + step, step):
-            if timestamp > end:
-                timestamp = timestamp - (timestamp - end)
+            chunks = [x for x in chunks if x[0] >= state['last_timestamp']]
+            logging.debug('generation continues from %s' % DateTimeUtil.utc_timestamp_to_str(
+                state['last_timestamp']))
 
+        if output_format == 'npz':
+            writer = NPZStreamWriter(output_filename, enable_append=True)
+        else:
+            writer = CSVStreamWriter(output_filename, enable_append=True)
+
+        with writer:
+            def checkpoint(last_timestamp, records, finished=False):
+                writer.flush()
+                AttributeUtil.__write_checkpoint(checkpoint_filename, output_filename, params,
+                                                 last_timestamp, records, finished)
+
+            if workers > 1:
+                records = AttributeUtil.__parallel_testing_data(table_name, chunks, write_each,
+                                                                func, event_type, writer,
+                                                                log_every_hour, vectorized_scan,
+                                                                workers, config_file, records,
+                                                                checkpoint)
+            else:
+                records = AttributeUtil.__sequential_testing_data(con, table_name, chunks,
+                                                                  write_each, func,
+                                                                  row_selector,
+                                                                  interval_selector,
+                                                                  event_type, writer,
+                                                                  log_every_hour,
+                                                                  vectorized_scan, records,
+                                                                  checkpoint)
+
+            checkpoint(end, records, True)
+
+        return records
+
+    @staticmethod
+    def __sequential_testing_data(con, table_name, chunks, write_each, func, row_selector,
+                                  interval_selector, event_type, writer, log_every_hour,
+                                  vectorized_scan, records, checkpoint):
+        for last_timestamp, timestamp in chunks:
             if row_selector is None:
-                selector = CachedDiffRowWithIntervalSelector(con, table_name, last_timestamp, timestamp)
+                selector = ArrayDiffRowWithIntervalSelector(con, table_name, last_timestamp, timestamp)
             else:
                 selector = row_selector
 
             tr = AttributeUtil.testing_data(con, table_name, last_timestamp, timestamp, write_each, func,
-                                            selector, interval_selector, event_type, log_every_hour)
-            CSVUtil.create_csv_file(tr, output_filename, enable_append=True)
-            last_timestamp = timestamp
+                                            selector, interval_selector, event_type, log_every_hour,
+                                            vectorized_scan)
+            writer.write_dicts(tr)
             records += len(tr)
+            checkpoint(timestamp, records)
 
             if row_selector is None:
                 selector.clear()
@@ -203,39 +424,189 @@ class AttributeUtil:
         return records
 
     @staticmethod
-    def testing_data(con, table_name, start, end, write_each, func, row_selector, interval_selector,
-                     event_type, log_every_hour=3):
-        """Generation of testing data.
+    def __write_checkpoint(checkpoint_filename, output_filename, params, last_timestamp,
+                           records, finished):
+        state = dict(params)
+        state['last_timestamp'] = last_timestamp
+        state['records'] = records
+        state['file_size'] = 0
+        state['finished'] = finished
 
-        :param con:
-        :param table_name: table name
-        :param start: interval from which testing data is generated
-        :param end: interval to which testing data is generated
-        :param write_each:
-        :param func:
-        :param row_selector:
-        :param interval_selector:
-        :return:
+        if os.path.isfile(output_filename):
+            state['file_size'] = os.path.getsize(output_filename)
+
+        tmp_filename = checkpoint_filename + '.tmp'
+        with open(tmp_filename, 'w') as f:
+            json.dump(state, f, indent=4)
+
+        os.replace(tmp_filename, checkpoint_filename)
+
+    @staticmethod
+    def __load_checkpoint(checkpoint_filename, output_filename, params):
+        """Loads checkpoint and validates the output file, data written after
+        the checkpoint are removed.
+
+        :return: checkpoint or None if generation must start from the beginning
         """
 
-        attrs = []
-        bad_open_type_events = []
+        if not os.path.isfile(checkpoint_filename):
+            logging.warning('checkpoint %s not found' % checkpoint_filename)
+            return None
+
+        try:
+            with open(checkpoint_filename) as f:
+                state = json.load(f)
+        except ValueError:
+            logging.warning('invalid checkpoint %s' % checkpoint_filename)
+            return None
+
+        for key, value in params.items():
+            if state.get(key) != value:
+                logging.warning('checkpoint was created with different %s' % key)
+                return None
+
+        if os.path.isdir(output_filename):
+            # columnar set, row groups are written together with schema
+            try:
+                rows = NPZReader(output_filename).rows
+            except (OSError, ValueError, KeyError):
+                logging.warning('invalid output set %s' % output_filename)
+                return None
+
+            if rows != state['records']:
+                logging.warning('output set contains %d rows, checkpoint %d rows'
+                                % (rows, state['records']))
+                return None
+
+            return state
+
+        size = state['file_size']
+        if size == 0:
+            if os.path.isfile(output_filename):
+                os.remove(output_filename)
+            return state
+
+        if not os.path.isfile(output_filename) or os.path.getsize(output_filename) < size:
+            logging.warning('output file is shorter than in checkpoint')
+            return None
+
+        with open(output_filename, 'rb+') as f:
+            # part of chunk written after the checkpoint
+            f.truncate(size)
+
+            f.seek(size - 1)
+            if f.read(1) != b'\n':
+                logging.warning('output file does not end with complete row')
+                return None
+
+            f.seek(0)
+            lines = sum(chunk.count(b'\n') for chunk in iter(lambda: f.read(1 << 20), b''))
+
+        # first line is a header
+        if lines - 1 != state['records']:
+            logging.warning('output file contains %d rows, checkpoint %d rows'
+                            % (lines - 1, state['records']))
+            return None
+
+        return state
+
+    @staticmethod
+    def memoized_testing_data_with_write(con, table_name, start, end, write_each, func,
+                                         row_selector, interval_selector, event_type,
+                                         output_filename, cache, **kwargs):
+        """Generation of testing data, the output file is stored in FeatureCache.
+
+        Other arguments are the same as arguments of testing_data_with_write.
+
+        :param cache: FeatureCache
+        :return: number of records
+        """
+
+        if kwargs.get('output_format', 'csv') != 'csv':
+            raise ValueError('only csv testing sets are stored in cache')
+
+        # testing_data_with_write uses ArrayDiffRowWithIntervalSelector by default
+        selector = ArrayDiffRowWithIntervalSelector if row_selector is None else row_selector
+        key = cache.testing_key(table_name, start, end, write_each, event_type, func, selector,
+                                interval_selector)
+        if cache.load_file(key, output_filename):
+            logging.debug('testing set loaded from cache')
+
+            with open(output_filename, 'r') as f:
+                return max(sum(1 for _ in csv.reader(f)) - 1, 0)
+
+        records = AttributeUtil.testing_data_with_write(con, table_name, start, end, write_each,
+                                                        func, row_selector, interval_selector,
+                                                        event_type, output_filename, **kwargs)
+        if os.path.isfile(output_filename):
+            cache.store_file(key, output_filename)
+
+        return records
+
+    @staticmethod
+    def __chunks(start, end, step):
+        last_timestamp = start
+        for timestamp in range(start + step, end + step, step):
+            if timestamp > end:
+                timestamp = timestamp - (timestamp - end)
+
+            yield last_timestamp, timestamp
+            last_timestamp = timestamp
+
+    @staticmethod
+    def __parallel_testing_data(table_name, chunks, write_each, func, event_type,
+                                writer, log_every_hour, vectorized_scan,
+                                workers, config_file, records, checkpoint):
         global DATA_CACHE
 
+        chunks = iter(chunks)
+        futures = deque()
+
+        def submit():
+            for chunk_start, chunk_end in chunks:
+                futures.append((chunk_end, executor.submit(_testing_chunk, config_file,
+                                                           table_name, chunk_start, chunk_end,
+                                                           write_each, func, event_type,
+                                                           log_every_hour, vectorized_scan)))
+                return
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # only few chunks are in progress, finished chunks wait for the previous ones
+            for _ in range(0, 2 * workers):
+                submit()
+
+            # results are written in order of chunks, not in order of completion, invalid
+            # rows are created from the last computed row as in sequential generation
+            while futures:
+                chunk_end, future = futures.popleft()
+                attrs, bad_events, last_row = future.result()
+                submit()
+
+                if last_row is not None:
+                    DATA_CACHE = last_row
+
+                tr = attrs + AttributeUtil.invalid_testing_rows(DATA_CACHE, bad_events,
+                                                                event_type)
+                writer.write_dicts(tr)
+                records += len(tr)
+                checkpoint(chunk_end, records)
+
+        return records
+
+    @staticmethod
+    def __open_close_states(con, table_name, start, end, event_type, log_every_hour):
+        """Detection of open/close events using two queries for each second of interval.
+
+        :return: generator of pairs (timestamp, open_state)
+        """
+
         for t in range(start, end):
             if t % (log_every_hour * 3600) == 0:
                 logging.debug(DateTimeUtil.utc_timestamp_to_str(t))
 
-            act_row = None
-            if act_row is None:
-                previous_row = Storage.one_row(con, table_name, 'open_close', t - 1)
-            else:
-                previous_row = act_row
+            previous_row = Storage.one_row(con, table_name, 'open_close', t - 1)
             act_row = Storage.one_row(con, table_name, 'open_close', t)
 
-            if event_type not in ['open', 'close']:
-                raise ValueError('event type must be: open or close')
-
             if previous_row is None or act_row is None:
                 continue
 
@@ -245,12 +616,112 @@ class AttributeUtil:
             elif event_type == 'close' and previous_row[0] == 1 and act_row[0] == 0:
                 open_state = event_type
 
+            yield t, open_state
+
+    @staticmethod
+    def __vectorized_open_close_states(con, table_name, start, end, write_each, event_type,
+                                       log_every_hour):
+        """Detection of open/close events from open_close column selected using one query.
+
+        Only timestamps with an event and every write_each-th timestamp are returned,
+        because the remaining timestamps are skipped during generation of testing data.
+
+        :return: generator of pairs (timestamp, open_state)
+        """
+
+        if end <= start:
+            return
+
+        present, values = Storage.select_interval_columns(con, start - 1, end - 1,
+                                                          ['open_close'], table_name)
+        open_close = values['open_close']
+
+        previous_state = open_close[:-1]
+        act_state = open_close[1:]
+        valid = present[:-1] & present[1:]
+        times = np.arange(start, end)
+
+        if event_type == 'open':
+            events = valid & (previous_state == 0) & (act_state == 1)
+        else:
+            events = valid & (previous_state == 1) & (act_state == 0)
+
+        selected = events | (valid & (times % write_each == 0))
+
+        for t, is_event in zip(times[selected].tolist(), events[selected].tolist()):
+            if t % (log_every_hour * 3600) == 0:
+                logging.debug(DateTimeUtil.utc_timestamp_to_str(t))
+
+            yield t, event_type if is_event else 'nothing'
+
+    @staticmethod
+    def testing_data(con, table_name, start, end, write_each, func, row_selector, interval_selector,
+                     event_type, log_every_hour=3, vectorized_scan=False):
+        """Generation of testing data.
+
+        :param con:
+        :param table_name: table name
+        :param start: interval from which testing data is generated
+        :param end: interval to which testing data is generated
+        :param write_each:
+        :param func: function or FeaturePlan, attributes of FeaturePlan are computed for all
+                     timestamps together using FeaturePlan.evaluate_many
+        :param row_selector:
+        :param interval_selector:
+        :param vectorized_scan: open_close column is selected using one query and events
+                                are detected using numpy instead of two queries per second
+        :return:
+        """
+
+        global DATA_CACHE
+
+        attrs, bad_open_type_events, last_row = AttributeUtil.testing_data_parts(
+            con, table_name, start, end, write_each, func, row_selector, interval_selector,
+            event_type, log_every_hour, vectorized_scan)
+
+        if last_row is not None:
+            DATA_CACHE = last_row
+
+        return attrs + AttributeUtil.invalid_testing_rows(DATA_CACHE, bad_open_type_events,
+                                                          event_type)
+
+    @staticmethod
+    def testing_data_parts(con, table_name, start, end, write_each, func, row_selector,
+                           interval_selector, event_type, log_every_hour=3,
+                           vectorized_scan=False):
+        """Generation of valid rows of testing data, arguments are the same as arguments
+        of testing_data.
+
+        :return: valid rows, timestamps of open/close events that could not be computed,
+                 the last computed row as a list of pairs (None if no row was computed)
+        """
+
+        attrs = []
+        bad_open_type_events = []
+        last_row = None
+
+        if event_type not in ['open', 'close']:
+            raise ValueError('event type must be: open or close')
+
+        if vectorized_scan:
+            states = AttributeUtil.__vectorized_open_close_states(con, table_name, start, end,
+                                                                  write_each, event_type,
+                                                                  log_every_hour)
+        else:
+            states = AttributeUtil.__open_close_states(con, table_name, start, end, event_type,
+                                                       log_every_hour)
+
+        if isinstance(func, FeaturePlan):
+            return AttributeUtil.__plan_testing_data(con, table_name, states, write_each, func,
+                                                     row_selector, interval_selector)
+
+        for t, open_state in states:
             if open_state == 'nothing':
                 if t % write_each != 0:
                     continue
 
             try:
-                DATA_CACHE = func(con, table_name, t, row_selector, interval_selector)
+                row = func(con, table_name, t, row_selector, interval_selector)
             except Exception as e:
                 # logging.error(str(e))
 
@@ -259,24 +730,93 @@ class AttributeUtil:
                 continue
 
             time = DateTimeUtil.utc_timestamp_to_str(t, '%Y/%m/%d %H:%M:%S')
-            DATA_CACHE.insert(0, ('datetime', time))
-            DATA_CACHE.insert(1, ('event', open_state))
-            DATA_CACHE.append(('valid', 'yes'))
-            attrs.append(OrderedDict(DATA_CACHE))
+            row.insert(0, ('datetime', time))
+            row.insert(1, ('event', open_state))
+            row.append(('valid', 'yes'))
+            attrs.append(OrderedDict(row))
+            last_row = row
+
+        return attrs, bad_open_type_events, last_row
+
+    @staticmethod
+    def __plan_testing_data(con, table_name, states, write_each, plan, row_selector,
+                            interval_selector):
+        """Generation of valid rows of testing data using FeaturePlan.evaluate_many,
+        all selected timestamps are computed together.
+
+        Types of values (int or float) are taken from the first valid row computed
+        by the plan for one timestamp, so rows are the same as rows of testing_data_parts
+        for other functions.
+
+        :return: the same as testing_data_parts
+        """
 
-        if DATA_CACHE is None:
+        selected = [(t, s) for t, s in states if s != 'nothing' or t % write_each == 0]
+        if not selected:
+            return [], [], None
+
+        timestamps = [t for t, _ in selected]
+        names, matrix, valid = plan.evaluate_many(con, table_name, timestamps, row_selector,
+                                                  interval_selector)
+        times = DateTimeUtil.utc_timestamps_to_str(timestamps, '%Y/%m/%d %H:%M:%S')
+
+        attrs = []
+        bad_open_type_events = []
+        last_row = None
+        integers = None
+
+        for (t, open_state), time, values, ok in zip(selected, times, matrix.tolist(),
+                                                      valid.tolist()):
+            if not ok:
+                if open_state in ['open', 'close']:
+                    bad_open_type_events.append(t)
+                continue
+
+            if integers is None:
+                first = plan(con, table_name, t, row_selector, interval_selector)
+                if [x[0] for x in first] != names:
+                    raise ValueError('names of attributes computed by evaluate_many differ')
+
+                integers = [i for i, x in enumerate(first) if isinstance(x[1], int)]
+
+            for i in integers:
+                values[i] = int(values[i])
+
+            row = [('datetime', time), ('event', open_state)]
+            row += zip(names, values)
+            row.append(('valid', 'yes'))
+            attrs.append(OrderedDict(row))
+            last_row = row
+
+        return attrs, bad_open_type_events, last_row
+
+    @staticmethod
+    def invalid_testing_rows(last_row, bad_open_type_events, event_type):
+        """Rows of events that could not be computed, names of columns are taken from
+        the last computed row.
+
+        :param last_row: the last computed row as a list of pairs
+        :param bad_open_type_events: timestamps of events
+        :param event_type: event type (open or close)
+        :return: rows with valid=no and empty attributes
+        """
+
+        if last_row is None:
             logging.warning('any {0} events can be skipped'.format(event_type))
-        else:
-            tmp = {}
-            for item in DATA_CACHE:
-                key = item[0]
-                tmp[key] = None
-
-            tmp['event'] = event_type
-            tmp['valid'] = 'no'
-            for timestamp in bad_open_type_events:
-                tmp['datetime'] = DateTimeUtil.utc_timestamp_to_str(timestamp, '%Y/%m/%d %H:%M:%S')
-                attrs.append(OrderedDict(tmp))
+            return []
+
+        attrs = []
+        tmp = {}
+        for item in last_row:
+            key = item[0]
+            tmp[key] = None
+
+        tmp['event'] = event_type
+        tmp['valid'] = 'no'
+        for time in DateTimeUtil.utc_timestamps_to_str(bad_open_type_events,
+                                                       '%Y/%m/%d %H:%M:%S'):
+            tmp['datetime'] = time
+            attrs.append(OrderedDict(tmp))
 
         return attrs
 
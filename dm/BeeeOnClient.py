@@ -1,6 +1,7 @@
 """REST API client for communication with BeeeOn server.
 """
 from dm.HTTPClient import HTTPClient
+from dm.HTTPClient import HTTPConnectionPool
 import json
 import logging
 
@@ -11,9 +12,16 @@ __email__ = 'xnecas24@stud.fit.vutbr.cz'
 class BeeeOnClient:
     """Client for communication with server supporting BeeeOn api."""
 
-    def __init__(self, host, port):
+    def __init__(self, host, port, pool_size=8, cache=None):
+        """
+        :param cache: optional HistoryCache for responses of history requests
+        """
+
         self.__host = host
         self.__port = port
+        # persistent connections are shared by all requests of this client
+        self.__pool = HTTPConnectionPool(host, port, False, pool_size)
+        self.__cache = cache
         self.__api_key = ""
         self.__token_id = ""
         self.__log = logging.getLogger(self.__class__.__name__)
@@ -22,7 +30,7 @@ class BeeeOnClient:
         logging.debug('obtaining token id')
         data = {'key': self.__api_key, 'provider': 'apikey'}
         try:
-            req = HTTPClient(self.__host, self.__port, "/auth", "POST", False)
+            req = HTTPClient(self.__host, self.__port, "/auth", "POST", False, self.__pool)
             req.body(json.dumps(data))
             res, body = req.perform()
         except Exception as e:
@@ -41,7 +49,22 @@ class BeeeOnClient:
 
         return json_res['data']['id']
 
+    def __offline(self):
+        return self.__cache is not None and self.__cache.offline
+
     def history(self, gateway, device, sensor, start, end, interval=1, aggregation='avg'):
+        key = None
+        if self.__cache is not None:
+            key = self.__cache.key(self.__host, gateway, device, sensor, start, end,
+                                   interval, aggregation)
+            body = self.__cache.get(key)
+            if body is not None:
+                return json.loads(body)
+
+            if self.__cache.offline:
+                raise LookupError('history of %s/%s/%s <%s, %s> not found in cache'
+                                  % (gateway, device, sensor, start, end))
+
         if not self.__token_id:
             self.__token_id = self.refresh_token()
 
@@ -53,12 +76,17 @@ class BeeeOnClient:
         endpoint += '&interval=' + str(interval)
         endpoint += '&aggregation=' + aggregation
 
-        req = HTTPClient(self.__host, self.__port, endpoint, "GET", False)
+        req = HTTPClient(self.__host, self.__port, endpoint, "GET", False, self.__pool)
         req.authorize(self.__token_id)
 
         res, body = req.perform()
+        json_res = json.loads(body)
+
+        # only successful responses are stored
+        if key is not None and 'data' in json_res:
+            self.__cache.put(key, body, end)
 
-        return json.loads(body)
+        return json_res
 
     def sensors_info(self, gateway_id, device_id):
         if not self.__token_id:
@@ -67,32 +95,40 @@ class BeeeOnClient:
         endpoint = '/gateways/' + str(gateway_id) + '/devices/' + str(
             device_id) + '/sensors'
 
-        req = HTTPClient(self.__host, self.__port, endpoint, "GET", False)
+        req = HTTPClient(self.__host, self.__port, endpoint, "GET", False, self.__pool)
         req.authorize(self.__token_id)
         res, body = req.perform()
 
         return json.loads(body)['data']
 
     def __logout(self):
+        if self.__offline():
+            return
+
         if not self.__token_id:
             self.__log.warning('token is not set')
             return
 
         endpoint = '/auth'
 
-        req = HTTPClient(self.__host, self.__port, endpoint, "DELETE", False)
+        req = HTTPClient(self.__host, self.__port, endpoint, "DELETE", False, self.__pool)
         req.authorize(self.__token_id)
 
         req.perform()
 
         self.__log.debug('logout was successful')
 
+    def close(self):
+        self.__pool.close()
+
     def __del__(self):
         try:
             self.__logout()
         except:
             logging.error('problem with logout')
 
+        self.close()
+
     @property
     def api_key(self):
         return self.__api_key
@@ -103,7 +139,7 @@ class BeeeOnClient:
 
     @property
     def token_id(self):
-        if not self.__token_id:
+        if not self.__token_id and not self.__offline():
             self.__token_id = self.refresh_token()
 
         return self.__token_id
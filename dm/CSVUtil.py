@@ -2,6 +2,7 @@
 """
 import csv
 import logging
+import numpy as np
 import os
 
 __author__ = 'Klára Nečasová'
@@ -37,3 +38,135 @@ class CSVUtil:
                 csv_writer.writerow(item)
 
             f.close()
+
+
+class CSVStreamWriter:
+    """Writer of csv file that keeps the file open and writes rows in large batches.
+
+    Header is written only once, rows can be given as dictionaries, tuples or numpy arrays.
+    """
+
+    def __init__(self, filename: str, field_names=None, enable_append=False,
+                 buffer_size=8192):
+        """
+        :param filename: output file
+        :param field_names: names of columns, if they are not given, names of the first
+                            dictionary or header of appended file are used
+        :param enable_append: rows are appended to the existing file
+        :param buffer_size: number of rows written to the file together
+        """
+
+        self.filename = filename
+        self.field_names = None if field_names is None else list(field_names)
+        self.buffer_size = buffer_size
+        self.rows = 0
+        self.__buffer = []
+        self.__write_header = True
+
+        if enable_append and os.path.isfile(filename) and os.path.getsize(filename) > 0:
+            self.__write_header = False
+
+            with open(filename, 'r') as f:
+                header = next(csv.reader(f), [])
+
+            if self.field_names is None:
+                self.field_names = header
+
+        self.__file = open(filename, 'a' if enable_append else 'w')
+        self.__writer = csv.writer(self.__file)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __header(self):
+        if self.__write_header:
+            self.__writer.writerow(self.field_names)
+            self.__write_header = False
+
+    def write_row(self, row):
+        """Writes tuple or list of values in order of field names."""
+
+        self.__buffer.append(row)
+        self.rows += 1
+
+        if len(self.__buffer) >= self.buffer_size:
+            self.flush()
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.write_row(row)
+
+    def write_dicts(self, data: list):
+        """Writes dictionaries, values are ordered by field names, missing values are empty.
+
+        :raise ValueError: if some dictionary contains key that is not in field names,
+                           nothing from data is written in this case
+        """
+
+        if not data:
+            return
+
+        if self.field_names is None:
+            self.field_names = list(data[0].keys())
+
+        names = self.field_names
+        known = set(names)
+        for item in data:
+            if item.keys() - known:
+                raise ValueError('dict contains fields not in fieldnames: %s'
+                                 % ', '.join(repr(x) for x in item.keys() - known))
+
+        for item in data:
+            self.write_row([item.get(x) for x in names])
+
+    def write_matrix(self, matrix, prefix=None):
+        """Writes numpy matrix without conversion of rows into dictionaries.
+
+        NaN values are written as empty values, the same way as None.
+
+        :param matrix: 2D array, one row for each row of csv file
+        :param prefix: optional list of rows (e.g. datetime and event) that are written
+                       before the values of matrix
+        """
+
+        if self.field_names is None:
+            raise ValueError('field names must be set before writing of matrix')
+
+        if len(matrix) == 0:
+            return
+
+        values = matrix.tolist()
+        if matrix.dtype.kind == 'f':
+            for i in np.flatnonzero(np.isnan(matrix).any(axis=1)).tolist():
+                values[i] = [None if x != x else x for x in values[i]]
+
+        if prefix is not None:
+            values = [list(p) + v for p, v in zip(prefix, values)]
+
+        self.flush()
+        self.__header()
+        self.__writer.writerows(values)
+        self.rows += len(values)
+
+    def flush(self):
+        if not self.__buffer:
+            self.__file.flush()
+            return
+
+        if self.field_names is None:
+            raise ValueError('field names are not set')
+
+        self.__header()
+        self.__writer.writerows(self.__buffer)
+        self.__buffer = []
+        self.__file.flush()
+
+    def close(self):
+        if self.__file.closed:
+            return
+
+        self.flush()
+        self.__file.close()
@@ -0,0 +1,279 @@
+"""Per-column binary store of tables with values measured each second.
+
+Every table is stored in its own directory. Each column is a file of raw float values
+(NaN represents NULL value), file present.bin marks seconds for which a row exists
+and header.json contains the timestamp of the first second, number of seconds and
+data types of columns. Files are read using np.memmap, so selection of an interval
+does not copy the data.
+
+Store can be used instead of the connection to database in Storage.one_row,
+Storage.select_interval and Storage.select_interval_columns, so the selectors and
+attributes can work without database server.
+"""
+from collections import OrderedDict
+from dm.DateTimeUtil import DateTimeUtil
+from dm.SQLUtil import SQLUtil
+import json
+import logging
+import numpy as np
+import os
+
+__author__ = 'Peter Tisovčík'
+__email__ = 'xtisov00@stud.fit.vutbr.cz'
+
+
+class ColumnStore:
+    HEADER = 'header.json'
+    PRESENT = 'present.bin'
+
+    COLUMNS = [
+        'open_close',
+        'pressure_in_hpa',
+        'temperature_in_celsius',
+        'temperature_in2_celsius',
+        'temperature_out_celsius',
+        'rh_in_percentage',
+        'rh_in2_percentage',
+        'rh_in_absolute_g_m3',
+        'rh_in2_absolute_g_m3',
+        'rh_in_specific_g_kg',
+        'rh_in2_specific_g_kg',
+        'rh_out_percentage',
+        'rh_out_absolute_g_m3',
+        'rh_out_specific_g_kg',
+        'co2_in_ppm',
+    ]
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.__tables = {}
+
+    def __table(self, table_name):
+        if table_name in self.__tables:
+            return self.__tables[table_name]
+
+        table_dir = os.path.join(self.directory, table_name)
+        with open(os.path.join(table_dir, self.HEADER)) as f:
+            header = json.load(f)
+
+        table = {
+            'start': header['start'],
+            'size': header['size'],
+            'present': None,
+            'columns': OrderedDict(),
+        }
+
+        if header['size'] > 0:
+            table['present'] = np.memmap(os.path.join(table_dir, self.PRESENT),
+                                         dtype=np.bool_, mode='r', shape=(header['size'],))
+
+            for column, dtype in header['columns'].items():
+                table['columns'][column] = np.memmap(os.path.join(table_dir, column + '.bin'),
+                                                     dtype=dtype, mode='r',
+                                                     shape=(header['size'],))
+        else:
+            table['present'] = np.zeros(0, dtype=np.bool_)
+            for column, dtype in header['columns'].items():
+                table['columns'][column] = np.zeros(0, dtype=dtype)
+
+        self.__tables[table_name] = table
+        return table
+
+    def column_names(self, table_name):
+        return list(self.__table(table_name)['columns'].keys())
+
+    def time_range(self, table_name):
+        """Returns timestamps of the first and the last stored second."""
+
+        table = self.__table(table_name)
+        return table['start'], table['start'] + table['size'] - 1
+
+    def __slice(self, table, array, start, end, fill):
+        size = end - start + 1
+        begin = start - table['start']
+
+        # interval inside of stored data is returned as a view without copying
+        if begin >= 0 and begin + size <= table['size']:
+            return array[begin:begin + size]
+
+        out = np.full(max(size, 0), fill, dtype=array.dtype)
+        src_from = max(begin, 0)
+        src_to = min(begin + size, table['size'])
+        if src_from < src_to:
+            out[src_from - begin:src_to - begin] = array[src_from:src_to]
+
+        return out
+
+    def interval(self, table_name, column, start, end):
+        """Values of column for each second of interval <start, end>, NaN for missing value.
+        """
+
+        table = self.__table(table_name)
+        return self.__slice(table, table['columns'][column], start, end, np.nan)
+
+    def present(self, table_name, start, end):
+        table = self.__table(table_name)
+        return self.__slice(table, table['present'], start, end, False)
+
+    def one_row(self, table_name, columns, timestamp):
+        """Row with given columns in the same form as it is returned by database cursor."""
+
+        table = self.__table(table_name)
+        index = timestamp - table['start']
+
+        if index < 0 or index >= table['size'] or not table['present'][index]:
+            logging.warning('missing row in store `%s` for time %s' % (table_name, timestamp))
+            return None
+
+        out = []
+        for column in self.__parse_columns(columns):
+            if column == 'measured_time':
+                out.append(timestamp)
+            elif column == 'measured_time_str':
+                out.append(DateTimeUtil.utc_timestamp_to_str(timestamp))
+            else:
+                value = float(table['columns'][column][index])
+                out.append(None if np.isnan(value) else value)
+
+        return tuple(out)
+
+    def select_interval(self, start, end, column, table_name, without_none_value=True):
+        values = self.interval(table_name, column, start, end)
+        missing = np.isnan(values)
+
+        if without_none_value and missing.any():
+            return []
+
+        out = []
+        for value, present, is_missing in zip(values.tolist(),
+                                              self.present(table_name, start, end).tolist(),
+                                              missing.tolist()):
+            if not present:
+                continue
+
+            out.append(None if is_missing else value)
+
+        return out
+
+    def select_interval_columns(self, start, end, columns, table_name):
+        values = OrderedDict()
+        for column in columns:
+            array = self.interval(table_name, column, start, end)
+            values[column] = array.astype(np.float64, copy=False)
+
+        return self.present(table_name, start, end), values
+
+    def __parse_columns(self, columns):
+        if columns.strip() == '*':
+            return ['measured_time', 'measured_time_str'] + self.COLUMNS
+
+        return [x.strip() for x in columns.split(',')]
+
+    @staticmethod
+    def __write_header(table_dir, start, size, dtypes):
+        header = {
+            'start': start,
+            'size': size,
+            'columns': dtypes,
+        }
+
+        tmp_filename = os.path.join(table_dir, ColumnStore.HEADER + '.tmp')
+        with open(tmp_filename, 'w') as f:
+            json.dump(header, f, indent=4)
+
+        os.replace(tmp_filename, os.path.join(table_dir, ColumnStore.HEADER))
+
+    @staticmethod
+    def export(con, table_name, directory, start=None, end=None, dtype='float64',
+               block_size=86400, overlap=1200):
+        """Export of table from database to the store.
+
+        If the table was already exported with the same data types, only the last overlap
+        seconds of the store are exported again and the seconds after them are appended
+        (sync), otherwise the table is exported from the beginning. Overlap must be at
+        least the interval that is deleted and inserted again during each update
+        of database (delete_step in 0001_create_update_db/run.py), because values
+        in this interval are missing or partial before the next update.
+
+        :param con: connection with database
+        :param table_name: table name
+        :param directory: directory of the store
+        :param start: timestamp of the first exported second, default is the first row
+        :param end: timestamp of the last exported second, default is the last row
+        :param dtype: data type of values, float32 or float64
+        :param block_size: number of seconds selected using one query
+        :param overlap: number of the last stored seconds that are exported again during sync
+        :return: number of exported seconds
+        """
+
+        cur = con.cursor()
+        cur.execute('SELECT MIN(measured_time), MAX(measured_time) FROM ' + table_name)
+        db_start, db_end = cur.fetchone()
+
+        if db_start is None:
+            logging.warning('table `%s` is empty' % table_name)
+            return 0
+
+        start = db_start if start is None else start
+        end = db_end if end is None else end
+
+        table_dir = os.path.join(directory, table_name)
+        if not os.path.isdir(table_dir):
+            os.makedirs(table_dir)
+
+        dtypes = OrderedDict((column, np.dtype(dtype).name) for column in ColumnStore.COLUMNS)
+
+        header_filename = os.path.join(table_dir, ColumnStore.HEADER)
+        mode = 'wb'
+        size = 0
+        if os.path.isfile(header_filename):
+            with open(header_filename) as f:
+                header = json.load(f)
+
+            if header['start'] == start and header['columns'] == dtypes:
+                mode = 'ab'
+                size = max(min(header['size'] - overlap, end - start + 1), 0)
+
+        files = {ColumnStore.PRESENT: open(os.path.join(table_dir, ColumnStore.PRESENT), mode)}
+        for column in ColumnStore.COLUMNS:
+            files[column] = open(os.path.join(table_dir, column + '.bin'), mode)
+
+        # overlap and data written after the last header update (interrupted export)
+        # are removed
+        files[ColumnStore.PRESENT].truncate(size)
+        for column in ColumnStore.COLUMNS:
+            files[column].truncate(size * np.dtype(dtype).itemsize)
+
+        try:
+            for block_start in range(start + size, end + 1, block_size):
+                block_end = min(block_start + block_size - 1, end)
+                length = block_end - block_start + 1
+
+                present = np.zeros(length, dtype=np.bool_)
+                values = np.full((len(ColumnStore.COLUMNS), length), np.nan, dtype=dtype)
+
+                sql = SQLUtil.select_interval(table_name, block_start, block_end,
+                                              ', '.join(['measured_time'] + ColumnStore.COLUMNS))
+                cur.execute(sql)
+
+                for row in cur.fetchall():
+                    index = row[0] - block_start
+                    present[index] = True
+
+                    for i in range(0, len(ColumnStore.COLUMNS)):
+                        if row[i + 1] is not None:
+                            values[i][index] = float(row[i + 1])
+
+                present.tofile(files[ColumnStore.PRESENT])
+                for i in range(0, len(ColumnStore.COLUMNS)):
+                    values[i].tofile(files[ColumnStore.COLUMNS[i]])
+
+                size += length
+        finally:
+            for f in files.values():
+                f.close()
+
+        ColumnStore.__write_header(table_dir, start, size, dtypes)
+        logging.debug('table `%s` exported, %d seconds' % (table_name, size))
+
+        return size
@@ -12,13 +12,14 @@ class ConnectionUtil:
     MAX_TESTABLE_EVENTS = 100
 
     @staticmethod
-    def create_con(config_file='/etc/dp/config.ini'):
+    def create_con(config_file='/etc/dp/config.ini', allow_local_infile=False):
         if ConnectionUtil.is_testable_system():
             return mysql.connector.connect(
                 host='localhost',
                 user='root',
                 passwd='',
-                database='demo'
+                database='demo',
+                allow_local_infile=allow_local_infile
             )
 
         config = configparser.ConfigParser()
@@ -28,7 +29,8 @@ class ConnectionUtil:
             host=config['db']['host'],
             user=config['db']['user'],
             passwd=config['db']['passwd'],
-            database=config['db']['database']
+            database=config['db']['database'],
+            allow_local_infile=allow_local_infile
         )
 
     @staticmethod
@@ -4,12 +4,17 @@ from dm.DateTimeUtil import DateTimeUtil
 from mysql.connector.errors import DataError
 from mysql.connector.errors import Error
 import logging
+import os
+import tempfile
 
 __author__ = 'Peter Tisovčík'
 __email__ = 'xtisov00@stud.fit.vutbr.cz'
 
 
 class DBUtil:
+    # MySQL error code of duplicate key
+    ER_DUP_ENTRY = 1062
+
     @staticmethod
     def create_table(conn, table_name):
         '''
@@ -71,23 +76,27 @@ class DBUtil:
         ]
 
     @staticmethod
-    def insert_value(conn, task, enable_commit, table_name):
-        sql = 'INSERT INTO ' + table_name + ' ('
+    def insert_value_sql(table_name, ignore_duplicates=False):
+        """Insert of one row, if duplicates are ignored, the row with existing key is kept.
+
+        INSERT IGNORE is not used, because it also turns out of range values and truncated
+        values into warnings.
+        """
 
         names = DBUtil.measured_values_table_column_names()
 
-        for i in range(0, len(names)):
-            sql += names[i]
-            if i != len(names) - 1:
-                sql += ','
+        sql = 'INSERT INTO ' + table_name + ' (' + ','.join(names) + ')'
+        sql += ' VALUES (' + ','.join(['%s'] * len(names)) + ')'
 
-        sql += ') VALUES ('
-        for i in range(0, len(names)):
-            sql += '%s'
-            if i != len(names) - 1:
-                sql += ','
+        if ignore_duplicates:
+            sql += ' ON DUPLICATE KEY UPDATE measured_time = measured_time'
 
-        sql += ')'
+        return sql
+
+    @staticmethod
+    def insert_value(conn, task, enable_commit, table_name, sql=None):
+        if sql is None:
+            sql = DBUtil.insert_value_sql(table_name)
 
         # if a key is duplicate, it is ignored
         try:
@@ -102,6 +111,73 @@ class DBUtil:
         if enable_commit:
             conn.commit()
 
+    @staticmethod
+    def insert_many(conn, tasks, enable_commit, table_name, batch_size=5000):
+        """Inserts rows in batches using one prepared statement, duplicate keys are ignored.
+
+        Other errors (e.g. out of range values) end the program as in insert_value.
+
+        :param conn: connection with database
+        :param tasks: list of tuples with values in order of measured_values_table_column_names()
+        :param enable_commit: commit after insertion of all rows
+        :param table_name: table name
+        :param batch_size: number of rows inserted using one query
+        """
+
+        sql = DBUtil.insert_value_sql(table_name, ignore_duplicates=True)
+        cur = conn.cursor()
+
+        for i in range(0, len(tasks), batch_size):
+            try:
+                cur.executemany(sql, tasks[i:i + batch_size])
+            except DataError as e:
+                logging.exception(e)
+                exit(1)
+
+        if enable_commit:
+            conn.commit()
+
+    @staticmethod
+    def load_data_infile(conn, tasks, enable_commit, table_name):
+        """Inserts rows using LOAD DATA LOCAL INFILE from a temporary tsv file.
+
+        Connection must be created with enabled local infile, duplicate keys are ignored.
+        Server reports errors of LOCAL data only as warnings, so warnings other than
+        duplicate keys end the program as errors in insert_value.
+
+        :param conn: connection with database
+        :param tasks: list of tuples with values in order of measured_values_table_column_names()
+        :param enable_commit: commit after insertion of all rows
+        :param table_name: table name
+        """
+
+        names = DBUtil.measured_values_table_column_names()
+
+        with tempfile.NamedTemporaryFile('w', suffix='.tsv', delete=False) as f:
+            filename = f.name
+            for task in tasks:
+                f.write('\t'.join(['\\N' if x is None else str(x) for x in task]) + '\n')
+
+        sql = "LOAD DATA LOCAL INFILE '{0}' IGNORE INTO TABLE {1}".format(filename, table_name)
+        sql += " FIELDS TERMINATED BY '\\t' LINES TERMINATED BY '\\n'"
+        sql += ' (' + ','.join(names) + ')'
+
+        try:
+            cur = conn.cursor()
+            cur.execute(sql)
+        finally:
+            os.remove(filename)
+
+        cur.execute('SHOW WARNINGS')
+        warnings = [x for x in cur.fetchall() if x[1] != DBUtil.ER_DUP_ENTRY]
+        if warnings:
+            for level, code, message in warnings:
+                logging.error('{0} {1}: {2}'.format(level, code, message))
+            exit(1)
+
+        if enable_commit:
+            conn.commit()
+
     @staticmethod
     def last_inserted_open_close_state(conn, table_name):
         return DBUtil.last_inserted_values(conn, table_name)[2]
@@ -1,6 +1,9 @@
 """Converts various time formats (one to another).
 """
+import bisect
 import datetime
+import numbers
+import numpy as np
 import pytz
 
 __author__ = 'Klára Nečasová'
@@ -8,6 +11,30 @@ __email__ = 'xnecas24@stud.fit.vutbr.cz'
 
 
 class DateTimeUtil:
+    # (timezone, hour of local time) -> offset from UTC in seconds
+    __UTC_OFFSETS = {}
+
+    # timezone -> pytz timezone
+    __TIMEZONES = {}
+
+    # timezone -> (UTC timestamps of transitions, offsets from UTC in seconds after transition)
+    __TRANSITIONS = {}
+
+    # directives of strftime that are supported by utc_timestamps_to_str and their positions
+    # in ISO 8601 string (YYYY-MM-DDTHH:MM:SS)
+    __ISO_POSITIONS = {
+        'Y': range(0, 4),
+        'm': range(5, 7),
+        'd': range(8, 10),
+        'H': range(11, 13),
+        'M': range(14, 16),
+        'S': range(17, 19),
+    }
+
+    # timestamps of the first second of years 1000 and 10000
+    __YEAR_1000 = -30610224000
+    __YEAR_10000 = 253402300800
+
     @staticmethod
     def local_time_str_to_utc(date_str, timezone='Europe/Prague', format='%Y/%m/%d %H:%M:%S'):
         # https://www.saltycrane.com/blog/2009/05/converting-time-zones-datetime-objects-python/
@@ -17,19 +44,166 @@ class DateTimeUtil:
 
         return datetime_obj_pacific
 
+    @staticmethod
+    def __utc_offset(timezone, local_hour):
+        """Offset of local time from UTC, it is the same during whole hour of local time,
+        because transitions of daylight saving time (e.g. in Europe) are at the start of an hour.
+        """
+
+        key = (timezone, local_hour)
+        if key not in DateTimeUtil.__UTC_OFFSETS:
+            naive = datetime.datetime(1970, 1, 1) + datetime.timedelta(hours=local_hour)
+            offset = pytz.timezone(timezone).localize(naive).utcoffset()
+            DateTimeUtil.__UTC_OFFSETS[key] = int(offset.total_seconds())
+
+        return DateTimeUtil.__UTC_OFFSETS[key]
+
+    @staticmethod
+    def local_time_str_to_utc_timestamps(values, timezone='Europe/Prague',
+                                         format='%Y/%m/%d %H:%M:%S'):
+        """Conversion of many strings with local time to UTC timestamps, results are the same
+        as timestamps of local_time_str_to_utc.
+
+        :return: numpy array of timestamps
+        """
+
+        values = np.asarray(values, dtype=str)
+        if len(values) == 0:
+            return np.empty(0, dtype=np.int64)
+
+        try:
+            if format != '%Y/%m/%d %H:%M:%S':
+                raise ValueError('format is not supported by numpy')
+
+            iso = np.char.replace(np.char.replace(values, '/', '-'), ' ', 'T')
+            naive = iso.astype('datetime64[s]').astype(np.int64)
+        except ValueError:
+            naive = np.array([
+                (datetime.datetime.strptime(x, format) - datetime.datetime(1970, 1, 1))
+                // datetime.timedelta(seconds=1) for x in values.tolist()
+            ], dtype=np.int64)
+
+        hours, inverse = np.unique(naive // 3600, return_inverse=True)
+        offsets = np.array([DateTimeUtil.__utc_offset(timezone, x) for x in hours.tolist()],
+                           dtype=np.int64)
+
+        return naive - offsets[inverse.reshape(-1)]
+
+    @staticmethod
+    def __timezone(timezone):
+        if timezone not in DateTimeUtil.__TIMEZONES:
+            DateTimeUtil.__TIMEZONES[timezone] = pytz.timezone(timezone)
+
+        return DateTimeUtil.__TIMEZONES[timezone]
+
+    @staticmethod
+    def __transitions(timezone):
+        """Table of transitions between standard and daylight saving time, the same table
+        is used by pytz for conversion from UTC to local time.
+        """
+
+        if timezone not in DateTimeUtil.__TRANSITIONS:
+            tz = DateTimeUtil.__timezone(timezone)
+            epoch = datetime.datetime(1970, 1, 1)
+
+            if hasattr(tz, '_utc_transition_times'):
+                times = [(x - epoch) // datetime.timedelta(seconds=1)
+                         for x in tz._utc_transition_times]
+                offsets = [int(x[0].total_seconds()) for x in tz._transition_info]
+            else:
+                times = [(datetime.datetime.min - epoch) // datetime.timedelta(seconds=1)]
+                offsets = [int(tz.utcoffset(epoch).total_seconds())]
+
+            DateTimeUtil.__TRANSITIONS[timezone] = (times, offsets)
+
+        return DateTimeUtil.__TRANSITIONS[timezone]
+
+    @staticmethod
+    def utc_offsets(timestamps, timezone='Europe/Prague'):
+        """Offsets of local time from UTC in seconds for array of UTC timestamps."""
+
+        times, offsets = DateTimeUtil.__transitions(timezone)
+        indexes = np.searchsorted(np.array(times, dtype=np.int64),
+                                  np.asarray(timestamps, dtype=np.int64), side='right') - 1
+
+        return np.array(offsets, dtype=np.int64)[np.maximum(indexes, 0)]
+
     @staticmethod
     def utc_timestamp_to_local_time(timestamp, timezone='Europe/Prague'):
-        utc = datetime.datetime.fromtimestamp(timestamp, pytz.timezone('UTC'))
-        local_time = utc.astimezone(pytz.timezone(timezone))
+        utc = datetime.datetime.fromtimestamp(timestamp, DateTimeUtil.__timezone('UTC'))
+        local_time = utc.astimezone(DateTimeUtil.__timezone(timezone))
 
         return local_time
 
     @staticmethod
-    def utc_timestamp_to_str(timestamp, format='%Y-%m-%d %H:%M:%S'):
-        local_time = DateTimeUtil.utc_timestamp_to_local_time(timestamp, 'Europe/Prague')
+    def utc_timestamp_to_str(timestamp, format='%Y-%m-%d %H:%M:%S', timezone='Europe/Prague'):
+        if not isinstance(timestamp, numbers.Integral) or '%z' in format or '%Z' in format:
+            local_time = DateTimeUtil.utc_timestamp_to_local_time(timestamp, timezone)
+            return local_time.strftime(format)
+
+        times, offsets = DateTimeUtil.__transitions(timezone)
+        offset = offsets[max(bisect.bisect_right(times, timestamp) - 1, 0)]
+        local_time = datetime.datetime(1970, 1, 1) + datetime.timedelta(seconds=timestamp + offset)
 
         return local_time.strftime(format)
 
+    @staticmethod
+    def __iso_columns(format):
+        """Positions of characters of formatted string in ISO 8601 string and literal
+        characters (position is None), None if format contains unsupported directive.
+        """
+
+        out = []
+        i = 0
+        while i < len(format):
+            if format[i] != '%':
+                out.append((None, format[i]))
+                i += 1
+                continue
+
+            directive = format[i + 1:i + 2]
+            if directive == '%':
+                out.append((None, '%'))
+            elif directive in DateTimeUtil.__ISO_POSITIONS:
+                out += [(x, None) for x in DateTimeUtil.__ISO_POSITIONS[directive]]
+            else:
+                return None
+            i += 2
+
+        return out
+
+    @staticmethod
+    def utc_timestamps_to_str(timestamps, format='%Y-%m-%d %H:%M:%S', timezone='Europe/Prague'):
+        """Conversion of many UTC timestamps to strings with local time, results are the same
+        as results of utc_timestamp_to_str.
+
+        :return: list of strings
+        """
+
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        columns = DateTimeUtil.__iso_columns(format)
+
+        if len(timestamps) == 0:
+            return []
+
+        if columns is None or not columns:
+            return [DateTimeUtil.utc_timestamp_to_str(x, format, timezone)
+                    for x in timestamps.tolist()]
+
+        local = timestamps + DateTimeUtil.utc_offsets(timestamps, timezone)
+        if local.min() < DateTimeUtil.__YEAR_1000 or local.max() >= DateTimeUtil.__YEAR_10000:
+            # years with other than 4 digits
+            return [DateTimeUtil.utc_timestamp_to_str(x, format, timezone)
+                    for x in timestamps.tolist()]
+
+        iso = np.datetime_as_string(local.astype('datetime64[s]')).astype('U19')
+        chars = iso.view('U1').reshape(len(iso), 19)
+        out = np.empty((len(iso), len(columns)), dtype='U1')
+        for i, (position, literal) in enumerate(columns):
+            out[:, i] = literal if position is None else chars[:, position]
+
+        return out.view('U%d' % len(columns)).ravel().tolist()
+
     @staticmethod
     def create_interval_str(start, end):
         out = DateTimeUtil.utc_timestamp_to_str(start)
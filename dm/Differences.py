@@ -2,9 +2,11 @@
 """
 from dm.Storage import Storage
 from dm.DateTimeUtil import DateTimeUtil
-from scipy import stats
+from dm.LazyModule import LazyModule
 import logging
 
+stats = LazyModule('scipy.stats')
+
 __author__ = 'Klára Nečasová'
 __email__ = 'xnecas24@stud.fit.vutbr.cz'
 
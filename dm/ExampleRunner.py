@@ -1,9 +1,13 @@
 """Runs detector or more detectors.
 """
+from concurrent.futures import ThreadPoolExecutor
 from dm.ConnectionUtil import ConnectionUtil
 from dm.Performance import Performance
 from os.path import abspath
-from subprocess import run
+from subprocess import PIPE, run
+import logging
+import os
+import time
 
 __author__ = 'Peter Tisovčík'
 __email__ = 'xtisov00@stud.fit.vutbr.cz'
@@ -17,20 +21,135 @@ class ExampleRunner:
         if enable_training:
             run(['python3', script_name], universal_newlines=True)
 
-        run([launcher, process], universal_newlines=True)
+        res = ExampleRunner.evaluate_processes(launcher, [process], '.', 'testing.csv',
+                                               before, after)[0]
 
-        p = Performance(abspath('out.csv'))
+        if res['simple'] is not None:
+            print(res['simple_table'])
+            print(res['with_delay_table'])
 
-        table, _, _ = p.simple()
-        print(table)
+            for row in res['wrong']:
+                print(row)
 
-        table, wrong, _ = p.with_delay(before, after)
-        print(table)
+        run(['notify-send', 'PyCharm', 'Koniec generovania'])
+
+    @staticmethod
+    def __file_state(filename):
+        if not os.path.isfile(filename):
+            return None
 
-        for row in wrong:
-            print(row)
+        stat = os.stat(filename)
+        return stat.st_mtime_ns, stat.st_size
 
-        run(['notify-send', 'PyCharm', 'Koniec generovania'])
+    @staticmethod
+    def __evaluate_process(launcher, process, directory, testing_file, before, after, isolate,
+                           shared_output_file):
+        """Runs one RapidMiner process and evaluates its output file.
+
+        Paths of testing and output file are passed to the process in macros testing_file
+        and output_file. If the process is isolated, it is run in its own directory, where
+        only its output file is stored, testing file is shared by all processes.
+
+        :raise RuntimeError: if the isolated process did not create its output file, but
+                             it changed the shared output file, i.e. the process does not
+                             use macro output_file and results of processes would collide
+        """
+
+        output_file = os.path.join(directory, 'out.csv')
+
+        if isolate and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        cmd = [launcher,
+               '-Mtesting_file={0}'.format(abspath(testing_file)),
+               '-Moutput_file={0}'.format(abspath(output_file)),
+               process]
+
+        if os.path.isfile(output_file):
+            os.remove(output_file)
+
+        shared_state = ExampleRunner.__file_state(shared_output_file)
+
+        res = {
+            'process': process,
+            'directory': directory,
+            'simple': None,
+            'simple_table': '',
+            'with_delay': None,
+            'with_delay_table': '',
+            'wrong': [],
+            'records': 0,
+        }
+
+        start_time = time.monotonic()
+        result = run(cmd, cwd=directory if isolate else None, stdout=PIPE, stderr=PIPE,
+                     universal_newlines=True)
+        res['run_time'] = time.monotonic() - start_time
+        res['returncode'] = result.returncode
+        res['evaluation_time'] = 0
+
+        if result.returncode != 0:
+            logging.error('{0}: process failed with return code {1}:\n{2}'.format(
+                process, result.returncode, result.stderr.strip()))
+
+        if not os.path.isfile(output_file):
+            if isolate and ExampleRunner.__file_state(shared_output_file) != shared_state:
+                raise RuntimeError('{0}: output file was not created, but shared output file '
+                                   '{1} was changed, process must write its output to '
+                                   '%{{output_file}}'.format(process, shared_output_file))
+
+            logging.error('{0}: output file was not created'.format(process))
+            return res
+
+        start_time = time.monotonic()
+        p = Performance(abspath(output_file))
+        res['simple_table'], _, res['simple'] = p.simple()
+        res['with_delay_table'], res['wrong'], res['with_delay'] = p.with_delay(before, after)
+        res['records'] = p.count
+        res['evaluation_time'] = time.monotonic() - start_time
+
+        return res
+
+    @staticmethod
+    def evaluate_processes(launcher, processes, directory, testing_file, before, after,
+                           workers=1):
+        """Runs RapidMiner processes and evaluates their results.
+
+        If more workers are given, processes are run concurrently, each of them in its own
+        directory directory/runs/<index>_<name> so their output files do not collide.
+        Otherwise all processes use directory/out.csv one after another. Paths of testing
+        and output file are passed to processes in macros testing_file and output_file.
+
+        :param launcher: RapidMiner launcher
+        :param processes: list of RapidMiner processes
+        :param directory: directory with testing.csv
+        :param testing_file: file with testing set
+        :param before: tolerance interval before event
+        :param after: tolerance interval after event
+        :param workers: maximal number of concurrently running processes
+        :return: list of results in the same order as processes, result contains confusion
+                 matrices (simple, with_delay) and their tables, wrong predictions, number
+                 of records, run time and evaluation time of process
+        """
+
+        isolate = workers > 1
+
+        jobs = []
+        for i, process in enumerate(processes):
+            process_dir = directory
+            if isolate:
+                name = process.strip('/').replace('/', '_')
+                process_dir = os.path.join(directory, 'runs', '{0:02}_{1}'.format(i, name))
+
+            jobs.append((launcher, process, process_dir, testing_file, before, after, isolate,
+                         os.path.join(directory, 'out.csv')))
+
+        if not isolate:
+            return [ExampleRunner.__evaluate_process(*x) for x in jobs]
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(ExampleRunner.__evaluate_process, *x) for x in jobs]
+            return [x.result() for x in futures]
 
     @staticmethod
     def feature_stats(script_name, enable_training):
@@ -0,0 +1,255 @@
+"""Cache of computed training and testing sets.
+
+Sets are identified by table name, hash of events (or time range), fingerprint of function
+that computes attributes and fingerprints of selectors. If the function is a FeaturePlan, each entry of the plan has its own
+fingerprint and attributes of entries are stored separately, so after a change of the plan only
+attributes of changed entries are computed. Training sets are stored as compressed numpy
+archives, testing sets as compressed csv files. Total size of the cache is limited and the
+least recently used files are removed first.
+"""
+from dm.FeaturePlan import FeaturePlan
+import gzip
+import hashlib
+import json
+import logging
+import numbers
+import numpy as np
+import os
+import shutil
+import threading
+
+__author__ = 'Peter Tisovčík'
+__email__ = 'xtisov00@stud.fit.vutbr.cz'
+
+
+class FeatureCache:
+    def __init__(self, directory, max_size=2 * 1024 ** 3):
+        """
+        :param directory: directory where sets are stored
+        :param max_size: maximal size of all stored sets in bytes
+        """
+
+        self.directory = directory
+        self.max_size = max_size
+        self.__lock = threading.Lock()
+
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+
+    @staticmethod
+    def __hash(description):
+        return hashlib.sha1(json.dumps(description).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def selector_fingerprint(selector):
+        """Name and hash of source code of selector class (or selector), None if selector
+        is not used.
+        """
+
+        if selector is None:
+            return None
+
+        cls = selector if isinstance(selector, type) else type(selector)
+        return [cls.__module__ + '.' + cls.__qualname__, FeaturePlan.class_fingerprint(cls)]
+
+    @staticmethod
+    def training_key(table_name, events, event_type, row_selector=None,
+                     interval_selector=None):
+        """Key of training set computed from given events using given selectors."""
+
+        times = []
+        for event in events:
+            times.append([event['e_start']['timestamp'], event['e_end']['timestamp'],
+                          event['no_event_time_shift']])
+
+        time_range = None
+        if times:
+            time_range = [min(x[0] for x in times), max(x[1] for x in times)]
+
+        events_hash = FeatureCache.__hash(times)
+        return FeatureCache.__hash(['training', table_name, event_type, time_range, events_hash,
+                                    FeatureCache.selector_fingerprint(row_selector),
+                                    FeatureCache.selector_fingerprint(interval_selector)])
+
+    @staticmethod
+    def testing_key(table_name, start, end, write_each, event_type, func, row_selector=None,
+                    interval_selector=None):
+        """Key of testing set computed from interval <start, end> using given function
+        and selectors.
+        """
+
+        fingerprints = [x[0] for x in FeatureCache.fingerprints(func)]
+        return FeatureCache.__hash(['testing', table_name, start, end, write_each, event_type,
+                                    fingerprints,
+                                    FeatureCache.selector_fingerprint(row_selector),
+                                    FeatureCache.selector_fingerprint(interval_selector)])
+
+    @staticmethod
+    def fingerprints(func):
+        """Fingerprints of parts of function that can be computed separately.
+
+        :return: list of pairs (fingerprint, function that computes only this part)
+        """
+
+        if isinstance(func, FeaturePlan):
+            return [(fp, func.subplan([i])) for i, fp in enumerate(func.fingerprints())]
+
+        return [(FeaturePlan.source_fingerprint(func), func)]
+
+    def __key_dir(self, key):
+        return os.path.join(self.directory, key)
+
+    def __parts(self, key):
+        key_dir = self.__key_dir(key)
+        if not os.path.isdir(key_dir):
+            return []
+
+        return [os.path.join(key_dir, x) for x in sorted(os.listdir(key_dir)) if x.endswith('.npz')]
+
+    def load_columns(self, key, fingerprints):
+        """Stored attributes of parts with given fingerprints.
+
+        :return: dictionary fingerprint -> (names, row keys, values, integer columns)
+        """
+
+        out = {}
+        for filename in self.__parts(key):
+            try:
+                with np.load(filename, allow_pickle=False) as data:
+                    entries = data['entries'].tolist()
+                    if not set(entries) & set(fingerprints):
+                        continue
+
+                    names = data['names'].tolist()
+                    keys = [tuple(x) for x in data['keys'].tolist()]
+                    values = data['values']
+                    ints = data['ints']
+                    bounds = np.concatenate(([0], np.cumsum(data['widths']))).tolist()
+            except (OSError, ValueError, KeyError) as e:
+                logging.warning('invalid cache file %s: %s' % (filename, e))
+                continue
+
+            for i, fp in enumerate(entries):
+                if fp not in fingerprints or fp in out:
+                    continue
+
+                s = slice(bounds[i], bounds[i + 1])
+                out[fp] = (names[s], keys, values[:, s], ints[s])
+
+            os.utime(filename)
+
+        return out
+
+    def store_columns(self, key, fingerprints, widths, names, keys, values, ints):
+        """Stores attributes of parts with given fingerprints (widths are numbers of columns
+        of each part).
+        """
+
+        if not keys:
+            return
+
+        key_dir = self.__key_dir(key)
+        if not os.path.isdir(key_dir):
+            os.makedirs(key_dir)
+
+        filename = os.path.join(key_dir, self.__hash(fingerprints) + '.npz')
+        tmp_filename = '{0}.{1}.tmp.npz'.format(filename[:-4], threading.get_ident())
+
+        np.savez_compressed(tmp_filename,
+                            entries=np.array(fingerprints, dtype=str),
+                            widths=np.array(widths, dtype=np.int64),
+                            names=np.array(names, dtype=str),
+                            keys=np.array(keys, dtype=str).reshape(len(keys), -1),
+                            values=np.asarray(values, dtype=np.float64).reshape(len(keys), -1),
+                            ints=np.array(ints, dtype=bool))
+        os.replace(tmp_filename, filename)
+
+        self.evict()
+
+    @staticmethod
+    def rows_to_columns(rows, key_columns):
+        """Conversion of list of OrderedDict into names, row keys, matrix of values
+        and flags of integer columns. Returns None if some value is not a number.
+        """
+
+        if not rows:
+            return [], [], np.empty((0, 0)), []
+
+        names = [x for x in rows[0].keys() if x not in key_columns]
+        keys = [tuple(str(row[x]) for x in key_columns) for row in rows]
+
+        values = np.empty((len(rows), len(names)))
+        ints = [True] * len(names)
+        for i, row in enumerate(rows):
+            if list(row.keys())[len(key_columns):] != names:
+                return None
+
+            for j, name in enumerate(names):
+                value = row[name]
+                if isinstance(value, bool) or not isinstance(value, numbers.Real):
+                    return None
+
+                if not isinstance(value, numbers.Integral):
+                    ints[j] = False
+                values[i, j] = value
+
+        return names, keys, values, ints
+
+    def load_file(self, key, filename):
+        """Copies stored testing set to given file, returns False if it is not stored."""
+
+        stored = os.path.join(self.directory, key + '.csv.gz')
+        if not os.path.isfile(stored):
+            return False
+
+        with gzip.open(stored, 'rb') as f_in, open(filename, 'wb') as f_out:
+            shutil.copyfileobj(f_in, f_out)
+
+        os.utime(stored)
+        return True
+
+    def store_file(self, key, filename):
+        stored = os.path.join(self.directory, key + '.csv.gz')
+        tmp_filename = '{0}.{1}.tmp'.format(stored, threading.get_ident())
+
+        with open(filename, 'rb') as f_in, gzip.open(tmp_filename, 'wb') as f_out:
+            shutil.copyfileobj(f_in, f_out)
+
+        os.replace(tmp_filename, stored)
+        self.evict()
+
+    def __files(self):
+        out = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if '.tmp' in name:
+                    continue
+
+                filename = os.path.join(root, name)
+                try:
+                    out.append((os.path.getmtime(filename), os.path.getsize(filename), filename))
+                except OSError:
+                    continue
+
+        return out
+
+    def evict(self):
+        """Removes the least recently used files until total size is less than max_size."""
+
+        with self.__lock:
+            files = sorted(self.__files())
+            size = sum(x[1] for x in files)
+
+            for _, file_size, filename in files:
+                if size <= self.max_size:
+                    break
+
+                try:
+                    os.remove(filename)
+                except OSError:
+                    continue
+                size -= file_size
+
+                directory = os.path.dirname(filename)
+                if directory != self.directory and not os.listdir(directory):
+                    os.rmdir(directory)
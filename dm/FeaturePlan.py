@@ -0,0 +1,368 @@
+"""Declarative description of attributes computed for one timestamp.
+
+Plan contains attribute classes with arguments of their execute method and statistics
+computed from their results. Before computation, the plan is compiled into the minimal set
+of distinct (column, offset) lookups, values of all lookups are selected once and all
+attributes are computed from these values. Plan can be used instead of func
+in AttributeUtil, because it is callable with the same arguments.
+"""
+from collections import OrderedDict
+from dm.DateTimeUtil import DateTimeUtil
+from dm.selectors.row.AbstractRowSelector import AbstractRowSelector
+import hashlib
+import inspect
+import json
+import math
+import numpy as np
+
+__author__ = 'Peter Tisovčík'
+__email__ = 'xtisov00@stud.fit.vutbr.cz'
+
+
+class GatheredRowSelector(AbstractRowSelector):
+    """Selector of values selected in advance, other values are selected using given selector.
+    """
+
+    def __init__(self, row_selector, values=None, arrays=None):
+        """
+        :param row_selector: selector used for values that were not selected in advance
+        :param values: dictionary (column, time) -> value
+        :param arrays: dictionary column -> (time of the first value, array of values,
+                       boolean array of selected values)
+        """
+
+        self.row_selector = row_selector
+        self.values = {} if values is None else values
+        self.arrays = {} if arrays is None else arrays
+
+        con = getattr(row_selector, 'con', None)
+        table_name = getattr(row_selector, 'table_name', None)
+        super(GatheredRowSelector, self).__init__(con, table_name)
+
+    def row(self, column_name, time):
+        key = (column_name, time)
+        if key in self.values:
+            return self.values[key]
+
+        if column_name in self.arrays:
+            start, values, selected = self.arrays[column_name]
+            index = time - start
+
+            if 0 <= index < len(values) and selected[index]:
+                value = float(values[index])
+                if math.isnan(value):
+                    t = DateTimeUtil.utc_timestamp_to_str(time, '%Y/%m/%d %H:%M:%S')
+                    raise ValueError('empty value at %s' % t)
+
+                return value
+
+        return self.row_selector.row(column_name, time)
+
+    def clear(self):
+        self.values = {}
+        self.arrays = {}
+
+
+class FeaturePlan:
+    STATISTICS = ['geometric_mean', 'arithmetic_mean', 'variance', 'standard_deviation']
+
+    def __init__(self, precision, transform=None):
+        """
+        :param precision: number of decimal places of all attributes
+        :param transform: function (value, interval) applied on values of attributes
+        """
+
+        self.precision = precision
+        self.transform = transform
+        self.entries = []
+        self.widths = None
+        self.__lookups = None
+
+    def add(self, attr_class, statistics=None, statistics_prefix='', swap_statistics=False,
+            **kwargs):
+        """Adds attribute to the plan.
+
+        :param attr_class: subclass of AbstractPrepareAttr
+        :param statistics: None, 'all' for all statistics (AbstractPrepareAttr.statistics)
+                           or name of one statistic, e.g. 'arithmetic_mean'
+        :param statistics_prefix: prefix of statistics attributes
+        :param swap_statistics: statistics are computed with swapped values before and after,
+                                i.e. op.statistics(column, precision, after, before, prefix)
+        :param kwargs: arguments of execute method without timestamp and precision
+        :return: plan
+        """
+
+        if statistics is not None and statistics != 'all' and statistics not in self.STATISTICS:
+            raise ValueError('unknown statistics: %s' % statistics)
+
+        self.entries.append({
+            'attr_class': attr_class,
+            'statistics': statistics,
+            'statistics_prefix': statistics_prefix,
+            'swap_statistics': swap_statistics,
+            'kwargs': kwargs,
+        })
+        self.__lookups = None
+
+        return self
+
+    def __attr(self, con, table_name, row_selector, interval_selector, entry):
+        return entry['attr_class'](con, table_name, row_selector, interval_selector,
+                                   self.transform)
+
+    def compile(self):
+        """Minimal set of lookups needed by all attributes of plan.
+
+        :return: dictionary column -> sorted list of distinct time offsets
+        """
+
+        if self.__lookups is not None:
+            return self.__lookups
+
+        lookups = OrderedDict()
+        for entry in self.entries:
+            op = self.__attr(None, None, None, None, entry)
+            offsets = op.offsets(**entry['kwargs'])
+            if offsets is None:
+                continue
+
+            for column, offset in offsets:
+                if column not in lookups:
+                    lookups[column] = set()
+                lookups[column].add(offset)
+
+        self.__lookups = OrderedDict((k, sorted(v)) for k, v in lookups.items())
+        return self.__lookups
+
+    @staticmethod
+    def source_fingerprint(obj):
+        """Hash of source code of function or class, name is used if source is not available.
+        """
+
+        if obj is None:
+            return 'None'
+
+        try:
+            source = inspect.getsource(obj)
+        except (OSError, TypeError):
+            source = '{0}.{1}'.format(getattr(obj, '__module__', ''),
+                                      getattr(obj, '__qualname__', repr(obj)))
+
+        return hashlib.sha1(source.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def class_fingerprint(cls):
+        """Hash of source code of class and its base classes from package dm, so it changes
+        also if an inherited method (e.g. statistics of AbstractPrepareAttr) changes.
+        """
+
+        sources = []
+        for base in cls.__mro__:
+            if base is cls or base.__module__.split('.')[0] == 'dm':
+                sources.append(FeaturePlan.source_fingerprint(base))
+
+        return hashlib.sha1(json.dumps(sources).encode('utf-8')).hexdigest()
+
+    def fingerprints(self):
+        """Stable hash of each entry, it changes if arguments or source of attribute
+        (including its base classes) change.
+        """
+
+        out = []
+        for entry in self.entries:
+            description = [
+                entry['attr_class'].__module__ + '.' + entry['attr_class'].__qualname__,
+                self.class_fingerprint(entry['attr_class']),
+                self.source_fingerprint(self.transform),
+                self.precision,
+                entry['statistics'],
+                entry['statistics_prefix'],
+                entry['swap_statistics'],
+                sorted((k, repr(v)) for k, v in entry['kwargs'].items()),
+            ]
+            out.append(hashlib.sha1(json.dumps(description).encode('utf-8')).hexdigest())
+
+        return out
+
+    def subplan(self, indexes):
+        """Plan that contains only entries with given indexes."""
+
+        plan = FeaturePlan(self.precision, self.transform)
+        for i in indexes:
+            plan.entries.append(self.entries[i])
+
+        return plan
+
+    def lookup_count(self):
+        return sum(len(x) for x in self.compile().values())
+
+    def __statistics(self, op, entry, b, a):
+        column = entry['kwargs']['column']
+        prefix = entry['statistics_prefix']
+
+        if entry['statistics'] is None:
+            return []
+
+        if entry['swap_statistics']:
+            b, a = a, b
+
+        if entry['statistics'] == 'all':
+            return op.statistics(column, self.precision, b, a, prefix)
+
+        be, af = getattr(op, entry['statistics'])(column, self.precision, b, a, prefix)
+        return be + af
+
+    def gather(self, row_selector, timestamp):
+        """Selection of values of all lookups for given timestamp.
+
+        :return: dictionary (column, time) -> value
+        """
+
+        values = {}
+        for column, offsets in self.compile().items():
+            for offset in offsets:
+                values[(column, timestamp + offset)] = row_selector.row(column, timestamp + offset)
+
+        return values
+
+    def __call__(self, con, table_name, timestamp, row_selector, interval_selector):
+        selector = GatheredRowSelector(row_selector, self.gather(row_selector, timestamp))
+
+        attrs = []
+        widths = []
+        for entry in self.entries:
+            op = self.__attr(con, table_name, selector, interval_selector, entry)
+            b, a = op.execute(timestamp=timestamp, precision=self.precision, **entry['kwargs'])
+
+            out = b + a + self.__statistics(op, entry, b, a)
+            attrs += out
+            widths.append(len(out))
+
+        # number of attributes of each entry in the last computed row
+        self.widths = widths
+        return attrs
+
+    def gather_many(self, row_selector, timestamps):
+        """Selection of values of all lookups for given timestamps.
+
+        Each distinct time is selected only once, missing values are NaN.
+
+        :return: dictionary column -> (time of the first value, array of values,
+                 boolean array of selected values)
+        """
+
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        out = {}
+
+        for column, offsets in self.compile().items():
+            times = np.unique((timestamps[:, None] + np.asarray(offsets)[None, :]).ravel())
+            start = int(times[0])
+            values = np.full(int(times[-1]) - start + 1, np.nan)
+            selected = np.zeros(len(values), dtype=bool)
+            selected[times - start] = True
+
+            for time in times.tolist():
+                try:
+                    values[time - start] = row_selector.row(column, time)
+                except ValueError:
+                    continue
+
+            out[column] = (start, values, selected)
+
+        return out
+
+    def __statistics_many(self, op, entry, b, a):
+        column = entry['kwargs']['column']
+        prefix = entry['statistics_prefix']
+
+        if entry['statistics'] is None:
+            return [], None
+
+        if entry['swap_statistics']:
+            b, a = a, b
+
+        if entry['statistics'] == 'geometric_mean':
+            return op.geometric_mean_many(column, self.precision, b, a, prefix)
+
+        names, matrix = op.statistics_many(column, self.precision, b, a, prefix)
+        if entry['statistics'] == 'all':
+            return names, matrix
+
+        index = self.STATISTICS.index(entry['statistics'])
+        return names[2 * index:2 * index + 2], matrix[:, 2 * index:2 * index + 2]
+
+    def __execute_rows(self, con, table_name, timestamps, selector, interval_selector, entry):
+        """Computation of attribute without batch support for each timestamp separately."""
+
+        names = None
+        rows = []
+        for timestamp in timestamps.tolist():
+            op = self.__attr(con, table_name, selector, interval_selector, entry)
+            try:
+                b, a = op.execute(timestamp=timestamp, precision=self.precision,
+                                  **entry['kwargs'])
+                row = b + a + self.__statistics(op, entry, b, a)
+            except Exception:
+                rows.append(None)
+                continue
+
+            names = [x[0] for x in row]
+            rows.append([x[1] for x in row])
+
+        if names is None:
+            return [], np.empty((len(timestamps), 0)), np.zeros(len(timestamps), dtype=bool)
+
+        matrix = np.full((len(timestamps), len(names)), np.nan)
+        valid = np.zeros(len(timestamps), dtype=bool)
+        for i, row in enumerate(rows):
+            if row is not None:
+                matrix[i] = row
+                valid[i] = True
+
+        return names, matrix, valid
+
+    def evaluate_many(self, con, table_name, timestamps, row_selector, interval_selector):
+        """Computation of attributes for many timestamps at once.
+
+        Attributes with execute_many are computed for all timestamps together, the other
+        ones are computed for each timestamp from the same selected values.
+
+        :return: names of attributes, matrix with one row for each timestamp and boolean
+                 array of rows without missing value
+        """
+
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        arrays = self.gather_many(row_selector, timestamps)
+        selector = GatheredRowSelector(row_selector, arrays=arrays)
+
+        names = []
+        columns = []
+        valid = np.ones(len(timestamps), dtype=bool)
+        for entry in self.entries:
+            op = self.__attr(con, table_name, selector, interval_selector, entry)
+            column = entry['kwargs'].get('column')
+
+            if op.execute_many is None or column not in arrays:
+                n, matrix, ok = self.__execute_rows(con, table_name, timestamps, selector,
+                                                    interval_selector, entry)
+                names += n
+                columns.append(matrix)
+                valid &= ok
+                continue
+
+            start, values, _ = arrays[column]
+            (bn, b), (an, a) = op.execute_many(timestamps=timestamps, values=values,
+                                               values_start=start, precision=self.precision,
+                                               **entry['kwargs'])
+            names += bn + an
+            columns += [b, a]
+
+            n, matrix = self.__statistics_many(op, entry, b, a)
+            if matrix is not None:
+                names += n
+                columns.append(matrix)
+
+        matrix = np.hstack(columns) if columns else np.empty((len(timestamps), 0))
+        valid &= ~np.isnan(matrix).any(axis=1)
+
+        return names, matrix, valid
@@ -15,7 +15,6 @@ class Graph:
 
     @staticmethod
     def db_to_simple_graph(event, column, color, label, number_output_records):
-        x = []
         y = []
         length = len(event['measured'][column])
 
@@ -32,15 +31,11 @@ class Graph:
                 step += 1
 
         start = event['e_start']['timestamp'] + event['start_shift']
-        for i in range(0, length):
+        x = DateTimeUtil.utc_timestamps_to_str([start + i for i in range(0, length, step)],
+                                               '%H:%M:%S')
+        for i in range(0, length, step):
             value = event['measured'][column][i]
 
-            if i % step != 0:
-                continue
-
-            timestamp = start + i
-            x.append(DateTimeUtil.utc_timestamp_to_str(timestamp, '%H:%M:%S'))
-
             if value is None:
                 y.append('Null')
             else:
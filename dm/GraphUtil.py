@@ -1,9 +1,11 @@
 """Generates histogram, stacked barplot and grouped barplot.
 """
+from dm.LazyModule import LazyModule
 from dm.ValueUtil import ValueUtil
-import matplotlib.pyplot as plt
 import numpy as np
 
+plt = LazyModule('matplotlib.pyplot')
+
 __author__ = 'Peter Tisovčík'
 __email__ = 'xtisov00@stud.fit.vutbr.cz'
 
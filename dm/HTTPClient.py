@@ -1,16 +1,76 @@
 """REST api client with Bearer authentization.
 """
 import http.client
+import queue
 import ssl
+import threading
 
 __author__ = 'Klára Nečasová'
 __email__ = 'xnecas24@stud.fit.vutbr.cz'
 
 
+class HTTPConnectionPool:
+    """Pool of persistent https connections to one host and port."""
+
+    # errors of reused connection that was closed by server
+    RECONNECT_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine,
+                        http.client.CannotSendRequest, http.client.ResponseNotReady,
+                        http.client.NotConnected,
+                        BrokenPipeError, ConnectionResetError, ConnectionAbortedError)
+
+    __unverified_context = None
+    __context_lock = threading.Lock()
+
+    def __init__(self, host, port, verify_ssl_cert=True, max_size=8, timeout=10):
+        self.__host = host
+        self.__port = port
+        self.__verify_ssl_cert = verify_ssl_cert
+        self.__timeout = timeout
+        self.__idle = queue.LifoQueue(maxsize=max_size)
+
+    @staticmethod
+    def unverified_context():
+        with HTTPConnectionPool.__context_lock:
+            if HTTPConnectionPool.__unverified_context is None:
+                HTTPConnectionPool.__unverified_context = ssl._create_unverified_context()
+
+        return HTTPConnectionPool.__unverified_context
+
+    def new_connection(self):
+        if self.__verify_ssl_cert:
+            return http.client.HTTPSConnection(self.__host, self.__port,
+                                               timeout=self.__timeout)
+
+        return http.client.HTTPSConnection(self.__host, self.__port,
+                                           context=self.unverified_context(),
+                                           timeout=self.__timeout)
+
+    def acquire(self):
+        """Returns idle connection or a new one, second value is True for reused connection."""
+
+        try:
+            return self.__idle.get_nowait(), True
+        except queue.Empty:
+            return self.new_connection(), False
+
+    def release(self, conn):
+        try:
+            self.__idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def close(self):
+        while True:
+            try:
+                self.__idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
 class HTTPClient:
     """Simple http client."""
 
-    def __init__(self, host, port, end_point, method, verify_ssl_cert=True):
+    def __init__(self, host, port, end_point, method, verify_ssl_cert=True, pool=None):
         self.__host = host
         self.__port = port
         self.__method = method
@@ -18,6 +78,7 @@ class HTTPClient:
         self.__headers = {}
         self.__body = None
         self.__verify_ssl_cert = verify_ssl_cert
+        self.__pool = pool
 
     def __setitem__(self, key, value):
         self.__headers[key] = value
@@ -34,18 +95,51 @@ class HTTPClient:
     def authorize(self, session_id):
         self.__headers['Authorization'] = 'Bearer ' + session_id
 
-    def perform(self):
-        if self.__verify_ssl_cert:
-            conn = http.client.HTTPSConnection(self.__host, self.__port, timeout=10)
-        else:
-            conn = http.client.HTTPSConnection(self.__host, self.__port,
-                                               context=ssl._create_unverified_context(),
-                                               timeout=10)
-
+    def __request(self, conn):
         conn.request(self.__method, self.__end_point,
                      headers=self.__headers, body=self.__body)
 
         response = conn.getresponse()
         content = str(response.read(), 'utf-8')
-        conn.close()
+        return response, content
+
+    def perform(self):
+        if self.__pool is None:
+            if self.__verify_ssl_cert:
+                conn = http.client.HTTPSConnection(self.__host, self.__port, timeout=10)
+            else:
+                conn = http.client.HTTPSConnection(
+                    self.__host, self.__port,
+                    context=HTTPConnectionPool.unverified_context(),
+                    timeout=10)
+
+            response, content = self.__request(conn)
+            conn.close()
+            return response, content
+
+        conn, reused = self.__pool.acquire()
+        try:
+            response, content = self.__request(conn)
+        except HTTPConnectionPool.RECONNECT_ERRORS:
+            conn.close()
+
+            # connection closed by server is replaced, new connection is not retried
+            if not reused:
+                raise
+
+            conn = self.__pool.new_connection()
+            try:
+                response, content = self.__request(conn)
+            except Exception:
+                conn.close()
+                raise
+        except Exception:
+            conn.close()
+            raise
+
+        if response.will_close:
+            conn.close()
+        else:
+            self.__pool.release(conn)
+
         return response, content
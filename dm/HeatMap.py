@@ -1,9 +1,11 @@
 """Graph representing heat map.
 """
-import matplotlib
-import matplotlib.pyplot as plt
+from dm.LazyModule import LazyModule
 import numpy as np
 
+plt = LazyModule('matplotlib.pyplot')
+ticker = LazyModule('matplotlib.ticker')
+
 __author__ = 'Peter Tisovčík'
 __email__ = 'xtisov00@stud.fit.vutbr.cz'
 
@@ -109,7 +111,7 @@ class HeatMap:
 
         # Get the formatter in case a string is supplied
         if isinstance(valfmt, str):
-            valfmt = matplotlib.ticker.StrMethodFormatter(valfmt)
+            valfmt = ticker.StrMethodFormatter(valfmt)
 
         # Loop over the data and create a `Text` for each "pixel".
         # Change the text's color depending on the data.
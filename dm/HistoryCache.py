@@ -0,0 +1,126 @@
+"""Disk cache for history responses of BeeeOn server.
+
+Responses are stored in files named by hash of the request parameters. Total size of the
+cache is limited and the least recently used responses are removed first. Responses of
+intervals that end close to the time of download can still change on server, so they
+expire after given time.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+__author__ = 'Klára Nečasová'
+__email__ = 'xnecas24@stud.fit.vutbr.cz'
+
+
+class HistoryCache:
+    def __init__(self, directory, max_size=1024 ** 3, ttl=600, recent=3600, offline=False):
+        """
+        :param directory: directory where responses are stored
+        :param max_size: maximal size of all stored responses in bytes
+        :param ttl: validity of response (in seconds) for interval that ends in recent time
+        :param recent: interval ending later than (time of download - recent) is recent
+        :param offline: responses are served only from cache
+        """
+
+        self.__directory = directory
+        self.__max_size = max_size
+        self.__ttl = ttl
+        self.__recent = recent
+        self.offline = offline
+        self.__lock = threading.Lock()
+
+        if not os.path.isdir(self.__directory):
+            os.makedirs(self.__directory)
+
+        self.__size = 0
+        for filename in self.__files():
+            self.__size += os.path.getsize(filename)
+
+    @staticmethod
+    def key(*params):
+        """Key of request, e.g. (host, gateway, device, sensor, start, end, interval, aggregation).
+        """
+
+        return hashlib.sha1(json.dumps([str(x) for x in params]).encode('utf-8')).hexdigest()
+
+    def __files(self):
+        return [os.path.join(self.__directory, x) for x in os.listdir(self.__directory)
+                if x.endswith('.json')]
+
+    def __filename(self, key):
+        return os.path.join(self.__directory, key + '.json')
+
+    def get(self, key):
+        """Returns stored body of response or None if response is missing or expired."""
+
+        filename = self.__filename(key)
+
+        try:
+            with open(filename, 'r') as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if not self.offline and record['expires'] is not None and record['expires'] < time.time():
+            return None
+
+        # time of last modification is used as time of last usage
+        try:
+            os.utime(filename)
+        except OSError:
+            pass
+
+        return record['body']
+
+    def put(self, key, body, end):
+        """Stores body of response of interval that ends in given time."""
+
+        now = time.time()
+        record = {
+            'created': now,
+            'expires': now + self.__ttl if end > now - self.__recent else None,
+            'body': body,
+        }
+
+        filename = self.__filename(key)
+        tmp_filename = '{0}.{1}.tmp'.format(filename, threading.get_ident())
+        with open(tmp_filename, 'w') as f:
+            json.dump(record, f)
+
+        with self.__lock:
+            if os.path.isfile(filename):
+                self.__size -= os.path.getsize(filename)
+
+            os.replace(tmp_filename, filename)
+            self.__size += os.path.getsize(filename)
+
+            if self.__size > self.__max_size:
+                self.__evict()
+
+    def __evict(self):
+        files = []
+        for filename in self.__files():
+            try:
+                files.append((os.path.getmtime(filename), os.path.getsize(filename), filename))
+            except OSError:
+                continue
+
+        files.sort()
+        for _, size, filename in files:
+            if self.__size <= self.__max_size:
+                break
+
+            try:
+                os.remove(filename)
+            except OSError:
+                continue
+            self.__size -= size
+
+    def clear(self):
+        with self.__lock:
+            for filename in self.__files():
+                os.remove(filename)
+            self.__size = 0
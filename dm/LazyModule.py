@@ -0,0 +1,35 @@
+"""Module that is imported on the first access to its attribute.
+
+Heavy dependencies (scipy, sklearn, matplotlib) are not needed by every script, e.g. generation
+of testing set does not draw graphs, so they are imported only if they are really used.
+"""
+import importlib
+import types
+
+__author__ = 'Peter Tisovčík'
+__email__ = 'xtisov00@stud.fit.vutbr.cz'
+
+
+class LazyModule(types.ModuleType):
+    def __init__(self, name):
+        """
+        :param name: full name of module, e.g. 'matplotlib.pyplot'
+        """
+
+        super(LazyModule, self).__init__(name)
+        self.__module = None
+
+    def __load(self):
+        if self.__module is None:
+            self.__module = importlib.import_module(self.__name__)
+
+        return self.__module
+
+    def __getattr__(self, item):
+        if item.startswith('_LazyModule__'):
+            raise AttributeError(item)
+
+        return getattr(self.__load(), item)
+
+    def __dir__(self):
+        return dir(self.__load())
@@ -0,0 +1,302 @@
+"""Column-oriented binary format for training and testing sets.
+
+Set is a directory with file schema.json (names of columns and list of row groups) and one
+numpy archive for each row group. Archive contains one typed array for each column
+(int64, float64 or unicode) and a mask of missing values if some value is missing. Columns
+can be loaded separately, so it is not necessary to parse the whole file to get few columns,
+columns of uncompressed row groups are memory-mapped.
+"""
+from dm.CSVUtil import CSVStreamWriter
+import json
+import numbers
+import numpy as np
+import os
+import zipfile
+
+__author__ = 'Klára Nečasová'
+__email__ = 'xnecas24@stud.fit.vutbr.cz'
+
+
+SCHEMA = 'schema.json'
+
+
+class NPZStreamWriter:
+    """Writer with the same interface as CSVStreamWriter, each batch of rows is one row group.
+    """
+
+    def __init__(self, directory: str, field_names=None, enable_append=False,
+                 buffer_size=65536, compress=False):
+        """
+        :param directory: output directory
+        :param field_names: names of columns, if they are not given, names of the first
+                            dictionary or names of appended set are used
+        :param enable_append: row groups are appended to the existing set
+        :param buffer_size: number of rows in one row group
+        :param compress: row groups are compressed
+        """
+
+        self.directory = directory
+        self.field_names = None if field_names is None else list(field_names)
+        self.buffer_size = buffer_size
+        self.compress = compress
+        self.rows = 0
+        self.__buffer = []
+        self.__groups = []
+        self.__closed = False
+
+        schema_filename = os.path.join(directory, SCHEMA)
+        if enable_append and os.path.isfile(schema_filename):
+            with open(schema_filename) as f:
+                schema = json.load(f)
+
+            self.__groups = schema['row_groups']
+            if self.field_names is None:
+                self.field_names = schema['columns']
+        else:
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+
+            for filename in os.listdir(directory):
+                if filename.endswith('.npz') or filename == SCHEMA:
+                    os.remove(os.path.join(directory, filename))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def write_row(self, row):
+        self.__buffer.append(row)
+        self.rows += 1
+
+        if len(self.__buffer) >= self.buffer_size:
+            self.flush()
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.write_row(row)
+
+    def write_dicts(self, data: list):
+        if not data:
+            return
+
+        if self.field_names is None:
+            self.field_names = list(data[0].keys())
+
+        names = self.field_names
+        known = set(names)
+        for item in data:
+            if item.keys() - known:
+                raise ValueError('dict contains fields not in fieldnames: %s'
+                                 % ', '.join(repr(x) for x in item.keys() - known))
+
+        for item in data:
+            self.write_row([item.get(x) for x in names])
+
+    def write_matrix(self, matrix, prefix=None):
+        """Writes numpy matrix, columns of prefix are stored before columns of matrix."""
+
+        if self.field_names is None:
+            raise ValueError('field names must be set before writing of matrix')
+
+        if len(matrix) == 0:
+            return
+
+        self.flush()
+
+        columns = []
+        if prefix is not None:
+            columns += [self.__column(list(x)) for x in zip(*prefix)]
+
+        for i in range(0, matrix.shape[1]):
+            values = np.asarray(matrix[:, i])
+            missing = np.isnan(values) if values.dtype.kind == 'f' else np.zeros(len(values), bool)
+            columns.append((values, missing))
+
+        self.__write_group(columns, len(matrix))
+        self.rows += len(matrix)
+
+    @staticmethod
+    def __column(values):
+        """Typed array and mask of missing values, None is a missing value."""
+
+        missing = np.array([x is None for x in values], dtype=bool)
+        present = [x for x in values if x is not None]
+
+        if all(isinstance(x, numbers.Integral) and not isinstance(x, bool) for x in present):
+            array = np.array([0 if x is None else x for x in values], dtype=np.int64)
+        elif all(isinstance(x, numbers.Real) and not isinstance(x, bool) for x in present):
+            array = np.array([np.nan if x is None else x for x in values], dtype=np.float64)
+        else:
+            array = np.array(['' if x is None else str(x) for x in values], dtype=str)
+
+        return array, missing
+
+    def __write_group(self, columns, rows):
+        if len(columns) != len(self.field_names):
+            raise ValueError('number of values is not equal to number of columns')
+
+        arrays = {}
+        for i, (values, missing) in enumerate(columns):
+            arrays['c%d' % i] = values
+            if missing.any():
+                arrays['m%d' % i] = missing
+
+        filename = 'part-%05d.npz' % len(self.__groups)
+        path = os.path.join(self.directory, filename)
+        if self.compress:
+            np.savez_compressed(path, **arrays)
+        else:
+            np.savez(path, **arrays)
+
+        self.__groups.append({'file': filename, 'rows': rows})
+        self.__write_schema()
+
+    def __write_schema(self):
+        schema = {
+            'columns': self.field_names,
+            'rows': sum(x['rows'] for x in self.__groups),
+            'row_groups': self.__groups,
+        }
+
+        tmp_filename = os.path.join(self.directory, SCHEMA + '.tmp')
+        with open(tmp_filename, 'w') as f:
+            json.dump(schema, f, indent=4)
+
+        os.replace(tmp_filename, os.path.join(self.directory, SCHEMA))
+
+    def flush(self):
+        if not self.__buffer:
+            return
+
+        if self.field_names is None:
+            raise ValueError('field names are not set')
+
+        columns = [self.__column(list(x)) for x in zip(*self.__buffer)]
+        self.__write_group(columns, len(self.__buffer))
+        self.__buffer = []
+
+    def close(self):
+        if self.__closed:
+            return
+
+        self.flush()
+        if self.field_names is not None and not self.__groups:
+            self.__write_schema()
+        self.__closed = True
+
+
+class NPZReader:
+    def __init__(self, directory: str):
+        self.directory = directory
+
+        with open(os.path.join(directory, SCHEMA)) as f:
+            schema = json.load(f)
+
+        self.field_names = schema['columns']
+        self.rows = schema['rows']
+        self.__groups = schema['row_groups']
+
+    def __group(self, group):
+        return np.load(os.path.join(self.directory, group['file']), allow_pickle=False)
+
+    @staticmethod
+    def __memmap(filename, name):
+        """Memory-mapped array stored in uncompressed archive, None if it is compressed."""
+
+        with zipfile.ZipFile(filename) as archive:
+            info = archive.getinfo(name + '.npy')
+
+        if info.compress_type != zipfile.ZIP_STORED:
+            return None
+
+        with open(filename, 'rb') as f:
+            # local file header has 30 bytes, name and extra field follow
+            f.seek(info.header_offset + 26)
+            name_length, extra_length = np.frombuffer(f.read(4), dtype='<u2').tolist()
+            f.seek(info.header_offset + 30 + name_length + extra_length)
+
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            offset = f.tell()
+
+        if dtype.hasobject or 0 in shape:
+            return None
+
+        return np.memmap(filename, dtype=dtype, mode='r', offset=offset, shape=shape,
+                         order='F' if fortran_order else 'C')
+
+    def column_groups(self, name):
+        """Values of one column in each row group, missing numbers are NaN and missing
+        strings are empty. Values without missing values are memory-mapped if row group
+        is not compressed.
+        """
+
+        index = self.field_names.index(name)
+        for group in self.__groups:
+            filename = os.path.join(self.directory, group['file'])
+
+            with self.__group(group) as data:
+                if 'm%d' % index not in data.files:
+                    values = self.__memmap(filename, 'c%d' % index)
+                    yield data['c%d' % index] if values is None else values
+                    continue
+
+                values = data['c%d' % index]
+                missing = data['m%d' % index]
+
+            if values.dtype.kind in 'iu':
+                values = values.astype(np.float64)
+
+            if values.dtype.kind == 'f':
+                values[missing] = np.nan
+            else:
+                values[missing] = ''
+
+            yield values
+
+    def column(self, name):
+        """Values of one column from all row groups, only arrays of given column are read."""
+
+        parts = list(self.column_groups(name))
+        if not parts:
+            return np.empty(0)
+
+        if len(parts) == 1:
+            return parts[0]
+
+        return np.concatenate(parts)
+
+    def columns(self, names):
+        return {x: self.column(x) for x in names}
+
+    def iter_rows(self):
+        """Rows as lists of Python values, missing values are None."""
+
+        for group in self.__groups:
+            columns = []
+            with self.__group(group) as data:
+                for i in range(0, len(self.field_names)):
+                    values = data['c%d' % i].tolist()
+
+                    if 'm%d' % i in data.files:
+                        missing = data['m%d' % i].tolist()
+                        values = [None if m else v for v, m in zip(values, missing)]
+
+                    columns.append(values)
+
+            for row in zip(*columns):
+                yield row
+
+    def to_csv(self, filename):
+        """Conversion into csv file with the same content as file written by CSVStreamWriter.
+        """
+
+        with CSVStreamWriter(filename, self.field_names) as writer:
+            writer.write_rows(self.iter_rows())
+
+        return self.rows
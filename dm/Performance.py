@@ -2,6 +2,8 @@
 """
 from dm.DateTimeUtil import DateTimeUtil
 import csv
+import itertools
+import numpy as np
 
 __author__ = 'Klára Nečasová'
 __email__ = 'xnecas24@stud.fit.vutbr.cz'
@@ -12,39 +14,85 @@ def count(z, val):
 
 
 class Performance:
+    # number of rows that are parsed together
+    CHUNK_SIZE = 65536
+
     def __init__(self, filename):
         self.__filename = filename
-        self.__data = []
         self.count = 0
         self.__event_type = None
 
+        # columns of rows, event and prediction are coded using self.__codes
+        self.__time = None
+        self.__event = None
+        self.__prediction = None
+        self.__valid = None
+        self.__codes = {'': 0, 'nothing': 1, 'open': 2, 'close': 3}
+        # index of row -> datetime, only for rows that can be a wrong prediction
+        self.__readable = {}
+
+    def __code(self, value):
+        if value not in self.__codes:
+            self.__codes[value] = len(self.__codes)
+
+        return self.__codes[value]
+
+    def __read_chunk(self, rows, indexes, offset):
+        """Converts one chunk of rows into arrays, rows without prediction and event are skipped.
+
+        :param offset: number of already stored rows
+        """
+
+        datetime_i, event_i, prediction_i, valid_i = indexes
+
+        event = np.array([self.__code(x[event_i]) for x in rows], dtype=np.int16)
+        prediction = np.array([self.__code(x[prediction_i]) for x in rows], dtype=np.int16)
+        invalid = np.array([x[valid_i] == 'no' for x in rows], dtype=bool)
+
+        self.count -= int(invalid.sum())
+
+        # rows without prediction are invalid
+        keep = ~((prediction == self.__codes['']) & (event == self.__codes['nothing']))
+        valid = ~invalid & (prediction != self.__codes[''])
+
+        kept = np.flatnonzero(keep)
+        times = DateTimeUtil.local_time_str_to_utc_timestamps([rows[i][datetime_i] for i in kept])
+
+        for k, i in enumerate(kept.tolist()):
+            if rows[i][event_i] == 'nothing' and rows[i][prediction_i] != 'nothing':
+                self.__readable[offset + k] = rows[i][datetime_i]
+
+        return times, event[keep], prediction[keep], valid[keep]
+
     def __read(self):
-        event_types = {}
+        parts = []
+        offset = 0
 
         with open(self.__filename, mode='r') as csv_file:
-            csv_reader = csv.DictReader(csv_file, delimiter=',')
-            for row in csv_reader:
-                record = {
-                    'datetime': int(DateTimeUtil.local_time_str_to_utc(row['datetime']).timestamp()),
-                    'readable': row['datetime'],
-                    'event': row['event'],
-                    'prediction': row['prediction(event)'],
-                    'valid': row['valid']
-                }
+            csv_reader = csv.reader(csv_file, delimiter=',')
+            header = next(csv_reader)
+            indexes = [header.index(x) for x in ['datetime', 'event', 'prediction(event)', 'valid']]
 
-                if record['prediction'] == '':
-                    record['valid'] = 'no'
+            while True:
+                rows = list(itertools.islice(csv_reader, self.CHUNK_SIZE))
+                if not rows:
+                    break
 
-                if row['valid'] == 'no':
-                    self.count -= 1
+                part = self.__read_chunk(rows, indexes, offset)
+                offset += len(part[0])
+                parts.append(part)
 
-                if record['prediction'] == '' and record['event'] == 'nothing':
-                    continue
+        if parts:
+            columns = [np.concatenate(x) for x in zip(*parts)]
+        else:
+            columns = [np.empty(0, dtype=np.int64)] + [np.empty(0, dtype=np.int16)] * 2 \
+                      + [np.empty(0, dtype=bool)]
+        self.__time, self.__event, self.__prediction, self.__valid = columns
 
-                self.__data.append(record)
-                event_types[row['event']] = None
+        self.count += len(self.__time)
 
-        self.count += len(self.__data)
+        names = {v: k for k, v in self.__codes.items()}
+        event_types = {names[x] for x in np.unique(self.__event).tolist()}
 
         if len(event_types) == 2:
             if 'open' in event_types and 'nothing' in event_types:
@@ -58,6 +106,36 @@ class Performance:
         else:
             raise ValueError('%s must contains only 2 types of event column')
 
+    def __classify(self, rows):
+        """Confusion matrix of valid rows given by boolean mask.
+
+        :return: nothing_as_true_nothing, open_as_true_nothing, open_as_true_open,
+                 nothing_as_true_open, wrong predictions
+        """
+
+        event_type = self.__codes[self.__event_type]
+        nothing = self.__codes['nothing']
+
+        rows = rows & self.__valid
+        same = rows & (self.__event == self.__prediction)
+        different = rows & (self.__event != self.__prediction)
+
+        if (same & (self.__event != event_type) & (self.__event != nothing)).any():
+            raise ValueError('error')
+
+        open_as_true_nothing = different & (self.__event == nothing) \
+            & (self.__prediction == event_type)
+        nothing_as_true_open = different & ~open_as_true_nothing \
+            & (self.__prediction != self.__codes[''])
+
+        wrong_prediction = [self.__readable[i] for i in np.flatnonzero(open_as_true_nothing).tolist()]
+
+        return (int((same & (self.__event == nothing)).sum()),
+                int(open_as_true_nothing.sum()),
+                int((same & (self.__event == event_type)).sum()),
+                int(nothing_as_true_open.sum()),
+                wrong_prediction)
+
     def __simple_table(self, res):
         if self.__event_type == 'open':
             event_type = ' ' + self.__event_type
@@ -79,34 +157,11 @@ class Performance:
         return out
 
     def simple(self):
-        nothing_as_true_nothing = 0
-        open_as_true_nothing = 0
-        open_as_true_open = 0
-        nothing_as_true_open = 0
-        wrong_prediction = []
-
-        if self.__data == []:
+        if self.__time is None:
             self.__read()
 
-        for row in self.__data:
-            if row['valid'] == 'no':
-                continue
-
-            if row['event'] == row['prediction']:
-                if row['event'] == self.__event_type:
-                    open_as_true_open += 1
-                elif row['event'] == 'nothing':
-                    nothing_as_true_nothing += 1
-                else:
-                    raise ValueError('error')
-            else:
-                if row['event'] == 'nothing' and row['prediction'] == self.__event_type:
-                    open_as_true_nothing += 1
-
-                    if row['event'] != self.__event_type:
-                        wrong_prediction.append(row['readable'])
-                elif row['prediction'] != '':
-                    nothing_as_true_open += 1
+        nothing_as_true_nothing, open_as_true_nothing, open_as_true_open, nothing_as_true_open, \
+            wrong_prediction = self.__classify(np.ones(len(self.__time), dtype=bool))
 
         res = {
             'records': self.count,
@@ -122,80 +177,47 @@ class Performance:
         return self.__simple_table(res), wrong_prediction, res
 
     def with_delay(self, before, after):
-        nothing_as_true_nothing = 0
-        open_as_true_nothing = 0
-        open_as_true_open = 0
-        nothing_as_true_open = 0
-        extended = {}
-        invalid = {}
-        wrong_prediction = []
-
-        if self.__data == []:
+        if self.__time is None:
             self.__read()
 
-        intervals = []
-        for row in self.__data:
-            if row['event'] == self.__event_type:
-                t = row['datetime']
-                intervals.append((t - before, t, t + after))
+        centers = np.sort(self.__time[self.__event == self.__codes[self.__event_type]])
+        intervals = [(t - before, t, t + after) for t in centers.tolist()]
 
-        intervals.sort()
         for i in range(1, len(intervals)):
             if intervals[i - 1][2] > intervals[i][0]:
                 t1 = DateTimeUtil.utc_timestamp_to_str(intervals[i - 1][1], '%d.%m. %H:%M:%S')
                 t2 = DateTimeUtil.utc_timestamp_to_str(intervals[i][1], '%d.%m. %H:%M:%S')
                 print('prekryvajuce sa intervaly {0} a {1}'.format(t1, t2))
 
-        for row in intervals:
-            extended[row[1]] = []
-            invalid[row[1]] = []
-
-        for row in self.__data:
-            found = False
-            for interval in intervals:
-                if interval[0] < row['datetime'] < interval[2]:
-                    extended[interval[1]].append(row['prediction'])
-                    invalid[interval[1]].append(row['valid'])
-                    found = True
-
-            if found or row['valid'] == 'no':
-                continue
-
-            if row['event'] == row['prediction']:
-                if row['event'] == self.__event_type:
-                    open_as_true_open += 1
-                elif row['event'] == 'nothing':
-                    nothing_as_true_nothing += 1
-                else:
-                    raise ValueError('error')
-            else:
-                if row['event'] == 'nothing' and row['prediction'] == self.__event_type:
-                    open_as_true_nothing += 1
-
-                    if row['event'] != self.__event_type:
-                        wrong_prediction.append(row['readable'])
-                elif row['prediction'] != '':
-                    nothing_as_true_open += 1
-
-        for key, interval in extended.items():
-            if len(interval) == 1 and 'no' in invalid[key]:
-                continue
-
-            found = False
-            for k in range(0, len(interval)):
-                row = interval[k]
-                if row == self.__event_type:
-                    found = True
-                    break
-
-            if found:
-                if 'no' not in invalid[key]:
-                    open_as_true_open += 1
-            else:
-                if 'no' not in invalid[key]:
-                    nothing_as_true_open += 1
-
-            nothing_as_true_nothing += len(interval) - 1
+        # all intervals have the same length, so both starts and ends are sorted and row
+        # lies in intervals with indexes <first, last)
+        first = np.searchsorted(centers + after, self.__time, side='right')
+        last = np.searchsorted(centers - before, self.__time, side='left')
+        found = first < last
+
+        nothing_as_true_nothing, open_as_true_nothing, open_as_true_open, nothing_as_true_open, \
+            wrong_prediction = self.__classify(~found)
+
+        def covering(rows):
+            """Number of given rows in each interval."""
+
+            diff = np.zeros(len(intervals) + 1, dtype=np.int64)
+            np.add.at(diff, first[rows & found], 1)
+            np.add.at(diff, last[rows & found], -1)
+            return np.cumsum(diff[:-1])
+
+        # intervals with the same center are joined
+        keys, inverse = np.unique(centers, return_inverse=True)
+        rows = np.ones(len(self.__time), dtype=bool)
+        size = np.bincount(inverse, covering(rows), len(keys)).astype(np.int64)
+        detected = np.bincount(inverse, covering(self.__prediction == self.__codes[self.__event_type]),
+                               len(keys)) > 0
+        invalid = np.bincount(inverse, covering(~self.__valid), len(keys)) > 0
+
+        used = ~((size == 1) & invalid)
+        open_as_true_open += int((used & detected & ~invalid).sum())
+        nothing_as_true_open += int((used & ~detected & ~invalid).sum())
+        nothing_as_true_nothing += int((size[used] - 1).sum())
 
         res = {
             'records': self.count,
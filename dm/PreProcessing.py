@@ -1,9 +1,15 @@
 """Utils for date preprocessing.
 """
+from collections import OrderedDict
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dm.DBUtil import DBUtil
 from dm.DateTimeUtil import DateTimeUtil
 from dm.ValueConversionUtil import ValueConversionUtil as conv
 import logging
+import math
+import numpy as np
+import time
 
 __author__ = 'Peter Tisovčík'
 __email__ = 'xtisov00@stud.fit.vutbr.cz'
@@ -88,32 +94,90 @@ class PreProcessing:
         return out_values
 
     @staticmethod
-    def download_data(clients: list, devices: list, start: int, end: int) -> list:
+    def download_device_data(clients: list, device: dict, start: int, end: int) -> list:
+        """Stiahnutie dat jedneho zariadenia.
+
+        :param clients: zoznam kientov
+        :param device: informacie o zariadeni
+        :param start: cas, od ktoreho sa maju stiahnut data
+        :param end: cas, do ktoreho sa maju stiahnut data
+        :return: zoznam stiahnutych hodnot
+        """
+
+        client = clients[device['server_name']]
+
+        return client.history(
+            device['gateway'],
+            device['device'],
+            device['module'],
+            start,
+            end
+        )['data']
+
+    @staticmethod
+    def __prepare_tokens(clients: list, devices: list) -> None:
+        # token sa ziska pred spustenim vlakien, aby ho kazde vlakno neziskavalo samostatne
+        for dev in devices:
+            _ = clients[dev['server_name']].token_id
+
+    @staticmethod
+    def download_data(clients: list, devices: list, start: int, end: int,
+                      workers: int=1) -> list:
         """ Stiahnutie potrebnych dat na zaklade zoznamu zariadeni.
 
         :param clients: zoznam kientov
         :param devices: zoznam informacii o zariadeniach
         :param start: cas, od ktoreho sa maju stiahnut data
         :param end: cas, do ktoreho sa maju stiahnut data
-        :return: zoznam stiahnutych dat
+        :param workers: pocet vlakien, ktore stahuju data zariadeni sucasne
+        :return: zoznam stiahnutych dat v poradi zariadeni
         """
 
-        out_items = []
+        if workers <= 1:
+            out_items = []
+            for dev in devices:
+                out_items.append(PreProcessing.download_device_data(clients, dev, start, end))
 
-        for dev in devices:
-            client = clients[dev['server_name']]
+            return out_items
 
-            values = client.history(
-                dev['gateway'],
-                dev['device'],
-                dev['module'],
-                start,
-                end
-            )['data']
+        PreProcessing.__prepare_tokens(clients, devices)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = []
+            for dev in devices:
+                futures.append(executor.submit(PreProcessing.download_device_data,
+                                               clients, dev, start, end))
 
-            out_items.append(values)
+            return [f.result() for f in futures]
 
-        return out_items
+    @staticmethod
+    def download_intervals(clients: list, devices: list, intervals: list, workers: int=4,
+                           prefetch: int=2):
+        """Stiahnutie dat viacerych intervalov, data nasledujucich intervalov sa stahuju dopredu.
+
+        :param clients: zoznam kientov
+        :param devices: zoznam informacii o zariadeniach
+        :param intervals: zoznam dvojic (start, end), pre ktore sa maju stiahnut data
+        :param workers: pocet vlakien, ktore stahuju data sucasne
+        :param prefetch: pocet intervalov, ktore sa stahuju dopredu
+        :return: generator, ktory vracia data intervalov v poradi zariadeni
+        """
+
+        PreProcessing.__prepare_tokens(clients, devices)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+
+            for start, end in intervals:
+                futures = []
+                for dev in devices:
+                    futures.append(executor.submit(PreProcessing.download_device_data,
+                                                   clients, dev, start, end))
+                pending.append(futures)
+
+                if len(pending) > prefetch:
+                    yield [f.result() for f in pending.popleft()]
+
+            while pending:
+                yield [f.result() for f in pending.popleft()]
 
     @staticmethod
     def generate_open_close(values: list, time_attribute_name: str,
@@ -203,6 +267,97 @@ class PreProcessing:
 
         return new
 
+    @staticmethod
+    def resample_linear(times, values, precision: int=7):
+        """Vektorova verzia generate_data(), ktora pracuje s polami casov a hodnot.
+
+        Pre kazdu dvojicu susednych hodnot sa vygeneruju hodnoty v casoch
+        (time_start, time_end>, dvojice s chybajucou hodnotou (NaN) sa preskocia.
+
+        :param times: pole casov
+        :param values: pole hodnot, chybajuca hodnota je NaN
+        :param precision: presnost daneho vypoctu
+        :return: pole casov a pole hodnot pre kazdu sekundu
+        """
+
+        times = np.asarray(times, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+
+        if len(times) < 2:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        time_start = times[:-1]
+        time_diff = times[1:] - time_start
+        value_start = values[:-1]
+        value_end = values[1:]
+
+        valid = ~np.isnan(value_start) & ~np.isnan(value_end) & (time_diff > 0)
+        changed = valid & (np.round(value_start - value_end, precision) != 0)
+
+        value_increase = np.zeros(len(time_diff))
+        value_increase[changed] = (value_end[changed] - value_start[changed]) / time_diff[changed]
+
+        counts = np.where(valid, time_diff, 0)
+        pairs = np.repeat(np.arange(len(counts)), counts)
+        offsets = np.arange(len(pairs)) - np.repeat(np.cumsum(counts) - counts, counts)
+
+        out_times = time_start[pairs] + offsets + 1
+        out_values = np.round(value_start[pairs] + offsets * value_increase[pairs], precision)
+
+        return out_times, out_values
+
+    @staticmethod
+    def generate_column(values: list, value_attribute: str, time_attribute: str,
+                        start: int, end: int, precision: int=7):
+        """Rozgenerovanie stiahnutych dat do pola s hodnotou pre kazdu sekundu intervalu.
+
+        Data su rozgenerovane dvakrat rovnako ako v prepare_downloaded_data(), druhe
+        rozgenerovanie doplni medzery, ktore vznikli po chybajucich hodnotach.
+
+        :param values: zoznam hodnot
+        :param value_attribute: nazov atributu, v ktorom su ulozene data
+        :param time_attribute: nazov atributu, v ktorom je ulozeny timestamp
+        :param start: cas, od ktoreho sa maju data vygenerovat
+        :param end: cas, do ktoreho sa maju data vygenerovat
+        :param precision: presnost daneho vypoctu
+        :return: pole hodnot intervalu <start, end), ak chyba niektora hodnota su vsetky NaN
+        """
+
+        times = [value[time_attribute] for value in values]
+        data = [np.nan if value[value_attribute] is None else float(value[value_attribute])
+                for value in values]
+
+        times, data = PreProcessing.resample_linear(times, data, precision)
+        times, data = PreProcessing.resample_linear(times, data, precision)
+
+        out = np.full(end - start, np.nan)
+        in_interval = (times >= start) & (times < end)
+
+        # v pripade, ze vybrany interval neobsahuje vsetky data tak sa vynuluje
+        if np.count_nonzero(in_interval) != end - start:
+            return out
+
+        out[times[in_interval] - start] = data[in_interval]
+        return out
+
+    @staticmethod
+    def generate_open_close_column(values: list, time_attribute_name: str,
+                                   open_close_attribute_name: str, start: int, end: int,
+                                   last_open_close_state: int):
+        """Vektorova verzia generate_open_close(), ktora vracia pole stavov okna.
+
+        Kazda sekunda ma stav poslednej zmeny, ktora nastala v danom case alebo pred nim.
+        """
+
+        times = np.array([value[time_attribute_name] for value in values], dtype=np.int64)
+        states = np.array([float(value[open_close_attribute_name]) for value in values])
+
+        indexes = np.searchsorted(times, np.arange(start, end), side='right') - 1
+        out = np.full(end - start, float(last_open_close_state))
+        out[indexes >= 0] = states[indexes[indexes >= 0]]
+
+        return out
+
     @staticmethod
     def cut_interval(items: list, start: int, end: int, time_attribute: str) -> list:
         """Orezanie vsetkych dat tak, aby mali rovnaky interval (zaciatocny a koncovy cas).
@@ -303,11 +458,13 @@ class PreProcessing:
 
     @staticmethod
     def prepare_downloaded_data(clients: list, devices: list, start: int, end: int,
-                                time_shift: int, last_open_close_state) -> list:
+                                time_shift: int, last_open_close_state, data=None) -> list:
 
-        data = PreProcessing.download_data(clients, devices,
-                                           start - time_shift,
-                                           end + time_shift)
+        # data mozu byt stiahnute dopredu pomocou download_intervals()
+        if data is None:
+            data = PreProcessing.download_data(clients, devices,
+                                               start - time_shift,
+                                               end + time_shift)
         data = PreProcessing.rename_all_attributes(data, devices)
         data = PreProcessing.value_filter(data)
 
@@ -397,18 +554,36 @@ class PreProcessing:
         return value
 
     @staticmethod
-    def insert_values(conn, table_name, values, maps, write_each, precision):
-        for i in range(0, len(values)):
+    def insert_values(conn, table_name, values, maps, write_each, precision, mode='row'):
+        """Vlozenie hodnot do tabulky v db.
+
+        :param conn: spojenie s db
+        :param table_name: nazov tabulky
+        :param values: zoznam hodnot
+        :param maps: zoznam stlpcov, ktore sa nachadzaju v hodnotach
+        :param write_each: vlozi sa len kazda n-ta hodnota
+        :param precision: presnost ukladanych hodnot
+        :param mode: sposob vkladania, row - kazdy riadok samostatne, bulk - executemany
+                     s ON DUPLICATE KEY UPDATE, load_data - LOAD DATA LOCAL INFILE
+                     z docasneho suboru, v oboch pripadoch sa ignoruju len duplicitne kluce
+        :return: pocet vlozenych riadkov
+        """
+
+        start_time = time.monotonic()
+
+        tasks = []
+        columns = DBUtil.measured_values_table_column_names()
+        indexes = range(0, len(values), write_each)
+        time_strings = DateTimeUtil.utc_timestamps_to_str(
+            [values[i][PreProcessing.TIME_ATTR_NAME] for i in indexes])
+
+        for i, time_string in zip(indexes, time_strings):
             value = values[i]
             t = ()
 
-            if i % write_each != 0:
-                continue
-
-            for column in DBUtil.measured_values_table_column_names():
+            for column in columns:
                 if column == PreProcessing.TIME_STRING_ATTR_NAME:
-                    t += (DateTimeUtil.utc_timestamp_to_str(
-                        value[PreProcessing.TIME_ATTR_NAME]),)
+                    t += (time_string,)
                     continue
 
                 if column in maps and value[column] is not None:
@@ -416,7 +591,29 @@ class PreProcessing:
                 else:
                     t += (None,)
 
-            DBUtil.insert_value(conn, t, False, table_name)
+            tasks.append(t)
+
+        PreProcessing.__insert_tasks(conn, table_name, tasks, mode, start_time)
+
+        return len(tasks)
+
+    @staticmethod
+    def __insert_tasks(conn, table_name, tasks, mode, start_time):
+        if mode == 'row':
+            sql = DBUtil.insert_value_sql(table_name)
+            for t in tasks:
+                DBUtil.insert_value(conn, t, False, table_name, sql)
+        elif mode == 'bulk':
+            DBUtil.insert_many(conn, tasks, False, table_name)
+        elif mode == 'load_data':
+            DBUtil.load_data_infile(conn, tasks, False, table_name)
+        else:
+            raise ValueError('insert mode must be: row, bulk or load_data')
+
+        duration = time.monotonic() - start_time
+        if duration > 0:
+            logging.debug('{0}: {1} rows inserted in {2:.3f} s ({3:.0f} rows/s, mode {4})'.format(
+                table_name, len(tasks), duration, len(tasks) / duration, mode))
 
     @staticmethod
     def ppm_filter(data, ppm_limit=2000):
@@ -428,14 +625,109 @@ class PreProcessing:
 
         return data
 
+    @staticmethod
+    def prepare_value_conversion_columns(columns):
+        """Vektorova verzia prepare_value_conversion(), chybajuce hodnoty su NaN."""
+
+        sensors = [
+            ('temperature_in_celsius', 'rh_in_percentage', 'rh_in_absolute_g_m3',
+             'rh_in_specific_g_kg'),
+            ('temperature_in2_celsius', 'rh_in2_percentage', 'rh_in2_absolute_g_m3',
+             'rh_in2_specific_g_kg'),
+            ('temperature_out_celsius', 'rh_out_percentage', 'rh_out_absolute_g_m3',
+             'rh_out_specific_g_kg'),
+        ]
+
+        for temperature, rh, absolute, specific in sensors:
+            if temperature not in columns or rh not in columns:
+                continue
+
+            columns[absolute] = conv.rh_to_absolute_g_m3(columns[temperature], columns[rh])
+            columns[specific] = conv.rh_to_specific_g_kg(columns[temperature], columns[rh])
+
+        return columns
+
+    @staticmethod
+    def prepare_columns(clients: list, devices: list, start: int, end: int,
+                        last_open_close_state: int, time_shift: int, data=None):
+        """Priprava dat intervalu <start, end) vo forme poli, jedno pole pre kazdy stlpec.
+
+        :param data: data stiahnute dopredu pomocou download_intervals()
+        :return: zoznam stlpcov, pole casov a slovnik s polom hodnot kazdeho stlpca
+        """
+
+        if data is None:
+            data = PreProcessing.download_data(clients, devices,
+                                               start - time_shift,
+                                               end + time_shift)
+        data = PreProcessing.rename_all_attributes(data, devices)
+        data = PreProcessing.value_filter(data)
+
+        columns = OrderedDict()
+        maps = PreProcessing.db_name_maps(devices)
+        for key, item in zip(maps, data):
+            if key == PreProcessing.OPEN_CLOSE_ATTR_NAME:
+                columns[key] = PreProcessing.generate_open_close_column(
+                    item, PreProcessing.TIME_ATTR_NAME, key, start, end, last_open_close_state)
+            elif len(item) != 0:
+                columns[key] = PreProcessing.generate_column(item, key,
+                                                             PreProcessing.TIME_ATTR_NAME,
+                                                             start, end)
+            else:
+                columns[key] = np.full(end - start, np.nan)
+
+        with np.errstate(invalid='ignore'):
+            PreProcessing.prepare_value_conversion_columns(columns)
+
+        maps = list(set(maps + list(columns.keys()) + [PreProcessing.TIME_ATTR_NAME]))
+        return maps, np.arange(start, end), columns
+
+    @staticmethod
+    def ppm_filter_columns(columns, ppm_limit=2000):
+        key = 'co2_in_ppm'
+        if key in columns:
+            with np.errstate(invalid='ignore'):
+                columns[key][columns[key] >= ppm_limit] = np.nan
+
+        return columns
+
+    @staticmethod
+    def insert_columns(conn, table_name, times, columns, maps, write_each, precision,
+                       mode='bulk'):
+        """Vlozenie hodnot pripravenych pomocou prepare_columns() do tabulky v db.
+
+        Chybajuce hodnoty (NaN) sa vlozia ako NULL, parametre su rovnake ako v insert_values().
+        """
+
+        start_time = time.monotonic()
+
+        indexes = slice(0, len(times), write_each)
+        out = []
+        for column in DBUtil.measured_values_table_column_names():
+            if column == PreProcessing.TIME_ATTR_NAME:
+                out.append(times[indexes].tolist())
+            elif column == PreProcessing.TIME_STRING_ATTR_NAME:
+                out.append(DateTimeUtil.utc_timestamps_to_str(times[indexes]))
+            elif column in maps and column in columns:
+                out.append([None if math.isnan(x) else round(x, precision)
+                            for x in columns[column][indexes].tolist()])
+            else:
+                out.append([None] * len(out[0]))
+
+        tasks = list(zip(*out))
+        PreProcessing.__insert_tasks(conn, table_name, tasks, mode, start_time)
+
+        return len(tasks)
+
     @staticmethod
     def prepare(clients: list, devices: list, start: int, end: int,
-                last_open_close_state: int, time_shift: int):
+                last_open_close_state: int, time_shift: int, data=None):
 
         values = []
         try:
             values = PreProcessing.prepare_downloaded_data(clients, devices, start, end,
-                                                           time_shift, last_open_close_state)
+                                                           time_shift, last_open_close_state,
+                                                           data)
 
             PreProcessing.check_start_end_interval(values, PreProcessing.TIME_ATTR_NAME)
             values = PreProcessing.join_items(values, PreProcessing.TIME_ATTR_NAME)
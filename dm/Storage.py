@@ -1,10 +1,13 @@
 """Storage that supports selection of events and their values or only selection of the values.
 """
 from collections import OrderedDict
+from dm.ColumnStore import ColumnStore
 from dm.DateTimeUtil import DateTimeUtil
 from dm.SQLUtil import SQLUtil
 import json
 import logging
+import math
+import numpy as np
 import os
 
 __author__ = 'Peter Tisovčík'
@@ -82,9 +85,115 @@ class Storage:
 
         return out
 
-    def load_data(self, con, start_shift: int, end_shift: int, column: str):
+    def load_data(self, con, start_shift: int, end_shift: int, column: str, batched=True,
+                  max_gap=3600):
+        """Nacitanie udalosti a hodnot namerenych pocas udalosti.
+
+        :param con: spojenie s databazou alebo ColumnStore
+        :param start_shift: posun zaciatku udalosti
+        :param end_shift: posun konca udalosti
+        :param column: stlpec, v ktorom nesmu byt pocas udalosti prazdne hodnoty
+        :param batched: hodnoty vsetkych udalosti sa vyberu niekolkymi dotazmi na intervaly
+        :param max_gap: maximalna medzera medzi udalostami, ktore sa vyberu jednym dotazom
+        :return: zoznam udalosti
+        """
+
         data = self.read_meta()
 
+        if not batched:
+            return self.__load_data_per_event(con, data, start_shift, end_shift, column)
+
+        return self.__load_data_batched(con, data, start_shift, end_shift, column, max_gap)
+
+    @staticmethod
+    def __merge_intervals(intervals: list, max_gap: int):
+        out = []
+        for start, end in sorted(intervals):
+            if end < start:
+                continue
+
+            if out and start - out[-1][1] <= max_gap:
+                out[-1][1] = max(out[-1][1], end)
+            else:
+                out.append([start, end])
+
+        return out
+
+    def __load_data_batched(self, con, data, start_shift: int, end_shift: int, column: str,
+                            max_gap: int):
+        columns = list(ColumnStore.COLUMNS)
+        if column not in columns:
+            columns.append(column)
+
+        intervals = []
+        for event in data:
+            start = event['e_start']['timestamp'] + start_shift
+            end = event['e_end']['timestamp'] + end_shift
+            intervals.append((start, end))
+
+            if event['no_event_time_shift'] != 0:
+                no_event_time = start + event['no_event_time_shift']
+                intervals.append((no_event_time, no_event_time))
+
+        # zjednotenie intervalov vsetkych udalosti, kazdy blok sa vyberie jednym dotazom
+        blocks = []
+        for block_start, block_end in self.__merge_intervals(intervals, max_gap):
+            present, values = Storage.select_interval_columns(con, block_start, block_end,
+                                                              columns, self.__table_name)
+            blocks.append((block_start, present, values))
+
+        logging.debug('%d events loaded using %d queries' % (len(data), len(blocks)))
+        block_starts = np.array([x[0] for x in blocks], dtype=np.int64)
+
+        def find_block(timestamp):
+            return blocks[np.searchsorted(block_starts, timestamp, side='right') - 1]
+
+        for event in data:
+            event['start_shift'] = start_shift
+            event['end_shift'] = end_shift
+
+            start = event['e_start']['timestamp'] + start_shift
+            end = event['e_end']['timestamp'] + end_shift
+
+            # udalost je platna, ak v danom stlpci nechyba ziadna hodnota
+            if end < start:
+                if end - start + 1 != 0:
+                    event['valid_event'] = False
+                    continue
+                values = {x: np.zeros(0) for x in columns}
+            else:
+                block_start, _, block_values = find_block(start)
+                values = {x: y[start - block_start:end - block_start + 1]
+                          for x, y in block_values.items()}
+
+            if np.isnan(values[column]).any():
+                event['valid_event'] = False
+                continue
+
+            for name in event['measured'].keys():
+                v = values[name]
+                event['measured'][name] = v[~np.isnan(v)].tolist()
+
+            if event['no_event_time_shift'] != 0:
+                no_event_time = start + event['no_event_time_shift']
+                block_start, present, block_values = find_block(no_event_time)
+                index = no_event_time - block_start
+
+                if not present[index]:
+                    event['no_event_values'] = None
+                    continue
+
+                # hodnoty v rovnakom poradi ako pri vybere vsetkych stlpcov z tabulky
+                row = [no_event_time, DateTimeUtil.utc_timestamp_to_str(no_event_time)]
+                for name in ColumnStore.COLUMNS:
+                    value = float(block_values[name][index])
+                    row.append(None if math.isnan(value) else value)
+
+                event['no_event_values'] = tuple(row)
+
+        return data
+
+    def __load_data_per_event(self, con, data, start_shift: int, end_shift: int, column: str):
         cur = con.cursor()
         for i in range(0, len(data)):
             event = data[i]
@@ -164,6 +273,9 @@ class Storage:
 
     @staticmethod
     def one_row(con, table_name: str, columns: str, timestamp: int):
+        if isinstance(con, ColumnStore):
+            return con.one_row(table_name, columns, timestamp)
+
         cur = con.cursor()
 
         sql = SQLUtil.select_one_value(table_name, timestamp, columns)
@@ -178,6 +290,9 @@ class Storage:
 
     @staticmethod
     def select_interval(con, start, end, column, table_name, without_none_value=True):
+        if isinstance(con, ColumnStore):
+            return con.select_interval(start, end, column, table_name, without_none_value)
+
         cur = con.cursor()
         sql = SQLUtil.select_interval_size(table_name, start, end, column)
         cur.execute(sql)
@@ -199,6 +314,48 @@ class Storage:
 
         return out
 
+    @staticmethod
+    def select_interval_columns(con, start, end, columns, table_name):
+        """Selection of given columns from interval <start, end> using one query.
+
+        Every column is returned as an array of float64 values indexed by offset
+        from start, NULL values and missing rows are represented as NaN.
+
+        :param con: connection with database or ColumnStore
+        :param start: timestamp of interval start
+        :param end: timestamp of interval end (inclusive)
+        :param columns: list of column names
+        :param table_name: table name
+        :return: boolean array of present rows and dictionary with array for each column
+        """
+
+        if isinstance(con, ColumnStore):
+            return con.select_interval_columns(start, end, columns, table_name)
+
+        size = end - start + 1
+        present = np.zeros(size, dtype=bool)
+        values = OrderedDict()
+        for column in columns:
+            values[column] = np.full(size, np.nan, dtype=np.float64)
+
+        if size <= 0:
+            return present, values
+
+        cur = con.cursor()
+        sql = SQLUtil.select_interval(table_name, start, end,
+                                      ', '.join(['measured_time'] + list(columns)))
+        cur.execute(sql)
+
+        for row in cur.fetchall():
+            index = row[0] - start
+            present[index] = True
+
+            for i in range(0, len(columns)):
+                if row[i + 1] is not None:
+                    values[columns[i]][index] = float(row[i + 1])
+
+        return present, values
+
     @staticmethod
     def dw_columns_ordered(con, start, end, columns, table_name):
         columns = columns.split(',')
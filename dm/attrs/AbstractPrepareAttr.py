@@ -2,8 +2,8 @@
    arithmetic mean, variance and standard deviation of differences.
 """
 from abc import ABC, abstractmethod
-from functools import reduce
 import math
+import numpy as np
 
 __author__ = 'Peter Tisovčík'
 __email__ = 'xtisov00@stud.fit.vutbr.cz'
@@ -13,6 +13,8 @@ __email__ = 'xtisov00@stud.fit.vutbr.cz'
 # https://code.tutsplus.com/articles/understanding-args-and-kwargs-in-python--cms-29494
 # http://homel.vsb.cz/~dor028/Casove_rady.pdf
 class AbstractPrepareAttr(ABC):
+    STATISTICS = ['_geometricMean', '_arithmeticMean', '_variance', '_standardDeviation']
+
     def __init__(self, con, table_name, row_selector, interval_selector, tr=None):
         self.con = con
         self.table_name = table_name
@@ -34,6 +36,58 @@ class AbstractPrepareAttr(ABC):
     def execute(self, **kwargs):
         pass
 
+    def offsets(self, **kwargs):
+        """Pairs (column, time offset from timestamp) of all values read by execute.
+
+        Arguments are the same as arguments of execute without timestamp and precision,
+        None means that the values are not known in advance.
+        """
+
+        return None
+
+    # Optional computation of attributes for many timestamps at once, subclasses that support
+    # it define method execute_many(timestamps, values, values_start, **kwargs). Values are
+    # taken from a column array (values[0] is value at time values_start), result contains
+    # names of attributes and matrix with one row for each timestamp for values before
+    # and after. Rows that contain missing value are filled with NaN.
+    execute_many = None
+
+    @staticmethod
+    def _gather(values, indexes):
+        out = np.full(indexes.shape, np.nan)
+        valid = (indexes >= 0) & (indexes < len(values))
+        out[valid] = values[indexes[valid]]
+
+        return out
+
+    @staticmethod
+    def _matrix(columns, rows):
+        if not columns:
+            return np.empty((rows, 0))
+
+        return np.column_stack(columns)
+
+    @staticmethod
+    def round_array(values, precision):
+        """Rounding of array that gives the same values as built-in round().
+
+        Values close to the half of the last digit are rounded using round(),
+        because numpy rounds scaled value that can differ from the exact one.
+        """
+
+        values = np.asarray(values, dtype=np.float64)
+        scale = 10.0 ** precision
+        scaled = values * scale
+        out = np.round(scaled) / scale
+
+        with np.errstate(invalid='ignore'):
+            suspicious = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+
+        if suspicious.any():
+            out[suspicious] = [round(x, precision) for x in values[suspicious].tolist()]
+
+        return out
+
     def attr_name(self, column_name, prefix, interval_type, interval):
         return '{0}_{1}{2}_{3}_{4}'.format(self.name, column_name, prefix, interval_type,
                                            interval)
@@ -73,6 +127,26 @@ class AbstractPrepareAttr(ABC):
 
         return before_out, after_out
 
+    def _compute_increase_many(self, column, intervals_before, intervals_after, before, after,
+                               selected_before, selected_after, prefix):
+        def compute(intervals_all, values, selected, interval_name):
+            names = []
+            columns = []
+
+            for intervals in selected:
+                indexes = [intervals_all.index(interval) for interval in intervals]
+                columns.append((values[:, indexes] > 0).sum(axis=1).astype(np.float64))
+
+                suffix = '_'.join(str(x) for x in intervals)
+                names.append(self.attr_name(column, prefix, interval_name, suffix))
+
+            return names, self._matrix(columns, len(values))
+
+        before_out = compute(intervals_before, before, selected_before, 'before_increase')
+        after_out = compute(intervals_after, after, selected_after, 'after_increase')
+
+        return before_out, after_out
+
     def _extract_values(self, values):
         out = []
         for row in values:
@@ -80,27 +154,62 @@ class AbstractPrepareAttr(ABC):
 
         return out
 
+    @staticmethod
+    def geometric_mean_kernel(values, precision):
+        """Geometric mean of each row of matrix computed in log domain.
+
+        Product of values is not computed, so it cannot overflow or underflow. The first
+        value of each row and up to two zeros are skipped (as vals.remove(0.0) and
+        vals.remove(0)), more zeros give zero mean. Sign of the mean is the sign
+        of the product of values.
+
+        :param values: matrix with one row for each timestamp
+        :param precision: number of decimal places
+        :return: array of geometric means, NaN for rows with missing value
+        """
+
+        values = np.asarray(values, dtype=np.float64)
+        if values.ndim == 1:
+            values = values.reshape(1, -1)
+
+        count = values.shape[1]
+        vals = values[:, 1:]
+
+        zero = vals == 0
+        zeros = zero.sum(axis=1)
+        negative = (vals < 0).sum(axis=1) % 2 == 1
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_sum = np.log(np.where(zero, 1.0, np.abs(vals))).sum(axis=1)
+            out = AbstractPrepareAttr.round_array(np.exp(log_sum / (count - 1)), precision)
+
+        out[negative] *= -1
+        out[zeros > 2] = 0.0
+
+        # nothing to multiply or missing value
+        out[count - 1 - np.minimum(zeros, 2) <= 0] = np.nan
+        out[np.isnan(values).any(axis=1)] = np.nan
+
+        return out
+
+    @staticmethod
+    def _geometric_mean_value(values, precision):
+        """Geometric mean of one list of values.
+
+        :raise ValueError: if nothing is left after skipping the first value and zeros,
+                           so the row is skipped as before computation in log domain
+        """
+
+        value = float(AbstractPrepareAttr.geometric_mean_kernel([values], precision)[0])
+        if math.isnan(value):
+            raise ValueError('geometric mean cannot be computed from values %s' % values)
+
+        return value
+
     def geometric_mean(self, column, precision, values_before, values_after, prefix):
         def compute(input_values, interval_name):
             values = self._extract_values(input_values)
-            vals = values[1:]
-            try:
-                vals.remove(0.0)
-                vals.remove(0)
-            except:
-                pass
-
-            count = len(input_values)
-
-            # sqrt can be negative
-            is_negative = False
-            tmp = reduce((lambda x, y: x * y), vals)
-            if tmp < 0:
-                is_negative = True
-                tmp *= -1
-            v1 = round(tmp ** (1/(count - 1)), precision)
-            if is_negative:
-                v1 *= -1
+            v1 = self._geometric_mean_value(values, precision)
 
             attr_prefix = '_geometricMean' + prefix
             name = self.attr_name(column, attr_prefix, interval_name, '')
@@ -111,6 +220,25 @@ class AbstractPrepareAttr(ABC):
 
         return before, after
 
+    def geometric_mean_many(self, column, precision, values_before, values_after, prefix):
+        """Vectorized variant of geometric_mean, each row of matrix contains values
+        of one timestamp.
+
+        :return: names of attributes and matrix with one row for each timestamp
+        """
+
+        attr_prefix = '_geometricMean' + prefix
+        names = [
+            self.attr_name(column, attr_prefix, 'before', ''),
+            self.attr_name(column, attr_prefix, 'after', ''),
+        ]
+        columns = [
+            self.geometric_mean_kernel(values_before, precision),
+            self.geometric_mean_kernel(values_after, precision),
+        ]
+
+        return names, self._matrix(columns, len(columns[0]))
+
     def arithmetic_mean(self, column, precision, values_before, values_after, prefix):
         def compute(input_values, interval_name):
             count = len(input_values)
@@ -147,6 +275,99 @@ class AbstractPrepareAttr(ABC):
 
         return before, after
 
+    @staticmethod
+    def _statistics_kernel(values):
+        """Sums needed by arithmetic mean, variance and standard deviation of given values.
+
+        Sum of squares is computed from differences to the mean, because computation
+        from the sum of squared values loses precision and gives different rounded variance.
+
+        :param values: list of values
+        :return: count, sum and sum of squared differences to the mean
+        """
+
+        count = len(values)
+        values_sum = sum(values)
+        avg = values_sum / count
+
+        squares_sum = 0
+        for value in values:
+            squares_sum += (value - avg) ** 2
+
+        return count, values_sum, squares_sum
+
+    def statistics(self, column, precision, values_before, values_after, prefix):
+        """Geometric mean, arithmetic mean, variance and standard deviation of given values.
+
+        All statistics are computed from one kernel, the result is the same as the result
+        of geometric_mean, arithmetic_mean, variance and standard_deviation called
+        in this order (before and after values of each statistic).
+        """
+
+        def compute(input_values):
+            values = self._extract_values(input_values)
+            count, values_sum, squares_sum = self._statistics_kernel(values)
+
+            var = round(squares_sum / count, precision)
+            return [
+                self._geometric_mean_value(values, precision),
+                round(values_sum / count, precision),
+                var,
+                round(math.sqrt(var), precision),
+            ]
+
+        before = compute(values_before)
+        after = compute(values_after)
+
+        out = []
+        for i, attr_prefix in enumerate(self.STATISTICS):
+            attr_prefix += prefix
+            out.append((self.attr_name(column, attr_prefix, 'before', ''), before[i]))
+            out.append((self.attr_name(column, attr_prefix, 'after', ''), after[i]))
+
+        return out
+
+    def statistics_many(self, column, precision, values_before, values_after, prefix):
+        """Vectorized variant of statistics, each row of matrix contains values of one timestamp.
+
+        :return: names of attributes and matrix with one row for each timestamp
+        """
+
+        def compute(values):
+            values = np.asarray(values, dtype=np.float64)
+            count = values.shape[1]
+
+            # values are summed in the same order as in built-in sum()
+            values_sum = np.zeros(len(values))
+            for i in range(0, count):
+                values_sum += values[:, i]
+            avg = values_sum / count
+
+            squares_sum = np.zeros(len(values))
+            for i in range(0, count):
+                squares_sum += (values[:, i] - avg) ** 2
+
+            var = self.round_array(squares_sum / count, precision)
+            return [
+                self.geometric_mean_kernel(values, precision),
+                self.round_array(values_sum / count, precision),
+                var,
+                self.round_array(np.sqrt(var), precision),
+            ]
+
+        before = compute(values_before)
+        after = compute(values_after)
+
+        names = []
+        columns = []
+        for i, attr_prefix in enumerate(self.STATISTICS):
+            attr_prefix += prefix
+            names.append(self.attr_name(column, attr_prefix, 'before', ''))
+            names.append(self.attr_name(column, attr_prefix, 'after', ''))
+            columns += [before[i], after[i]]
+
+        return names, self._matrix(columns, len(values_before))
+
     def standard_deviation(self, column, precision, values_before, values_after, prefix):
         def compute(value, interval_name):
             attr_prefix = '_standardDeviation' + prefix
@@ -1,7 +1,6 @@
 """Gets current value CO2 and measured value CO2 in a given time point.
 """
 from dm.attrs.AbstractPrepareAttr import AbstractPrepareAttr
-from sympy import *
 
 __author__ = 'Peter Tisovčík'
 __email__ = 'xtisov00@stud.fit.vutbr.cz'
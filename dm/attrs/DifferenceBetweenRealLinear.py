@@ -1,7 +1,9 @@
 """Calculates differences between real and linearized values of quantity in given time points.
 """
+from dm.LazyModule import LazyModule
 from dm.attrs.AbstractPrepareAttr import AbstractPrepareAttr
-from scipy import stats
+
+stats = LazyModule('scipy.stats')
 
 __author__ = 'Klára Nečasová'
 __email__ = 'xnecas24@stud.fit.vutbr.cz'
@@ -69,3 +71,9 @@ class DifferenceBetweenRealLinear(AbstractPrepareAttr):
             after.append((name, self.transform(diff, interval)))
 
         return before, after
+
+    def offsets(self, column, window_size_before, window_size_after, **kwargs):
+        out = [(column, -x) for x in range(window_size_before, -1, -1)]
+        out += [(column, x) for x in range(0, window_size_after + 1)]
+
+        return out
@@ -1,6 +1,7 @@
 """Calculates first differences using quantity values (not only successive values).
 """
 from dm.attrs.AbstractPrepareAttr import AbstractPrepareAttr
+import numpy as np
 
 __author__ = 'Peter Tisovčík'
 __email__ = 'xtisov00@stud.fit.vutbr.cz'
@@ -47,3 +48,58 @@ class FirstDifferenceAttrA(AbstractPrepareAttr):
             return before + b, after + a
 
         return before, after
+
+    def offsets(self, column, intervals_before, intervals_after, **kwargs):
+        out = [(column, 0)]
+        out += [(column, -interval) for interval in intervals_before]
+        out += [(column, interval) for interval in intervals_after]
+
+        return out
+
+    def execute_many(self, timestamps, values, values_start, column, precision,
+                     intervals_before, intervals_after, normalize, enable_count, prefix,
+                     selected_before, selected_after):
+        indexes = np.asarray(timestamps) - values_start
+        middle = self._gather(values, indexes)
+
+        before_names = []
+        before = []
+        for interval in intervals_before:
+            value = self._gather(values, indexes - interval)
+
+            if normalize:
+                derivation = self.round_array((middle - value) / interval, precision)
+                name = self.attr_name(column, prefix, 'norm_before', interval)
+            else:
+                derivation = self.round_array(middle - value, precision)
+                name = self.attr_name(column, prefix, 'before', interval)
+
+            before_names.append(name)
+            before.append(self.transform(derivation, interval))
+
+        after_names = []
+        after = []
+        for interval in intervals_after:
+            value = self._gather(values, indexes + interval)
+
+            if normalize:
+                derivation = self.round_array((value - middle) / interval, precision)
+                name = self.attr_name(column, prefix, 'norm_after', interval)
+            else:
+                derivation = self.round_array(value - middle, precision)
+                name = self.attr_name(column, prefix, 'after', interval)
+
+            after_names.append(name)
+            after.append(self.transform(derivation, interval))
+
+        before = self._matrix(before, len(indexes))
+        after = self._matrix(after, len(indexes))
+
+        if enable_count:
+            b, a = self._compute_increase_many(column, intervals_before, intervals_after,
+                                               before, after,
+                                               selected_before, selected_after, prefix)
+            return (before_names + b[0], np.hstack((before, b[1]))), \
+                   (after_names + a[0], np.hstack((after, a[1])))
+
+        return (before_names, before), (after_names, after)
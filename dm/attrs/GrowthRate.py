@@ -4,6 +4,7 @@ The growth rate is calculated as y_t/y_t_-1, where y_t is selected
 based on forward/backward shift and y_t_-1 is calculated as y_t - value_delay.
 """
 from dm.attrs.AbstractPrepareAttr import AbstractPrepareAttr
+import numpy as np
 
 __author__ = 'Peter Tisovčík'
 __email__ = 'xtisov00@stud.fit.vutbr.cz'
@@ -34,3 +35,44 @@ class GrowthRate(AbstractPrepareAttr):
             after.append((name, self.transform(ratio, interval)))
 
         return before, after
+
+    def offsets(self, column, intervals_before, intervals_after, value_delay, **kwargs):
+        out = []
+        for interval in intervals_before:
+            out += [(column, -interval), (column, -interval - value_delay)]
+
+        for interval in intervals_after:
+            out += [(column, interval), (column, interval - value_delay)]
+
+        return out
+
+    def execute_many(self, timestamps, values, values_start, column, precision,
+                     intervals_before, intervals_after, value_delay, prefix):
+        indexes = np.asarray(timestamps) - values_start
+
+        def compute(value_indexes):
+            y_t = self._gather(values, value_indexes)
+            y_t_1 = self._gather(values, value_indexes - value_delay)  # t-1
+
+            # division by zero is the same case as missing value
+            with np.errstate(divide='ignore', invalid='ignore'):
+                ratio = np.where(y_t_1 == 0, np.nan, y_t / y_t_1)
+
+            return self.round_array(ratio, precision)
+
+        before_names = []
+        before = []
+        for interval in intervals_before:
+            name = self.attr_name(column, prefix, 'valDelay' + str(value_delay) + '_before', interval)
+            before_names.append(name)
+            before.append(self.transform(compute(indexes - interval), interval))
+
+        after_names = []
+        after = []
+        for interval in intervals_after:
+            name = self.attr_name(column, prefix, 'valDelay' + str(value_delay) + '_after', interval)
+            after_names.append(name)
+            after.append(self.transform(compute(indexes + interval), interval))
+
+        return (before_names, self._matrix(before, len(indexes))), \
+               (after_names, self._matrix(after, len(indexes)))
@@ -1,7 +1,9 @@
 """Calculates quantity values after linearization.
 """
+from dm.LazyModule import LazyModule
 from dm.attrs.AbstractPrepareAttr import AbstractPrepareAttr
-from scipy import stats
+
+stats = LazyModule('scipy.stats')
 
 __author__ = 'Klára Nečasová'
 __email__ = 'xnecas24@stud.fit.vutbr.cz'
@@ -1,6 +1,7 @@
 """Calculates differences between quantity values measured indoor and outdoor.
 """
 from dm.attrs.AbstractPrepareAttr import AbstractPrepareAttr
+import numpy as np
 
 __author__ = 'Klára Nečasová'
 __email__ = 'xnecas24@stud.fit.vutbr.cz'
@@ -24,3 +25,29 @@ class InOutDiff(AbstractPrepareAttr):
             before.append((name, res))
 
         return before, after
+
+    def offsets(self, column, intervals_before, intervals_after, **kwargs):
+        out = [(column, -interval) for interval in intervals_before]
+        out += [(column, interval) for interval in intervals_after]
+
+        return out
+
+    def execute_many(self, timestamps, values, values_start, column, precision,
+                     intervals_before, intervals_after, prefix):
+        indexes = np.asarray(timestamps) - values_start
+
+        names = []
+        before = []
+
+        for interval in intervals_before:
+            res = self.round_array(self._gather(values, indexes - interval), precision)
+            names.append(self.attr_name(column, prefix, 'before', interval))
+            before.append(res)
+
+        # values after are stored together with values before as in execute()
+        for interval in intervals_after:
+            res = self.round_array(self._gather(values, indexes + interval), precision)
+            names.append(self.attr_name(column, prefix, 'after', interval))
+            before.append(res)
+
+        return (names, self._matrix(before, len(indexes))), ([], self._matrix([], len(indexes)))
@@ -3,7 +3,6 @@
 Calculates regression when the window is open.
 """
 from dm.co2regression.AbstractRegression import AbstractRegression
-from scipy.optimize import curve_fit
 import numpy as np
 
 __author__ = 'Peter Tisovčík'
@@ -24,6 +23,9 @@ class SimpleExpRegression(AbstractRegression):
         return lambda x, a: co2_out + (co2_start - co2_out) * np.exp(-a / volume * x)
 
     def compute_parameter(self, x, y):
+        # scipy is imported only if regression is computed
+        from scipy.optimize import curve_fit
+
         x = np.asarray(x)
         y = np.asarray(y)
 
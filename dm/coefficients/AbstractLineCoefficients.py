@@ -2,7 +2,6 @@
 """
 from abc import ABC, abstractmethod
 from fractions import Fraction
-from sympy import *
 import numpy as np
 
 __author__ = 'Klára Nečasová'
@@ -23,35 +22,28 @@ class AbstractLineCoefficients(ABC):
 
         return self._convert_line_to_general(coeffs)
 
+    @staticmethod
+    def __fraction(value):
+        """Numerator and denominator of the closest fraction with denominator at most 1000.
+        """
+
+        tmp = Fraction(str(value)).limit_denominator(1000)
+        return tmp.numerator, tmp.denominator
+
     def _convert_line_to_general(self, coeffs):
         """ Converts line equation y = kx + q to the form ax + by + c = 0 (general form).
         """
 
         # represents coeffs as fractions
-        tmp = Fraction(str(coeffs[0])).limit_denominator(1000)
-        n1 = tmp.numerator
-        d1 = tmp.denominator
-
-        tmp2 = Fraction(str(coeffs[1])).limit_denominator(1000)
-        n2 = tmp2.numerator
-        d2 = tmp2.denominator
+        n1, d1 = self.__fraction(coeffs[0])
+        n2, d2 = self.__fraction(coeffs[1])
 
         # find LCM
         L = np.lcm(d1, d2)
 
-        # symbolic variable
-        x = var('x')
-
-        y1 = (n1 * x) / d1
-        y2 = n2 / d2
-
-        y_mult1 = y1 * L
-
-        a = y_mult1.subs('x', 1) * (-1)
-
-        y_mult2 = (y2 * L)
-        c = y_mult2 * (-1)
-
+        # L is a multiple of d1, a is an integer
+        a = -(n1 * int(L) // d1)
+        c = (n2 / d2 * L) * (-1)
         b = L
 
         return a, b, c
@@ -61,19 +53,36 @@ class AbstractLineCoefficients(ABC):
         """
 
         # represents coeffs as fractions
-        tmp = Fraction(str(coeffs[0])).limit_denominator(1000)
-        n1 = tmp.numerator
-        d1 = tmp.denominator
+        n1, d1 = self.__fraction(coeffs[0])
 
-        # symbolic variable
-        x = var('x')
+        return -n1, d1, 0
 
-        y1 = (n1 * x) / d1
+    def convert_lines(self, slopes, intercepts=None):
+        """Converts lines y = kx + q given by arrays of slopes and intercepts to the general
+        form, results are the same as results of convert_line for each line.
+
+        :param slopes: array of slopes k
+        :param intercepts: array of intercepts q, None if all lines pass through the origin
+        :return: arrays a, b, c
+        """
 
-        y_mult1 = y1 * d1
+        slopes = np.asarray(slopes, dtype=np.float64)
+        if intercepts is None:
+            intercepts = np.zeros(len(slopes))
+        intercepts = np.asarray(intercepts, dtype=np.float64)
 
-        a = y_mult1.subs('x', 1) * (-1)
+        # fractions are computed only once for each distinct value
+        values, inverse = np.unique(np.concatenate((slopes, intercepts)), return_inverse=True)
+        fractions = np.array([self.__fraction(x) for x in values.tolist()],
+                             dtype=np.int64).reshape(-1, 2)
 
-        b = d1
+        n1, d1 = fractions[inverse[:len(slopes)]].T
+        n2, d2 = fractions[inverse[len(slopes):]].T
 
-        return a, b, 0
+        # lines with q = 0 have denominator of k
+        L = np.lcm(d1, d2)
+        b = np.where(intercepts == 0, d1, L)
+        a = -(n1 * (b // d1))
+        c = np.where(intercepts == 0, 0.0, (n2 / d2 * L) * (-1))
+
+        return a, b, c
@@ -5,12 +5,12 @@ outdoor humidity and calculates distance between point and cluster centroid and
 to cluster trendline.
 """
 from collections import OrderedDict
-from scipy.spatial import ConvexHull
-from sklearn.cluster import KMeans
+from dm.LazyModule import LazyModule
 import logging
-import matplotlib.pyplot as plt
 import numpy as np
 
+plt = LazyModule('matplotlib.pyplot')
+
 __author__ = 'Klára Nečasová'
 __email__ = 'xnecas24@stud.fit.vutbr.cz'
 
@@ -32,6 +32,10 @@ class DistanceToLine:
 
     def humidity_clusters(self, training, col1, col2, col3, intervals, strategy, strategyFlag, one_line,
                           cluster_boundaries, cluster_boundaries_all):
+        # scipy and sklearn are imported only if clusters are computed
+        from scipy.spatial import ConvexHull
+        from sklearn.cluster import KMeans
+
         # colors
         if cluster_boundaries_all:
             colors_trendline = [(0.854, 0.035, 0.027), (0.101, 0.454, 0.125), (0, 0.545, 0.545), (0.545, 0, 0.545), (0, 0, 1)]
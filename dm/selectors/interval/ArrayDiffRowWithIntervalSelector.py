@@ -0,0 +1,122 @@
+"""Cached row selector backed by numpy arrays for selection of values and their differences.
+
+Selector selects all required columns of interval <start, end> using one query. Values of
+each column are stored in a contiguous float64 array (NaN for NULL values) and the differences
+between indoor and outdoor values are computed once for the whole interval. Values outside of
+the interval are selected using simple cached row selector.
+"""
+from dm.DateTimeUtil import DateTimeUtil
+from dm.Storage import Storage
+from dm.selectors.row.SimpleCachedRowSelector import SimpleCachedRowSelector
+import math
+
+__author__ = 'Peter Tisovčík'
+__email__ = 'xtisov00@stud.fit.vutbr.cz'
+
+
+class ArrayDiffRowWithIntervalSelector(SimpleCachedRowSelector):
+    COLUMNS = [
+        'open_close',
+        'pressure_in_hpa',
+        'temperature_in_celsius',
+        'temperature_in2_celsius',
+        'temperature_out_celsius',
+        'rh_in_percentage',
+        'rh_in2_percentage',
+        'rh_in_absolute_g_m3',
+        'rh_in2_absolute_g_m3',
+        'rh_in_specific_g_kg',
+        'rh_in2_specific_g_kg',
+        'rh_out_percentage',
+        'rh_out_absolute_g_m3',
+        'rh_out_specific_g_kg',
+        'co2_in_ppm',
+    ]
+
+    # virtual column: (minuend column, subtrahend column or constant)
+    DIFF_COLUMNS = {
+        'rh_in_percentage_diff': ('rh_in_percentage', 'rh_out_percentage'),
+        'rh_in_specific_g_kg_diff': ('rh_in_specific_g_kg', 'rh_out_specific_g_kg'),
+        'rh_in_absolute_g_m3_diff': ('rh_in_absolute_g_m3', 'rh_out_absolute_g_m3'),
+        'temperature_in_celsius_diff': ('temperature_in_celsius', 'temperature_out_celsius'),
+        'rh_in2_percentage_diff': ('rh_in2_percentage', 'rh_out_percentage'),
+        'rh_in2_specific_g_kg_diff': ('rh_in2_specific_g_kg', 'rh_out_specific_g_kg'),
+        'rh_in2_absolute_g_m3_diff': ('rh_in2_absolute_g_m3', 'rh_out_absolute_g_m3'),
+        'temperature_in2_celsius_diff': ('temperature_in2_celsius', 'temperature_out_celsius'),
+        'co2_in_ppm_diff': ('co2_in_ppm', 300),
+    }
+
+    def __init__(self, con, table_name, start, end, columns=None):
+        self.start = start
+        self.end = end
+        self.columns = columns
+        self.values = {}
+
+        if self.columns is None:
+            self.columns = self.COLUMNS
+
+        super(ArrayDiffRowWithIntervalSelector, self).__init__(con, table_name)
+
+    def __load(self, columns):
+        selected = []
+        for column in columns:
+            if column in self.DIFF_COLUMNS:
+                minuend, subtrahend = self.DIFF_COLUMNS[column]
+                selected.append(minuend)
+
+                if isinstance(subtrahend, str):
+                    selected.append(subtrahend)
+            else:
+                selected.append(column)
+
+        selected = [x for x in sorted(set(selected)) if x not in self.values]
+        if selected:
+            _, values = Storage.select_interval_columns(self.con, self.start, self.end,
+                                                        selected, self.table_name)
+            self.values.update(values)
+
+        for column in columns:
+            if column not in self.DIFF_COLUMNS or column in self.values:
+                continue
+
+            minuend, subtrahend = self.DIFF_COLUMNS[column]
+            if isinstance(subtrahend, str):
+                self.values[column] = self.values[minuend] - self.values[subtrahend]
+            else:
+                self.values[column] = self.values[minuend] - subtrahend
+
+    def __row_outside(self, column_name, time):
+        if column_name not in self.DIFF_COLUMNS:
+            return super(ArrayDiffRowWithIntervalSelector, self).row(column_name, time)
+
+        minuend, subtrahend = self.DIFF_COLUMNS[column_name]
+        v1 = super(ArrayDiffRowWithIntervalSelector, self).row(minuend, time)
+
+        if isinstance(subtrahend, str):
+            v2 = super(ArrayDiffRowWithIntervalSelector, self).row(subtrahend, time)
+        else:
+            v2 = subtrahend
+
+        return v1 - v2
+
+    def row(self, column_name, time):
+        if not self.values:
+            self.__load(list(self.columns) + list(self.DIFF_COLUMNS.keys()))
+
+        if column_name not in self.values:
+            self.__load([column_name])
+
+        index = time - self.start
+        if index < 0 or index >= len(self.values[column_name]):
+            return self.__row_outside(column_name, time)
+
+        value = float(self.values[column_name][index])
+        if math.isnan(value):
+            t = DateTimeUtil.utc_timestamp_to_str(time, '%Y/%m/%d %H:%M:%S')
+            raise ValueError('empty value at %s' % t)
+
+        return value
+
+    def clear(self):
+        self.values = {}
+        super(ArrayDiffRowWithIntervalSelector, self).clear()
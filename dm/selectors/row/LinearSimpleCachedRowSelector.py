@@ -1,59 +1,111 @@
 """Linear cached selector for one value from database.
 
 Linearization of a given interval and returning of required linearized value.
+
+Values are selected in blocks and linearized values of the whole block are computed
+at once using running sums (sum of x, y, xy and x^2) over a sliding window, so each
+linearized value costs only a constant number of operations.
 """
 from dm.DateTimeUtil import DateTimeUtil
 from dm.Storage import Storage
-from dm.selectors.row import AbstractRowSelector
-from scipy import stats
+from dm.selectors.row.AbstractRowSelector import AbstractRowSelector
+import math
+import numpy as np
 
 __author__ = 'Peter Tisovčík'
 __email__ = 'xtisov00@stud.fit.vutbr.cz'
 
 
 class LinearSimpleCachedRowSelector(AbstractRowSelector):
-    def __init__(self, con, table_name, half_window_size):
+    def __init__(self, con, table_name, half_window_size, block_size=3600):
+        if half_window_size < 1:
+            raise ValueError('half window size must be at least 1')
+
         self.cache = {}
         self.half_window_size = half_window_size
+        self.block_size = block_size
         super(LinearSimpleCachedRowSelector, self).__init__(con, table_name)
 
     def row(self, column_name, time):
         if column_name not in self.cache:
             self.cache[column_name] = {}
 
-        if time in self.cache[column_name]:
-            value = self.cache[column_name][time]
-        else:
-            start = time - self.half_window_size
-            end = time + self.half_window_size
-            res = Storage.select_interval(self.con, start, end, column_name, self.table_name,
-                                          without_none_value=False)
+        block = time // self.block_size
+        block_start = block * self.block_size
+
+        if block not in self.cache[column_name]:
+            self.cache[column_name][block] = self.interval(column_name, block_start,
+                                                           block_start + self.block_size - 1)
+
+        value = float(self.cache[column_name][block][time - block_start])
+        if math.isnan(value):
+            t = DateTimeUtil.utc_timestamp_to_str(time, '%Y/%m/%d %H:%M:%S')
+            raise ValueError('empty value at %s' % t)
 
-            error = False
-            if res is None or None in res:
-                error = True
+        return value
 
-            if error:
-                self.cache[column_name][time] = None
-                t = DateTimeUtil.utc_timestamp_to_str(time, '%Y/%m/%d %H:%M:%S')
-                raise ValueError('empty value at %s' % t)
+    def interval(self, column_name, start, end):
+        """Linearized values for each second of interval <start, end>.
 
-            x = []
-            y = []
-            for i in range(0, len(res)):
-                x.append(i)
-                y.append(res[i])
+        :param column_name: column name
+        :param start: timestamp of interval start
+        :param end: timestamp of interval end (inclusive)
+        :return: array of linearized values, NaN if window contains missing value
+        """
 
-            slope, intercept, _, _, _ = stats.linregress(x, y)
+        _, values = Storage.select_interval_columns(self.con,
+                                                    start - self.half_window_size,
+                                                    end + self.half_window_size,
+                                                    [column_name], self.table_name)
 
-            value = intercept + slope * self.half_window_size
-            self.cache[column_name][time] = value
+        return self.linearize(values[column_name], self.half_window_size)
 
-        if value is None:
-            t = DateTimeUtil.utc_timestamp_to_str(time, '%Y/%m/%d %H:%M:%S')
-            raise ValueError('empty value at %s' % t)
+    @staticmethod
+    def linearize(values, half_window_size, block_size=4096):
+        """Linearization of each window of size 2 * half_window_size + 1 in given values.
 
-        return value
+        Regression line of each window is computed from running sums and evaluated
+        in the middle of the window. Sums are computed in blocks to keep the precision
+        of prefix sums independent on the length of values.
+
+        :param values: array of values, NaN is a missing value
+        :param half_window_size: number of values on each side of the window middle
+        :param block_size: number of windows computed from one prefix sum
+        :return: array of len(values) - 2 * half_window_size linearized values
+        """
+
+        n = 2 * half_window_size + 1
+        count = max(len(values) - n + 1, 0)
+        out = np.full(count, np.nan)
+
+        x = np.arange(n)
+        sum_x = x.sum()
+        sum_xx = (x * x).sum()
+        denominator = n * sum_xx - sum_x ** 2
+
+        for block_start in range(0, count, block_size):
+            block_end = min(block_start + block_size, count)
+
+            y = np.asarray(values[block_start:block_end + n - 1], dtype=np.float64)
+            missing = np.isnan(y)
+            y = np.where(missing, 0.0, y)
+
+            cumsum_y = np.concatenate(([0.0], np.cumsum(y)))
+            cumsum_jy = np.concatenate(([0.0], np.cumsum(np.arange(len(y)) * y)))
+            cumsum_missing = np.concatenate(([0], np.cumsum(missing)))
+
+            k = np.arange(block_end - block_start)
+            sum_y = cumsum_y[k + n] - cumsum_y[k]
+            sum_xy = cumsum_jy[k + n] - cumsum_jy[k] - k * sum_y
+
+            slope = (n * sum_xy - sum_x * sum_y) / denominator
+            intercept = (sum_y - slope * sum_x) / n
+
+            value = intercept + slope * half_window_size
+            value[cumsum_missing[k + n] - cumsum_missing[k] > 0] = np.nan
+            out[block_start:block_end] = value
+
+        return out
 
     def clear(self):
         del self.cache
@@ -0,0 +1,42 @@
+"""Exports tables from database to the column store, existing tables are synchronized.
+"""
+from os.path import dirname, abspath, join
+import sys
+sys.path.append(abspath(join(dirname(__file__), '../..', '')))
+
+from dm.ColumnStore import ColumnStore
+from dm.ConnectionUtil import ConnectionUtil
+import logging
+
+__author__ = 'Peter Tisovčík'
+__email__ = 'xtisov00@stud.fit.vutbr.cz'
+
+
+TABLES = [
+    'measured_klarka',
+    'measured_klarka_reduced',
+    'measured_klarka_shower',
+    'measured_klarka_shower_reduced',
+    'measured_peto',
+    'measured_peto_reduced',
+    'measured_klarka_iqhome',
+    'measured_klarka_iqhome_reduced',
+    'measured_filtered_peto',
+    'measured_filtered_peto_reduced',
+    'measured_david',
+    'measured_david_reduced',
+    'measured_martin',
+    'measured_martin_reduced',
+    'measured_martin_door',
+    'measured_martin_door_reduced',
+]
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.DEBUG, format='%(asctime)s %(levelname)s %(message)s')
+
+    directory = sys.argv[1] if len(sys.argv) > 1 else 'column_store'
+    con = ConnectionUtil.create_con()
+
+    for table_name in TABLES:
+        ColumnStore.export(con, table_name, directory)
@@ -8,6 +8,7 @@ from dm.BeeeOnClient import BeeeOnClient
 from dm.ConnectionUtil import ConnectionUtil
 from dm.DBUtil import DBUtil
 from dm.DateTimeUtil import DateTimeUtil
+from dm.HistoryCache import HistoryCache
 from dm.PreProcessing import PreProcessing
 from dm.Storage import Storage
 import json
@@ -685,7 +686,8 @@ def devices(filename='devices.json'):
     return data
 
 
-def create_update_table(con, clients, start, end, devices, tables):
+def create_update_table(con, clients, start, end, devices, tables, insert_mode='bulk',
+                        download_workers=8, prefetch=2):
     step_size = 600
     time_shift = 1200
     min_commit_size = 10000
@@ -717,6 +719,7 @@ def create_update_table(con, clients, start, end, devices, tables):
 
     logging.info('table: %s' % str_tables)
 
+    intervals = []
     for interval_from in range(start - delete_step, end, step_size):
         interval_to = interval_from + step_size
 
@@ -728,17 +731,27 @@ def create_update_table(con, clients, start, end, devices, tables):
                 # skip inserted interval
                 continue
 
+        intervals.append((interval_from, interval_to))
+
+    # data of all devices and following intervals are downloaded concurrently
+    downloaded = PreProcessing.download_intervals(
+        clients, devices, [(f - time_shift, t + time_shift) for f, t in intervals],
+        download_workers, prefetch)
+
+    for (interval_from, interval_to), data in zip(intervals, downloaded):
         logging.debug('processed interval %s' % DateTimeUtil.create_interval_str(interval_from,
                                                                                  interval_to))
 
-        maps, values = PreProcessing.prepare(clients, devices, interval_from, interval_to,
-                                             last_open_close_state, time_shift)
+        maps, times, columns = PreProcessing.prepare_columns(clients, devices, interval_from,
+                                                             interval_to, last_open_close_state,
+                                                             time_shift, data)
 
         for table in tables:
             if 'filtered' in table[0]:
-                values = PreProcessing.ppm_filter(values)
+                columns = PreProcessing.ppm_filter_columns(columns)
 
-            PreProcessing.insert_values(con, table[0], values, maps, table[1], precision)
+            PreProcessing.insert_columns(con, table[0], times, columns, maps, table[1],
+                                         precision, insert_mode)
             actual_commit_size += step_size // table[1]
 
         if actual_commit_size > min_commit_size:
@@ -848,9 +861,12 @@ if __name__ == '__main__':
     con = ConnectionUtil.create_con()
     cur = con.cursor()
 
+    # downloaded history is stored on disk, offline=True uses only stored history
+    cache = HistoryCache('history_cache', offline=False)
+
     cls = {
-        "ant-work": BeeeOnClient("ant-work.fit.vutbr.cz", 8010),
-        "rehivetech": BeeeOnClient("beeeon.rehivetech.com", 8010),
+        "ant-work": BeeeOnClient("ant-work.fit.vutbr.cz", 8010, cache=cache),
+        "rehivetech": BeeeOnClient("beeeon.rehivetech.com", 8010, cache=cache),
     }
 
     cls['ant-work'].api_key = ConnectionUtil.api_key('ant-work')
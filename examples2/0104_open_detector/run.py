@@ -8,6 +8,7 @@ from dm.AttributeUtil import AttributeUtil
 from dm.CSVUtil import CSVUtil
 from dm.ConnectionUtil import ConnectionUtil
 from dm.DateTimeUtil import DateTimeUtil
+from dm.FeaturePlan import FeaturePlan
 from dm.FilterUtil import FilterUtil
 from dm.Storage import Storage
 from dm.attrs.DifferenceBetweenRealLinear import DifferenceBetweenRealLinear
@@ -458,182 +459,132 @@ no_events_records = [
 ]
 
 
-def func(con, table_name, timestamp, row_selector, interval_selector, end=None):
-    attrs = []
+def feature_plan():
+    plan = FeaturePlan(precision=5)
     columns = [
         'rh_in2_specific_g_kg',
         'rh_in2_absolute_g_m3',
         'temperature_in2_celsius']
-    precision = 5
 
     for column in columns:
         for normalize in [False]:
             intervals_before = [x for x in range(0, 601, 15)]
             intervals_after = [x for x in range(0, 181, 15)]
 
-            op = FirstDifferenceAttrA(con, table_name, row_selector, interval_selector)
-            a, b = op.execute(timestamp=timestamp, column=column, precision=precision,
-                              intervals_before=intervals_before,
-                              intervals_after=intervals_after,
-                              normalize=normalize,
-                              enable_count=True,
-                              prefix='',
-                              selected_before=[intervals_before],
-                              selected_after=[intervals_after])
-            attrs += a + b
-
-            pr = ''
-            be, af = op.geometric_mean(column, precision, b, a, pr)
-            attrs += be + af
-            be, af = op.arithmetic_mean(column, precision, b, a, pr)
-            attrs += be + af
-            be, af = op.variance(column, precision, b, a, pr)
-            attrs += be + af
-            be, af = op.standard_deviation(column, precision, b, a, pr)
-            attrs += be + af
-
-            op = FirstDifferenceAttrB(con, table_name, row_selector, interval_selector)
-            a, b = op.execute(timestamp=timestamp, column=column, precision=precision,
-                              intervals_before=intervals_before,
-                              intervals_after=intervals_after,
-                              normalize=normalize,
-                              enable_count=True,
-                              prefix='',
-                              selected_before=[intervals_before],
-                              selected_after=[intervals_after])
-            attrs += a + b
-
-            pr = 'B_linearne'
-            be, af = op.geometric_mean(column, precision, b, a, pr)
-            attrs += be + af
-            be, af = op.arithmetic_mean(column, precision, b, a, pr)
-            attrs += be + af
-            be, af = op.variance(column, precision, b, a, pr)
-            attrs += be + af
-            be, af = op.standard_deviation(column, precision, b, a, pr)
-            attrs += be + af
-
-            op = SecondDifferenceAttr(con, table_name, row_selector, interval_selector)
-            a, b = op.execute(timestamp=timestamp, column=column, precision=precision,
-                              intervals_before=intervals_before,
-                              intervals_after=intervals_after,
-                              normalize=normalize,
-                              enable_count=True,
-                              prefix='',
-                              selected_before=[intervals_before],
-                              selected_after=[intervals_after])
-            attrs += a + b
-
-            op = DifferenceBetweenRealLinear(con, table_name, row_selector, interval_selector)
-            a, b = op.execute(timestamp=timestamp, column=column, precision=precision,
-                              intervals_before=intervals_before,
-                              intervals_after=intervals_after,
-                              window_size_before=15 * 60, window_size_after=3 * 60,
-                              prefix='')
-            attrs += a + b
-
-            op = FirstDifferenceAttrB(con, table_name, row_selector, interval_selector)
-            a, b = op.execute(timestamp=timestamp, column=column, precision=precision,
-                              intervals_before=[x * x for x in range(4, 25, 1)],
-                              intervals_after=[x * x for x in range(4, 14, 1)],
-                              normalize=normalize,
-                              enable_count=True,
-                              prefix='_x2',
-                              selected_before=[[x * x for x in range(4, 25, 1)]],
-                              selected_after=[[x * x for x in range(4, 14, 1)]])
-            attrs += a + b
-
-            pr = 'B_x2'
-            be, af = op.geometric_mean(column, precision, b, a, pr)
-            attrs += be + af
-            be, af = op.arithmetic_mean(column, precision, b, a, pr)
-            attrs += be + af
-            be, af = op.variance(column, precision, b, a, pr)
-            attrs += be + af
-            be, af = op.standard_deviation(column, precision, b, a, pr)
-            attrs += be + af
-
-            op = SecondDifferenceAttr(con, table_name, row_selector, interval_selector)
-            a, b = op.execute(timestamp=timestamp, column=column, precision=precision,
-                              intervals_before=[x * x for x in range(4, 25, 1)],
-                              intervals_after=[x * x for x in range(4, 14, 1)],
-                              normalize=normalize,
-                              enable_count=True,
-                              prefix='_x2',
-                              selected_before=[[x * x for x in range(4, 25, 1)]],
-                              selected_after=[[x * x for x in range(4, 14, 1)]])
-            attrs += a + b
-
-            op = DifferenceBetweenRealLinear(con, table_name, row_selector, interval_selector)
-            a, b = op.execute(timestamp=timestamp, column=column, precision=precision,
-                              intervals_before=intervals_before,
-                              intervals_after=intervals_after,
-                              window_size_before=15 * 60, window_size_after=3 * 60,
-                              prefix='_x2')
-            attrs += a + b
-
-            op = FirstDifferenceAttrB(con, table_name, row_selector, interval_selector)
-            a, b = op.execute(timestamp=timestamp, column=column, precision=precision,
-                              intervals_before=[x * x * x for x in range(3, 9, 1)],
-                              intervals_after=[x * x * x for x in range(3, 6, 1)],
-                              normalize=normalize,
-                              enable_count=True,
-                              prefix='_x3',
-                              selected_before=[[x * x * x for x in range(3, 9, 1)]],
-                              selected_after=[[x * x * x for x in range(3, 6, 1)]])
-            attrs += a + b
-
-            pr = 'B_x3'
-            be, af = op.geometric_mean(column, precision, b, a, pr)
-            attrs += be + af
-            be, af = op.arithmetic_mean(column, precision, b, a, pr)
-            attrs += be + af
-            be, af = op.variance(column, precision, b, a, pr)
-            attrs += be + af
-            be, af = op.standard_deviation(column, precision, b, a, pr)
-            attrs += be + af
-
-            op = SecondDifferenceAttr(con, table_name, row_selector, interval_selector)
-            a, b = op.execute(timestamp=timestamp, column=column, precision=precision,
-                              intervals_before=[x * x * x for x in range(3, 9, 1)],
-                              intervals_after=[x * x * x for x in range(3, 6, 1)],
-                              normalize=normalize,
-                              enable_count=True,
-                              prefix='_x3',
-                              selected_before=[[x * x * x for x in range(3, 9, 1)]],
-                              selected_after=[[x * x * x for x in range(3, 6, 1)]])
-            attrs += a + b
-
-            op = DifferenceBetweenRealLinear(con, table_name, row_selector, interval_selector)
-            a, b = op.execute(timestamp=timestamp, column=column, precision=precision,
-                              intervals_before=intervals_before,
-                              intervals_after=intervals_after,
-                              window_size_before=15 * 60, window_size_after=3 * 60,
-                              prefix='_x3')
-            attrs += a + b
-
-        op = InOutDiff(con, table_name, row_selector, interval_selector)
-        b, a = op.execute(timestamp=timestamp, column='temperature_in2_celsius_diff', precision=precision,
-                          intervals_before=[0],
-                          intervals_after=[],
-                          prefix='')
-        attrs += b + a
-
-        op = InOutDiff(con, table_name, row_selector, interval_selector)
-        b, a = op.execute(timestamp=timestamp, column='rh_in2_specific_g_kg_diff', precision=precision,
-                          intervals_before=[0],
-                          intervals_after=[],
-                          prefix='')
-        attrs += b + a
-
-        op = InOutDiff(con, table_name, row_selector, interval_selector)
-        b, a = op.execute(timestamp=timestamp, column='rh_in2_absolute_g_m3_diff', precision=precision,
-                          intervals_before=[0],
-                          intervals_after=[],
-                          prefix='')
-        attrs += b + a
-
-    return attrs
+            plan.add(FirstDifferenceAttrA, 'all', '', swap_statistics=True,
+                     column=column,
+                     intervals_before=intervals_before,
+                     intervals_after=intervals_after,
+                     normalize=normalize,
+                     enable_count=True,
+                     prefix='',
+                     selected_before=[intervals_before],
+                     selected_after=[intervals_after])
+
+            plan.add(FirstDifferenceAttrB, 'all', 'B_linearne', swap_statistics=True,
+                     column=column,
+                     intervals_before=intervals_before,
+                     intervals_after=intervals_after,
+                     normalize=normalize,
+                     enable_count=True,
+                     prefix='',
+                     selected_before=[intervals_before],
+                     selected_after=[intervals_after])
+
+            plan.add(SecondDifferenceAttr,
+                     column=column,
+                     intervals_before=intervals_before,
+                     intervals_after=intervals_after,
+                     normalize=normalize,
+                     enable_count=True,
+                     prefix='',
+                     selected_before=[intervals_before],
+                     selected_after=[intervals_after])
+
+            plan.add(DifferenceBetweenRealLinear,
+                     column=column,
+                     intervals_before=intervals_before,
+                     intervals_after=intervals_after,
+                     window_size_before=15 * 60, window_size_after=3 * 60,
+                     prefix='')
+
+            plan.add(FirstDifferenceAttrB, 'all', 'B_x2', swap_statistics=True,
+                     column=column,
+                     intervals_before=[x * x for x in range(4, 25, 1)],
+                     intervals_after=[x * x for x in range(4, 14, 1)],
+                     normalize=normalize,
+                     enable_count=True,
+                     prefix='_x2',
+                     selected_before=[[x * x for x in range(4, 25, 1)]],
+                     selected_after=[[x * x for x in range(4, 14, 1)]])
+
+            plan.add(SecondDifferenceAttr,
+                     column=column,
+                     intervals_before=[x * x for x in range(4, 25, 1)],
+                     intervals_after=[x * x for x in range(4, 14, 1)],
+                     normalize=normalize,
+                     enable_count=True,
+                     prefix='_x2',
+                     selected_before=[[x * x for x in range(4, 25, 1)]],
+                     selected_after=[[x * x for x in range(4, 14, 1)]])
+
+            plan.add(DifferenceBetweenRealLinear,
+                     column=column,
+                     intervals_before=intervals_before,
+                     intervals_after=intervals_after,
+                     window_size_before=15 * 60, window_size_after=3 * 60,
+                     prefix='_x2')
+
+            plan.add(FirstDifferenceAttrB, 'all', 'B_x3', swap_statistics=True,
+                     column=column,
+                     intervals_before=[x * x * x for x in range(3, 9, 1)],
+                     intervals_after=[x * x * x for x in range(3, 6, 1)],
+                     normalize=normalize,
+                     enable_count=True,
+                     prefix='_x3',
+                     selected_before=[[x * x * x for x in range(3, 9, 1)]],
+                     selected_after=[[x * x * x for x in range(3, 6, 1)]])
+
+            plan.add(SecondDifferenceAttr,
+                     column=column,
+                     intervals_before=[x * x * x for x in range(3, 9, 1)],
+                     intervals_after=[x * x * x for x in range(3, 6, 1)],
+                     normalize=normalize,
+                     enable_count=True,
+                     prefix='_x3',
+                     selected_before=[[x * x * x for x in range(3, 9, 1)]],
+                     selected_after=[[x * x * x for x in range(3, 6, 1)]])
+
+            plan.add(DifferenceBetweenRealLinear,
+                     column=column,
+                     intervals_before=intervals_before,
+                     intervals_after=intervals_after,
+                     window_size_before=15 * 60, window_size_after=3 * 60,
+                     prefix='_x3')
+
+        plan.add(InOutDiff,
+                 column='temperature_in2_celsius_diff',
+                 intervals_before=[0],
+                 intervals_after=[],
+                 prefix='')
+
+        plan.add(InOutDiff,
+                 column='rh_in2_specific_g_kg_diff',
+                 intervals_before=[0],
+                 intervals_after=[],
+                 prefix='')
+
+        plan.add(InOutDiff,
+                 column='rh_in2_absolute_g_m3_diff',
+                 intervals_before=[0],
+                 intervals_after=[],
+                 prefix='')
+
+    return plan
+
+
+# vsetky atributy su popisane planom, ktory sa vola rovnako ako funkcia func
+func = feature_plan()
 
 
 def training_set(events_file: str, no_event_time_shift: int, table_name: str):
@@ -6,9 +6,8 @@ sys.path.append(abspath(join(dirname(__file__), '../..', '')))
 
 from datetime import timedelta
 from dm.ConnectionUtil import ConnectionUtil
-from dm.Performance import Performance
+from dm.ExampleRunner import ExampleRunner
 from shutil import copyfile
-from subprocess import PIPE, run
 import argparse
 import logging
 import os
@@ -135,6 +134,8 @@ if __name__ == '__main__':
     logging.basicConfig(level=logging.DEBUG, format='%(asctime)s %(levelname)s %(message)s')
     parser = argparse.ArgumentParser()
     parser.add_argument('dir', nargs='?', default='.', const='.')
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help='number of concurrently running processes')
     args = parser.parse_args()
 
     logging.info('start')
@@ -173,34 +174,24 @@ if __name__ == '__main__':
             logging.debug('end of preparing testing file {0}'.format(test_file))
 
         wrong_all = []
-        output_file = '{0}/out.csv'.format(args.dir)
-        for process in list_of_processes(args.dir):
-            if os.path.isfile(output_file):
-                os.remove(output_file)
-
-            cmd = [
-                launcher,
-                process
-            ]
-
-            start_time = time.monotonic()
-            result = run(cmd, stdout=PIPE, stderr=PIPE, universal_newlines=True)
-            end_time = time.monotonic()
-            duration1 = timedelta(seconds=end_time - start_time)
-
+        start_time = time.monotonic()
+        results = ExampleRunner.evaluate_processes(launcher, list_of_processes(args.dir),
+                                                   args.dir, '{0}/testing.csv'.format(args.dir),
+                                                   BEFORE_TIME, AFTER_TIME, args.workers)
+        wall_time = timedelta(seconds=time.monotonic() - start_time)
+
+        for res in results:
+            process = res['process']
+            duration1 = timedelta(seconds=res['run_time'])
             str_process = '{0:50} '.format(process)
 
-            if os.path.isfile(output_file):
-                start_time2 = time.monotonic()
-                p = Performance(abspath(output_file))
-                _, _, p1 = p.simple()
-                table2, wrong2, p2 = p.with_delay(BEFORE_TIME, AFTER_TIME)
-                end_time2 = time.monotonic()
+            if res['simple'] is not None:
+                wrong2 = res['wrong']
                 wrong_all += wrong2 + ['-------------------']
 
-                duration2 = timedelta(seconds=end_time2 - start_time2)
-                o1 = generate_row(str_process, p1, p.count, duration1, duration2)
-                o2 = generate_row(str_process, p2, p.count, '', '')
+                duration2 = timedelta(seconds=res['evaluation_time'])
+                o1 = generate_row(str_process, res['simple'], res['records'], duration1, duration2)
+                o2 = generate_row(str_process, res['with_delay'], res['records'], '', '')
 
                 logging.debug(o1)
                 logging.debug(o2)
@@ -220,6 +211,12 @@ if __name__ == '__main__':
                 logging.error(o3)
                 output += o3 + '\n'
 
+        total_time = timedelta(seconds=sum(x['run_time'] + x['evaluation_time'] for x in results))
+        o4 = 'wall time: {0}, sum of process times: {1}, workers: {2}'.format(
+            str(wall_time)[:9], str(total_time)[:9], args.workers)
+        logging.info(o4)
+        output += o4 + '\n'
+
         if args.dir != '.':
             res_filename = '{1}.res'.format(args.dir, test_file[:-4])
             with open(res_filename, 'w') as f:
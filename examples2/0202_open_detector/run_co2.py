@@ -9,6 +9,8 @@ from dm.AttributeUtil import AttributeUtil
 from dm.CSVUtil import CSVUtil
 from dm.ConnectionUtil import ConnectionUtil
 from dm.DateTimeUtil import DateTimeUtil
+from dm.FeatureCache import FeatureCache
+from dm.FeaturePlan import FeaturePlan
 from dm.FilterUtil import FilterUtil
 from dm.Storage import Storage
 from dm.attrs.DifferenceBetweenRealLinear import DifferenceBetweenRealLinear
@@ -621,12 +623,11 @@ def simple_f(value, timestamp):
     return value
 
 
-def func(con, table_name, timestamp, row_selector, interval_selector):
-    attrs = []
+def feature_plan():
+    plan = FeaturePlan(precision=2, transform=simple_f)
     columns = [
         'co2_in_ppm'
     ]
-    precision = 2
 
     for column in columns:
         for normalize in [False]:
@@ -635,163 +636,99 @@ def func(con, table_name, timestamp, row_selector, interval_selector):
 
             #
             # linearny posun DifferenceA
-            op = FirstDifferenceAttrA(con, table_name, row_selector, interval_selector, simple_f)
-            b, a = op.execute(timestamp=timestamp, column=column, precision=precision,
-                              intervals_before=intervals_before,
-                              intervals_after=intervals_after,
-                              normalize=normalize,
-                              enable_count=True,
-                              prefix='',
-                              selected_before=[intervals_before],
-                              selected_after=[intervals_after])
-            attrs += b + a
-
-            pr = '_linear'
-            be, af = op.geometric_mean(column, precision, b, a, pr)
-            attrs += be + af
-            be, af = op.arithmetic_mean(column, precision, b, a, pr)
-            attrs += be + af
-            be, af = op.variance(column, precision, b, a, pr)
-            attrs += be + af
-            be, af = op.standard_deviation(column, precision, b, a, pr)
-            attrs += be + af
+            plan.add(FirstDifferenceAttrA, 'all', '_linear',
+                     column=column,
+                     intervals_before=intervals_before,
+                     intervals_after=intervals_after,
+                     normalize=normalize,
+                     enable_count=True,
+                     prefix='',
+                     selected_before=[intervals_before],
+                     selected_after=[intervals_after])
 
             #
             # linearny posun DifferenceB
-            op = FirstDifferenceAttrB(con, table_name, row_selector, interval_selector, simple_f)
-            b, a = op.execute(timestamp=timestamp, column=column, precision=precision,
-                              intervals_before=intervals_before,
-                              intervals_after=intervals_after,
-                              normalize=normalize,
-                              enable_count=True,
-                              prefix='',
-                              selected_before=[intervals_before],
-                              selected_after=[intervals_after])
-            attrs += b + a
-
-            pr = '_linear'
-            be, af = op.geometric_mean(column, precision, b, a, pr)
-            attrs += be + af
-            be, af = op.arithmetic_mean(column, precision, b, a, pr)
-            attrs += be + af
-            be, af = op.variance(column, precision, b, a, pr)
-            attrs += be + af
-            be, af = op.standard_deviation(column, precision, b, a, pr)
-            attrs += be + af
-
-            op = DifferenceBetweenRealLinear(con, table_name, row_selector, interval_selector, simple_f)
-            b, a = op.execute(timestamp=timestamp, column=column, precision=precision,
-                              intervals_before=intervals_before,
-                              intervals_after=intervals_after,
-                              window_size_before=20*60, window_size_after=3*60,
-                              prefix='')
-            attrs += b + a
-
-            pr = '_linear'
-            be, af = op.geometric_mean(column, precision, b, a, pr)
-            attrs += be + af
-            be, af = op.arithmetic_mean(column, precision, b, a, pr)
-            attrs += be + af
-            be, af = op.variance(column, precision, b, a, pr)
-            attrs += be + af
-            be, af = op.standard_deviation(column, precision, b, a, pr)
-            attrs += be + af
+            plan.add(FirstDifferenceAttrB, 'all', '_linear',
+                     column=column,
+                     intervals_before=intervals_before,
+                     intervals_after=intervals_after,
+                     normalize=normalize,
+                     enable_count=True,
+                     prefix='',
+                     selected_before=[intervals_before],
+                     selected_after=[intervals_after])
+
+            plan.add(DifferenceBetweenRealLinear, 'all', '_linear',
+                     column=column,
+                     intervals_before=intervals_before,
+                     intervals_after=intervals_after,
+                     window_size_before=20*60, window_size_after=3*60,
+                     prefix='')
 
             #
             # x^2 posun
-            op = FirstDifferenceAttrB(con, table_name, row_selector, interval_selector, simple_f)
-            b, a = op.execute(timestamp=timestamp, column=column, precision=precision,
-                              intervals_before=[x * x for x in range(2, 31, 1)],
-                              intervals_after=[x * x for x in range(2, 14, 1)],
-                              normalize=normalize,
-                              enable_count=True,
-                              prefix='_x2',
-                              selected_before=[[x * x for x in range(2, 31, 1)]],
-                              selected_after=[[x * x for x in range(2, 14, 1)]])
-            attrs += b + a
-
-            pr = '_x2'
-            be, af = op.geometric_mean(column, precision, b, a, pr)
-            attrs += be + af
-            be, af = op.arithmetic_mean(column, precision, b, a, pr)
-            attrs += be + af
-            be, af = op.variance(column, precision, b, a, pr)
-            attrs += be + af
-            be, af = op.standard_deviation(column, precision, b, a, pr)
-            attrs += be + af
+            plan.add(FirstDifferenceAttrB, 'all', '_x2',
+                     column=column,
+                     intervals_before=[x * x for x in range(2, 31, 1)],
+                     intervals_after=[x * x for x in range(2, 14, 1)],
+                     normalize=normalize,
+                     enable_count=True,
+                     prefix='_x2',
+                     selected_before=[[x * x for x in range(2, 31, 1)]],
+                     selected_after=[[x * x for x in range(2, 14, 1)]])
 
             #
             # x^3 posun
-            op = FirstDifferenceAttrB(con, table_name, row_selector, interval_selector, simple_f)
-            b, a = op.execute(timestamp=timestamp, column=column, precision=precision,
-                              intervals_before=[x * x * x for x in range(2, 10, 1)],
-                              intervals_after=[x * x * x for x in range(2, 6, 1)],
-                              normalize=normalize,
-                              enable_count=True,
-                              prefix='_x3',
-                              selected_before=[[x * x * x for x in range(2, 10, 1)]],
-                              selected_after=[[x * x * x for x in range(2, 6, 1)]])
-            attrs += b + a
-
-            pr = '_x3'
-            be, af = op.geometric_mean(column, precision, b, a, pr)
-            attrs += be + af
-            be, af = op.arithmetic_mean(column, precision, b, a, pr)
-            attrs += be + af
-            be, af = op.variance(column, precision, b, a, pr)
-            attrs += be + af
-            be, af = op.standard_deviation(column, precision, b, a, pr)
-            attrs += be + af
+            plan.add(FirstDifferenceAttrB, 'all', '_x3',
+                     column=column,
+                     intervals_before=[x * x * x for x in range(2, 10, 1)],
+                     intervals_after=[x * x * x for x in range(2, 6, 1)],
+                     normalize=normalize,
+                     enable_count=True,
+                     prefix='_x3',
+                     selected_before=[[x * x * x for x in range(2, 10, 1)]],
+                     selected_after=[[x * x * x for x in range(2, 6, 1)]])
 
             #
             # GrowRate - linearne
-            op = GrowthRate(con, table_name, row_selector, interval_selector, simple_f)
-            b, a = op.execute(timestamp=timestamp, column=column, precision=precision,
-                              intervals_before=[x for x in range(5, 901, 15)],
-                              intervals_after=[x for x in range(5, 181, 15)],
-                              value_delay=15, prefix='_step20')
-            attrs += b + a
-            be, af = op.arithmetic_mean(column, precision, b, a, 'G_linear_step_15')
-            attrs += be + af
+            plan.add(GrowthRate, 'arithmetic_mean', 'G_linear_step_15',
+                     column=column,
+                     intervals_before=[x for x in range(5, 901, 15)],
+                     intervals_after=[x for x in range(5, 181, 15)],
+                     value_delay=15, prefix='_step20')
 
             # GrowRate - linearne
-            op = GrowthRate(con, table_name, row_selector, interval_selector, simple_f)
-            b, a = op.execute(timestamp=timestamp, column=column, precision=precision,
-                              intervals_before=[x for x in range(5, 901, 30)],
-                              intervals_after=[x for x in range(5, 181, 30)],
-                              value_delay=30, prefix='_step_30')
-            attrs += b + a
-            be, af = op.arithmetic_mean(column, precision, b, a, 'G_linear_step_30')
-            attrs += be + af
+            plan.add(GrowthRate, 'arithmetic_mean', 'G_linear_step_30',
+                     column=column,
+                     intervals_before=[x for x in range(5, 901, 30)],
+                     intervals_after=[x for x in range(5, 181, 30)],
+                     value_delay=30, prefix='_step_30')
 
             # GrowRate - x^2
-            op = GrowthRate(con, table_name, row_selector, interval_selector, simple_f)
-            b, a = op.execute(timestamp=timestamp, column=column, precision=precision,
-                              intervals_before=[x * x for x in range(2, 31, 1)],
-                              intervals_after=[x * x for x in range(2, 14, 1)],
-                              value_delay=30, prefix='_x2')
-            attrs += b + a
-            be, af = op.arithmetic_mean(column, precision, b, a, 'Grow_x2')
-            attrs += be + af
+            plan.add(GrowthRate, 'arithmetic_mean', 'Grow_x2',
+                     column=column,
+                     intervals_before=[x * x for x in range(2, 31, 1)],
+                     intervals_after=[x * x for x in range(2, 14, 1)],
+                     value_delay=30, prefix='_x2')
 
             # GrowRate - x^3
-            op = GrowthRate(con, table_name, row_selector, interval_selector, simple_f)
-            b, a = op.execute(timestamp=timestamp, column=column, precision=precision,
-                              intervals_before=[x * x * x for x in range(2, 10, 1)],
-                              intervals_after=[x * x * x for x in range(2, 6, 1)],
-                              value_delay=30, prefix='_x3')
-            attrs += b + a
-            be, af = op.arithmetic_mean(column, precision, b, a, 'Grow_x3')
-            attrs += be + af
+            plan.add(GrowthRate, 'arithmetic_mean', 'Grow_x3',
+                     column=column,
+                     intervals_before=[x * x * x for x in range(2, 10, 1)],
+                     intervals_after=[x * x * x for x in range(2, 6, 1)],
+                     value_delay=30, prefix='_x3')
 
-        op = InOutDiff(con, table_name, row_selector, interval_selector, simple_f)
-        b, a = op.execute(timestamp=timestamp, column='co2_in_ppm_diff', precision=precision,
-                          intervals_before=[1],
-                          intervals_after=[],
-                          prefix='')
-        attrs += b + a
+        plan.add(InOutDiff,
+                 column='co2_in_ppm_diff',
+                 intervals_before=[1],
+                 intervals_after=[],
+                 prefix='')
 
-    return attrs
+    return plan
+
+
+# vsetky atributy su popisane planom, ktory sa vola rovnako ako funkcia func
+func = feature_plan()
 
 
 def training_set(events_file: str, no_event_time_shift: int, table_name: str, directory):
@@ -820,10 +757,10 @@ def training_set(events_file: str, no_event_time_shift: int, table_name: str, di
 
     # trenovacia mnozina
     logging.info('start computing of training set')
-    training, tr_events = AttributeUtil.cached_training_data(con, table_name, filtered, func,
-                                                             row_selector, interval_selector,
-                                                             'open',
-                                                             '{0}/training_cached.csv'.format(directory))
+    cache = FeatureCache('{0}/feature_cache'.format(directory))
+    training, tr_events = AttributeUtil.memoized_training_data(con, table_name, filtered, func,
+                                                               row_selector, interval_selector,
+                                                               'open', cache)
     count = len(training)
     logging.info('training set contains %d events (%d records)' % (count / 2, count))
 
@@ -843,14 +780,16 @@ def training_set(events_file: str, no_event_time_shift: int, table_name: str, di
     logging.info('end preparing file of training set')
 
 
-def testing_set(table_name: str, start, end, filename):
+def testing_set(table_name: str, start, end, filename, workers=1, resume=False):
     logging.info('start')
 
     con = ConnectionUtil.create_con()
 
     logging.info('start computing of testing set')
     length = AttributeUtil.testing_data_with_write(con, table_name, start, end, 30, func,
-                                                   None, None, 'open', filename)
+                                                   None, None, 'open', filename,
+                                                   vectorized_scan=True, workers=workers,
+                                                   resume=resume)
     logging.info('testing set contains %d records' % length)
     logging.info('end computing of testing set')
 
@@ -868,7 +807,8 @@ def testing_month(table_name, start, directory):
     ]
 
     for file_name in file_names:
-        testing_set(table_name, start, start + mesiac, file_name)
+        # dlhe generovanie pokracuje od posledneho zapisaneho bloku
+        testing_set(table_name, start, start + mesiac, file_name, resume=True)
         start += mesiac
 
 
@@ -877,19 +817,23 @@ def generic_testing(directory):
 
     # David
     start = int(DateTimeUtil.local_time_str_to_utc('2019/04/03 18:00:00').timestamp())
-    testing_set('measured_david', start, end, '{0}/gt_david.csv'.format(directory))
+    testing_set('measured_david', start, end, '{0}/gt_david.csv'.format(directory),
+                os.cpu_count())
 
     # Martin
     start = int(DateTimeUtil.local_time_str_to_utc('2019/04/01 18:00:00').timestamp())
-    testing_set('measured_martin', start, end, '{0}/gt_martin.csv'.format(directory))
+    testing_set('measured_martin', start, end, '{0}/gt_martin.csv'.format(directory),
+                os.cpu_count())
 
     # Peto , februar, marec, april
     start = int(DateTimeUtil.local_time_str_to_utc('2019/02/04 18:00:00').timestamp())
-    testing_set('measured_filtered_peto', start, end, '{0}/gt_peto.csv'.format(directory))
+    testing_set('measured_filtered_peto', start, end, '{0}/gt_peto.csv'.format(directory),
+                os.cpu_count())
 
     # Klarka
     start = int(DateTimeUtil.local_time_str_to_utc('2018/12/18 18:00:00').timestamp())
-    testing_set('measured_klarka', start, end, '{0}/gt_klarka.csv'.format(directory))
+    testing_set('measured_klarka', start, end, '{0}/gt_klarka.csv'.format(directory),
+                os.cpu_count())
 
 
 if __name__ == '__main__':
@@ -9,6 +9,7 @@ from dm.AttributeUtil import AttributeUtil
 from dm.CSVUtil import CSVUtil
 from dm.ConnectionUtil import ConnectionUtil
 from dm.DateTimeUtil import DateTimeUtil
+from dm.FeaturePlan import FeaturePlan
 from dm.FilterUtil import FilterUtil
 from dm.Storage import Storage
 from dm.attrs.DifferenceBetweenRealLinear import DifferenceBetweenRealLinear
@@ -715,15 +716,14 @@ def simple_f(value, timestamp):
     return value
 
 
-def func(con, table_name, timestamp, row_selector, interval_selector):
-    attrs = []
+def feature_plan():
+    plan = FeaturePlan(precision=2, transform=simple_f)
     columns = [
         'co2_in_ppm',
         'temperature_in_celsius',
         'rh_in_specific_g_kg',
         'rh_out_specific_g_kg',
     ]
-    precision = 2
 
     for column in columns:
         for normalize in [False]:
@@ -732,192 +732,124 @@ def func(con, table_name, timestamp, row_selector, interval_selector):
 
             #
             # linearny posun DifferenceA
-            op = FirstDifferenceAttrA(con, table_name, row_selector, interval_selector, simple_f)
-            b, a = op.execute(timestamp=timestamp, column=column, precision=precision,
-                              intervals_before=intervals_before,
-                              intervals_after=intervals_after,
-                              normalize=normalize,
-                              enable_count=True,
-                              prefix='',
-                              selected_before=[intervals_before],
-                              selected_after=[intervals_after])
-            attrs += b + a
-
-            pr = '_linear'
-            be, af = op.geometric_mean(column, precision, b, a, pr)
-            attrs += be + af
-            be, af = op.arithmetic_mean(column, precision, b, a, pr)
-            attrs += be + af
-            be, af = op.variance(column, precision, b, a, pr)
-            attrs += be + af
-            be, af = op.standard_deviation(column, precision, b, a, pr)
-            attrs += be + af
+            plan.add(FirstDifferenceAttrA, 'all', '_linear',
+                     column=column,
+                     intervals_before=intervals_before,
+                     intervals_after=intervals_after,
+                     normalize=normalize,
+                     enable_count=True,
+                     prefix='',
+                     selected_before=[intervals_before],
+                     selected_after=[intervals_after])
 
             #
             # linearny posun DifferenceB
-            op = FirstDifferenceAttrB(con, table_name, row_selector, interval_selector, simple_f)
-            b, a = op.execute(timestamp=timestamp, column=column, precision=precision,
-                              intervals_before=intervals_before,
-                              intervals_after=intervals_after,
-                              normalize=normalize,
-                              enable_count=True,
-                              prefix='',
-                              selected_before=[intervals_before],
-                              selected_after=[intervals_after])
-            attrs += b + a
-
-            pr = '_linear'
-            be, af = op.geometric_mean(column, precision, b, a, pr)
-            attrs += be + af
-            be, af = op.arithmetic_mean(column, precision, b, a, pr)
-            attrs += be + af
-            be, af = op.variance(column, precision, b, a, pr)
-            attrs += be + af
-            be, af = op.standard_deviation(column, precision, b, a, pr)
-            attrs += be + af
-
-            op = DifferenceBetweenRealLinear(con, table_name, row_selector, interval_selector, simple_f)
-            b, a = op.execute(timestamp=timestamp, column=column, precision=precision,
-                              intervals_before=intervals_before,
-                              intervals_after=intervals_after,
-                              window_size_before=20*60, window_size_after=3*60,
-                              prefix='')
-            attrs += b + a
-
-            pr = '_linear'
-            be, af = op.geometric_mean(column, precision, b, a, pr)
-            attrs += be + af
-            be, af = op.arithmetic_mean(column, precision, b, a, pr)
-            attrs += be + af
-            be, af = op.variance(column, precision, b, a, pr)
-            attrs += be + af
-            be, af = op.standard_deviation(column, precision, b, a, pr)
-            attrs += be + af
+            plan.add(FirstDifferenceAttrB, 'all', '_linear',
+                     column=column,
+                     intervals_before=intervals_before,
+                     intervals_after=intervals_after,
+                     normalize=normalize,
+                     enable_count=True,
+                     prefix='',
+                     selected_before=[intervals_before],
+                     selected_after=[intervals_after])
+
+            plan.add(DifferenceBetweenRealLinear, 'all', '_linear',
+                     column=column,
+                     intervals_before=intervals_before,
+                     intervals_after=intervals_after,
+                     window_size_before=20*60, window_size_after=3*60,
+                     prefix='')
 
             #
             # x^2 posun
-            op = FirstDifferenceAttrB(con, table_name, row_selector, interval_selector, simple_f)
-            b, a = op.execute(timestamp=timestamp, column=column, precision=precision,
-                              intervals_before=[x * x for x in range(2, 31, 1)],
-                              intervals_after=[x * x for x in range(2, 14, 1)],
-                              normalize=normalize,
-                              enable_count=True,
-                              prefix='_x2',
-                              selected_before=[[x * x for x in range(2, 31, 1)]],
-                              selected_after=[[x * x for x in range(2, 14, 1)]])
-            attrs += b + a
-
-            pr = '_x2'
-            be, af = op.geometric_mean(column, precision, b, a, pr)
-            attrs += be + af
-            be, af = op.arithmetic_mean(column, precision, b, a, pr)
-            attrs += be + af
-            be, af = op.variance(column, precision, b, a, pr)
-            attrs += be + af
-            be, af = op.standard_deviation(column, precision, b, a, pr)
-            attrs += be + af
+            plan.add(FirstDifferenceAttrB, 'all', '_x2',
+                     column=column,
+                     intervals_before=[x * x for x in range(2, 31, 1)],
+                     intervals_after=[x * x for x in range(2, 14, 1)],
+                     normalize=normalize,
+                     enable_count=True,
+                     prefix='_x2',
+                     selected_before=[[x * x for x in range(2, 31, 1)]],
+                     selected_after=[[x * x for x in range(2, 14, 1)]])
 
             #
             # x^3 posun
-            op = FirstDifferenceAttrB(con, table_name, row_selector, interval_selector, simple_f)
-            b, a = op.execute(timestamp=timestamp, column=column, precision=precision,
-                              intervals_before=[x * x * x for x in range(2, 10, 1)],
-                              intervals_after=[x * x * x for x in range(2, 6, 1)],
-                              normalize=normalize,
-                              enable_count=True,
-                              prefix='_x3',
-                              selected_before=[[x * x * x for x in range(2, 10, 1)]],
-                              selected_after=[[x * x * x for x in range(2, 6, 1)]])
-            attrs += b + a
-
-            pr = '_x3'
-            be, af = op.geometric_mean(column, precision, b, a, pr)
-            attrs += be + af
-            be, af = op.arithmetic_mean(column, precision, b, a, pr)
-            attrs += be + af
-            be, af = op.variance(column, precision, b, a, pr)
-            attrs += be + af
-            be, af = op.standard_deviation(column, precision, b, a, pr)
-            attrs += be + af
+            plan.add(FirstDifferenceAttrB, 'all', '_x3',
+                     column=column,
+                     intervals_before=[x * x * x for x in range(2, 10, 1)],
+                     intervals_after=[x * x * x for x in range(2, 6, 1)],
+                     normalize=normalize,
+                     enable_count=True,
+                     prefix='_x3',
+                     selected_before=[[x * x * x for x in range(2, 10, 1)]],
+                     selected_after=[[x * x * x for x in range(2, 6, 1)]])
 
             #
             # GrowRate - linearne
-            op = GrowthRate(con, table_name, row_selector, interval_selector, simple_f)
-            b, a = op.execute(timestamp=timestamp, column=column, precision=precision,
-                              intervals_before=[x for x in range(5, 901, 15)],
-                              intervals_after=[x for x in range(5, 181, 15)],
-                              value_delay=15, prefix='_step20')
-            attrs += b + a
-            be, af = op.arithmetic_mean(column, precision, b, a, 'G_linear_step_15')
-            attrs += be + af
+            plan.add(GrowthRate, 'arithmetic_mean', 'G_linear_step_15',
+                     column=column,
+                     intervals_before=[x for x in range(5, 901, 15)],
+                     intervals_after=[x for x in range(5, 181, 15)],
+                     value_delay=15, prefix='_step20')
 
             # GrowRate - linearne
-            op = GrowthRate(con, table_name, row_selector, interval_selector, simple_f)
-            b, a = op.execute(timestamp=timestamp, column=column, precision=precision,
-                              intervals_before=[x for x in range(5, 901, 30)],
-                              intervals_after=[x for x in range(5, 181, 30)],
-                              value_delay=30, prefix='_step_30')
-            attrs += b + a
-            be, af = op.arithmetic_mean(column, precision, b, a, 'G_linear_step_30')
-            attrs += be + af
+            plan.add(GrowthRate, 'arithmetic_mean', 'G_linear_step_30',
+                     column=column,
+                     intervals_before=[x for x in range(5, 901, 30)],
+                     intervals_after=[x for x in range(5, 181, 30)],
+                     value_delay=30, prefix='_step_30')
 
             # GrowRate - x^2
-            op = GrowthRate(con, table_name, row_selector, interval_selector, simple_f)
-            b, a = op.execute(timestamp=timestamp, column=column, precision=precision,
-                              intervals_before=[x * x for x in range(2, 31, 1)],
-                              intervals_after=[x * x for x in range(2, 14, 1)],
-                              value_delay=30, prefix='_x2')
-            attrs += b + a
-            be, af = op.arithmetic_mean(column, precision, b, a, 'Grow_x2')
-            attrs += be + af
+            plan.add(GrowthRate, 'arithmetic_mean', 'Grow_x2',
+                     column=column,
+                     intervals_before=[x * x for x in range(2, 31, 1)],
+                     intervals_after=[x * x for x in range(2, 14, 1)],
+                     value_delay=30, prefix='_x2')
 
             # GrowRate - x^3
-            op = GrowthRate(con, table_name, row_selector, interval_selector, simple_f)
-            b, a = op.execute(timestamp=timestamp, column=column, precision=precision,
-                              intervals_before=[x * x * x for x in range(2, 10, 1)],
-                              intervals_after=[x * x * x for x in range(2, 6, 1)],
-                              value_delay=30, prefix='_x3')
-            attrs += b + a
-            be, af = op.arithmetic_mean(column, precision, b, a, 'Grow_x3')
-            attrs += be + af
-
-        op = InOutDiff(con, table_name, row_selector, interval_selector, simple_f)
-        b, a = op.execute(timestamp=timestamp, column='co2_in_ppm_diff', precision=precision,
-                          intervals_before=[1],
-                          intervals_after=[],
-                          prefix='')
-        attrs += b + a
+            plan.add(GrowthRate, 'arithmetic_mean', 'Grow_x3',
+                     column=column,
+                     intervals_before=[x * x * x for x in range(2, 10, 1)],
+                     intervals_after=[x * x * x for x in range(2, 6, 1)],
+                     value_delay=30, prefix='_x3')
+
+        plan.add(InOutDiff,
+                 column='co2_in_ppm_diff',
+                 intervals_before=[1],
+                 intervals_after=[],
+                 prefix='')
 
         # diff T + H in/out
-        op = InOutDiff(con, table_name, row_selector, interval_selector, simple_f)
-        b, a = op.execute(timestamp=timestamp, column='temperature_in_celsius_diff', precision=precision,
-                          intervals_before=[1],
-                          intervals_after=[],
-                          prefix='')
-        attrs += b + a
-
-        op = InOutDiff(con, table_name, row_selector, interval_selector, simple_f)
-        b, a = op.execute(timestamp=timestamp, column='rh_in_percentage_diff', precision=precision,
-                          intervals_before=[1],
-                          intervals_after=[],
-                          prefix='')
-        attrs += b + a
-
-        op = InOutDiff(con, table_name, row_selector, interval_selector, simple_f)
-        b, a = op.execute(timestamp=timestamp, column='rh_in_specific_g_kg_diff', precision=precision,
-                          intervals_before=[1],
-                          intervals_after=[],
-                          prefix='')
-        attrs += b + a
-
-        op = InOutDiff(con, table_name, row_selector, interval_selector, simple_f)
-        b, a = op.execute(timestamp=timestamp, column='rh_in_absolute_g_m3_diff', precision=precision,
-                          intervals_before=[1],
-                          intervals_after=[],
-                          prefix='')
-        attrs += b + a
-
-    return attrs
+        plan.add(InOutDiff,
+                 column='temperature_in_celsius_diff',
+                 intervals_before=[1],
+                 intervals_after=[],
+                 prefix='')
+
+        plan.add(InOutDiff,
+                 column='rh_in_percentage_diff',
+                 intervals_before=[1],
+                 intervals_after=[],
+                 prefix='')
+
+        plan.add(InOutDiff,
+                 column='rh_in_specific_g_kg_diff',
+                 intervals_before=[1],
+                 intervals_after=[],
+                 prefix='')
+
+        plan.add(InOutDiff,
+                 column='rh_in_absolute_g_m3_diff',
+                 intervals_before=[1],
+                 intervals_after=[],
+                 prefix='')
+
+    return plan
+
+
+# vsetky atributy su popisane planom, ktory sa vola rovnako ako funkcia func
+func = feature_plan()
 
 
 def training_set(events_file: str, no_event_time_shift: int, table_name: str, directory):
@@ -976,7 +908,8 @@ def testing_set(table_name: str, start, end, filename):
 
     logging.info('start computing of testing set')
     length = AttributeUtil.testing_data_with_write(con, table_name, start, end, 30, func,
-                                                   None, None, 'open', filename)
+                                                   None, None, 'open', filename,
+                                                   vectorized_scan=True)
     logging.info('testing set contains %d records' % length)
     logging.info('end computing of testing set')
 
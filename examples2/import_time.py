@@ -0,0 +1,119 @@
+"""Measures import time of modules and entry points of detectors using python -X importtime.
+
+Each module is imported in a new process. Script fails if import takes longer than the given
+budget or if some heavy dependency (scipy, sklearn, matplotlib, sympy) is imported at
+start of the process, these dependencies must be imported only when they are used.
+
+Usage: import_time.py [budget_ms]
+"""
+from os.path import dirname, abspath, join
+import logging
+import os
+import subprocess
+import sys
+
+__author__ = 'Peter Tisovčík'
+__email__ = 'xtisov00@stud.fit.vutbr.cz'
+
+
+ROOT = abspath(join(dirname(__file__), '..'))
+
+HEAVY = ['scipy', 'sklearn', 'matplotlib', 'sympy']
+
+MODULES = [
+    'dm.AttributeUtil',
+    'dm.Differences',
+    'dm.GraphUtil',
+    'dm.HeatMap',
+    'dm.attrs.DifferenceBetweenRealLinear',
+    'dm.attrs.InLinear',
+    'dm.co2regression.SimpleExpRegression',
+    'dm.coefficients.DistanceToLine',
+]
+
+ENTRY_POINTS = [
+    'examples2/0103_open_ventilation_length_detector/run.py',
+    'examples2/0104_open_detector/run.py',
+    'examples2/0105_shower_detector/run.py',
+    'examples2/0202_open_detector/run_co2.py',
+]
+
+DEFAULT_BUDGET_MS = 1000
+
+
+def import_code(name):
+    """Code that imports module or file without execution of its main part."""
+
+    if not name.endswith('.py'):
+        return 'import {0}'.format(name)
+
+    return 'import runpy; runpy.run_path({0!r}, run_name="entry_point")'.format(join(ROOT, name))
+
+
+def measure(name):
+    """Imports module in a new process.
+
+    :return: cumulative import time in ms, imported heavy dependencies, the slowest modules
+             or None if import failed
+    """
+
+    env = dict(os.environ)
+    env['PYTHONPATH'] = ROOT + os.pathsep + env.get('PYTHONPATH', '')
+
+    res = subprocess.run([sys.executable, '-X', 'importtime', '-c', import_code(name)],
+                         cwd=ROOT, env=env, stdout=subprocess.DEVNULL,
+                         stderr=subprocess.PIPE, universal_newlines=True)
+
+    if res.returncode != 0:
+        logging.error('import of {0} failed:\n{1}'.format(name, res.stderr.strip()))
+        return None
+
+    total = 0
+    modules = []
+    heavy = set()
+    for line in res.stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+
+        _, cumulative, raw_module = line[len('import time:'):].split('|')
+        module = raw_module.strip()
+        cumulative = int(cumulative) / 1000
+
+        if module.split('.')[0] in HEAVY:
+            heavy.add(module.split('.')[0])
+
+        # names of nested imports are indented by two spaces for each level
+        if not raw_module.startswith('  '):
+            total += cumulative
+        modules.append((cumulative, module))
+
+    modules.sort(reverse=True)
+    return total, sorted(heavy), modules[:5]
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.DEBUG, format='%(asctime)s %(levelname)s %(message)s')
+
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_BUDGET_MS
+    failed = False
+
+    for name in MODULES + ENTRY_POINTS:
+        res = measure(name)
+        if res is None:
+            failed = True
+            continue
+
+        total, heavy, slowest = res
+        logging.info('{0}: {1:.1f} ms'.format(name, total))
+        for cumulative, module in slowest:
+            logging.debug('    {0:8.1f} ms {1}'.format(cumulative, module))
+
+        if heavy:
+            logging.error('{0} imports {1}'.format(name, ', '.join(heavy)))
+            failed = True
+
+        if total > budget:
+            logging.error('{0} exceeds budget {1:.1f} ms'.format(name, budget))
+            failed = True
+
+    sys.exit(1 if failed else 0)
@@ -2,7 +2,7 @@
 """
 import csv
 import logging
-from dm.CSVUtil import CSVUtil
+from dm.CSVUtil import CSVStreamWriter
 
 __author__ = 'Klára Nečasová'
 __email__ = 'xnecas24@stud.fit.vutbr.cz'
@@ -13,17 +13,22 @@ BLOCK_SIZE = 8192
 
 def copy_one_file(filename, output_file):
     logging.info('processed: {0}'.format(filename))
-    with open(filename, 'r') as csv_file:
-        csv_reader = csv.DictReader(csv_file)
-
-        out = []
-        for j, row in enumerate(csv_reader):
-            if j != 0 and j % BLOCK_SIZE == 0:
-                CSVUtil.create_csv_file(out, output_file, True)
-                out = []
-
-            out.append(row)
-        CSVUtil.create_csv_file(out, output_file, True)
+    with open(filename, 'r') as csv_file, \
+            CSVStreamWriter(output_file, enable_append=True, buffer_size=BLOCK_SIZE) as writer:
+        csv_reader = csv.reader(csv_file)
+        header = next(csv_reader, None)
+        if header is None:
+            logging.warning('empty data to write')
+            return
+
+        if writer.field_names is None:
+            writer.field_names = header
+
+        if writer.field_names == header:
+            writer.write_rows(csv_reader)
+        else:
+            # columns of file are in different order than columns of output file
+            writer.write_dicts([dict(zip(header, row)) for row in csv_reader])
 
 
 def peto_intrak_testing(directory):
@@ -0,0 +1,23 @@
+"""Converts columnar sets (NPZUtil) into csv files, e.g. for RapidMiner.
+
+Usage: npz_to_csv.py input_directory [output.csv]
+"""
+from os.path import dirname, abspath, join
+import sys
+sys.path.append(abspath(join(dirname(__file__), '..', '')))
+
+from dm.NPZUtil import NPZReader
+import logging
+
+__author__ = 'Klára Nečasová'
+__email__ = 'xnecas24@stud.fit.vutbr.cz'
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.DEBUG, format='%(asctime)s %(levelname)s %(message)s')
+
+    input_directory = sys.argv[1].rstrip('/')
+    output_filename = sys.argv[2] if len(sys.argv) > 2 else input_directory + '.csv'
+
+    rows = NPZReader(input_directory).to_csv(output_filename)
+    logging.info('{0} rows written to {1}'.format(rows, output_filename))